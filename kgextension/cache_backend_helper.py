@@ -0,0 +1,986 @@
+import contextlib
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from functools import wraps
+
+import pandas as pd
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "evictions", "resident_bytes"])
+
+"""
+Statistics of a cached function, as returned by its "cache_info" method. In
+addition to the fields of the CacheInfo of functools.lru_cache, it contains
+the number of evicted entries and the estimated size of the cached entries.
+"maxsize" is the memory budget (in bytes) of the backend.
+"""
+
+
+_query_whitespace = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')|\s+")
+
+
+def normalize_query(query):
+    """Normalizes a SPARQL query for use in a cache key: Runs of whitespace are
+    collapsed into a single space, except within string literals.
+
+    Args:
+        query (str): SPARQL query.
+
+    Returns:
+        str: The normalized query.
+    """
+
+    return _query_whitespace.sub(lambda match: match.group(1) or " ", query).strip()
+
+
+def hash_key(key):
+    """Turns a cache key into a fixed-length string, which is used to store
+    the entry in persistent backends.
+
+    Args:
+        key (tuple): The cache key.
+
+    Returns:
+        str: SHA-256 hex digest of the key's representation.
+    """
+
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
+def estimate_size(value):
+    """Estimates the memory footprint of a cached value. DataFrames and Series 
+    are measured with memory_usage(deep=True).
+
+    Args:
+        value (object): The cached value.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+
+    if isinstance(value, pd.DataFrame):
+
+        return int(value.memory_usage(index=True, deep=True).sum())
+
+    elif isinstance(value, pd.Series):
+
+        return int(value.memory_usage(index=True, deep=True))
+
+    elif isinstance(value, (list, tuple)):
+
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+
+    return sys.getsizeof(value)
+
+
+def protect(value):
+    """Copies mutable values (DataFrames, Series and lists), so that callers 
+    can't change a cached value in place.
+
+    Args:
+        value (object): The cached value.
+
+    Returns:
+        object: A copy of the value, or the value itself if it is immutable.
+    """
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+
+        return value.copy(deep=True)
+
+    elif isinstance(value, list):
+
+        return [protect(item) for item in value]
+
+    return value
+
+
+class MemoryCacheBackend():
+    """Cache backend that keeps the entries in memory, for the lifetime of the
+    Python process. When the estimated size of all entries exceeds 
+    "max_bytes", the least recently used entries are evicted. Values are 
+    copied when they are stored and returned, so the cached values can't be 
+    changed by callers.
+    """
+
+    def __init__(self, max_bytes=1024**3, ttl=None):
+        """Configuration of the in-memory cache backend.
+
+        Args:
+            max_bytes (int, optional): Memory budget (in bytes) of all entries, 
+                as estimated by estimate_size. If None, the cache is 
+                unbounded. Defaults to 1024**3 (1 GiB).
+            ttl (float, optional): Default time to live of the entries (in
+                seconds). If None, entries don't expire. Defaults to None.
+        """
+
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.resident_bytes = 0
+        self._entries = OrderedDict()
+        self._evictions = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, entry):
+        """Removes an entry (the lock must be held).
+        """
+
+        _, _, size = self._entries.pop(entry)
+
+        self.resident_bytes -= size
+
+    def get(self, namespace, key):
+        """Looks up an entry.
+
+        Args:
+            namespace (str): Name of the cached function.
+            key (tuple): The cache key.
+
+        Returns:
+            tuple: (True, value) if an unexpired entry was found, (False, None)
+            otherwise.
+        """
+
+        with self._lock:
+
+            entry = self._entries.get((namespace, key))
+
+            if entry is None:
+                return False, None
+
+            value, expires, _ = entry
+
+            if expires is not None and expires <= time.time():
+
+                self._remove((namespace, key))
+
+                return False, None
+
+            self._entries.move_to_end((namespace, key))
+
+        return True, protect(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        """Stores an entry and evicts the least recently used entries, if the 
+        memory budget is exceeded. Values that exceed the budget on their own 
+        are not stored.
+
+        Args:
+            namespace (str): Name of the cached function.
+            key (tuple): The cache key.
+            value (object): The value to be cached.
+            ttl (float, optional): Time to live of the entry (in seconds). If
+                None, the default of the backend is used. Defaults to None.
+        """
+
+        ttl = ttl if ttl is not None else self.ttl
+
+        expires = time.time() + ttl if ttl is not None else None
+
+        size = estimate_size(value)
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        value = protect(value)
+
+        with self._lock:
+
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+
+            self._entries[(namespace, key)] = (value, expires, size)
+
+            self.resident_bytes += size
+
+            while self.max_bytes is not None and self.resident_bytes > self.max_bytes:
+
+                entry = next(iter(self._entries))
+
+                self._remove(entry)
+
+                self._evictions[entry[0]] = self._evictions.get(entry[0], 0) + 1
+
+    def info(self, namespace):
+        """Returns statistics of the entries of a namespace.
+
+        Args:
+            namespace (str): Name of the cached function.
+
+        Returns:
+            dict: Number of entries ("currsize"), their estimated size in bytes 
+            ("resident_bytes"), the number of evicted entries ("evictions") 
+            and the memory budget of the backend ("maxsize").
+        """
+
+        with self._lock:
+
+            sizes = [size for (entry_namespace, _), (_, _, size) in self._entries.items() if entry_namespace == namespace]
+
+            return {"currsize": len(sizes), "resident_bytes": sum(sizes), "evictions": self._evictions.get(namespace, 0), "maxsize": self.max_bytes}
+
+    def values(self, namespace):
+        """Returns the values of all unexpired entries of a namespace.
+
+        Args:
+            namespace (str): Name of the cached function.
+
+        Returns:
+            list: The cached values.
+        """
+
+        now = time.time()
+
+        with self._lock:
+
+            values = [value for (entry_namespace, _), (value, expires, _) in self._entries.items() if entry_namespace == namespace and (expires is None or expires > now)]
+
+        return [protect(value) for value in values]
+
+    def items(self, namespace=None):
+        """Returns all unexpired entries of a namespace, or of all namespaces
+        if namespace is None.
+
+        Args:
+            namespace (str, optional): Name of the cached function. Defaults 
+                to None.
+
+        Returns:
+            list: Tuples of namespace, key, value and expiry time (as Unix 
+            timestamp, None if the entry doesn't expire).
+        """
+
+        now = time.time()
+
+        with self._lock:
+
+            entries = [(entry_namespace, key, value, expires) for (entry_namespace, key), (value, expires, _) in self._entries.items() if (namespace is None or entry_namespace == namespace) and (expires is None or expires > now)]
+
+        return [(entry_namespace, key, protect(value), expires) for entry_namespace, key, value, expires in entries]
+
+    def keys(self):
+        """Returns the namespaces and keys of all unexpired entries, without 
+        copying the values.
+
+        Returns:
+            list: Tuples of namespace and key.
+        """
+
+        now = time.time()
+
+        with self._lock:
+
+            return [entry for entry, (_, expires, _) in self._entries.items() if expires is None or expires > now]
+
+    def clear(self, namespace=None):
+        """Deletes all entries of a namespace, or all entries if namespace is
+        None.
+        """
+
+        with self._lock:
+
+            if namespace is None:
+
+                self._entries.clear()
+                self._evictions.clear()
+                self.resident_bytes = 0
+
+            else:
+
+                for entry in [entry for entry in self._entries if entry[0] == namespace]:
+                    self._remove(entry)
+
+                self._evictions.pop(namespace, None)
+
+
+class SQLiteCacheBackend():
+    """Cache backend that stores the pickled entries in a SQLite database, so
+    that they are reused by later Python processes. The database can be 
+    shared by several processes on the same host, e.g. multiprocessing or 
+    joblib workers: it is used in WAL mode, every process opens its own 
+    connection and, via the "lock" method, only one process computes a 
+    missing entry while the others wait for its result ("single-flight").
+    """
+
+    def __init__(self, file_path="kgextension_cache.db", ttl=None, lock_timeout=600):
+        """Configuration of the SQLite cache backend.
+
+        Args:
+            file_path (str, optional): Path of the database file. Defaults to
+                "kgextension_cache.db".
+            ttl (float, optional): Default time to live of the entries (in
+                seconds). If None, entries don't expire. Defaults to None.
+            lock_timeout (float, optional): Time (in seconds) after which the
+                single-flight lock of an entry is considered stale, e.g. 
+                because the process that held it was killed, and is taken 
+                over by a waiting process. Defaults to 600.
+        """
+
+        self.file_path = file_path
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._pid = None
+
+        # opens the connection and creates the tables
+
+        self._connection
+
+    def __getstate__(self):
+
+        # the backend can be passed to worker processes, which open their own
+        # connection
+
+        return {"file_path": self.file_path, "ttl": self.ttl, "lock_timeout": self.lock_timeout}
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+
+        self._pid = None
+
+    def _check_process(self):
+        """Opens a new connection (and creates a new thread lock) if the 
+        backend is used in a new process, e.g. after a fork, since SQLite 
+        connections must not be shared between processes.
+        """
+
+        if self._pid == os.getpid():
+            return
+
+        self._process_lock = threading.Lock()
+
+        connection = sqlite3.connect(self.file_path, timeout=60, check_same_thread=False)
+
+        with connection:
+
+            # WAL mode allows concurrent readers while one process writes
+
+            connection.execute("PRAGMA journal_mode=WAL")
+
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, value BLOB, expires REAL, raw_key BLOB, PRIMARY KEY (namespace, key))")
+
+            connection.execute("CREATE TABLE IF NOT EXISTS locks (namespace TEXT, key TEXT, owner TEXT, expires REAL, PRIMARY KEY (namespace, key))")
+
+            # databases of earlier versions lack the pickled keys, which are
+            # needed to export the entries
+
+            columns = [column[1] for column in connection.execute("PRAGMA table_info(entries)")]
+
+            if "raw_key" not in columns:
+                connection.execute("ALTER TABLE entries ADD COLUMN raw_key BLOB")
+
+        self._process_connection = connection
+        self._pid = os.getpid()
+
+    @property
+    def _lock(self):
+
+        self._check_process()
+
+        return self._process_lock
+
+    @property
+    def _connection(self):
+
+        self._check_process()
+
+        return self._process_connection
+
+    @contextlib.contextmanager
+    def lock(self, namespace, key, poll_interval=0.05):
+        """Single-flight lock of an entry, shared by all processes (and 
+        threads) that use the database: Blocks until no other caller holds 
+        the lock of the entry. Used by the "cached" decorator, which looks up
+        the entry again after the lock is acquired, so that a missing entry 
+        is only computed once.
+
+        Args:
+            namespace (str): Name of the cached function.
+            key (tuple): The cache key.
+            poll_interval (float, optional): Time (in seconds) between two 
+                attempts to acquire the lock. Defaults to 0.05.
+        """
+
+        hashed_key = hash_key(key)
+
+        owner = str(os.getpid()) + "-" + str(threading.get_ident())
+
+        while True:
+
+            now = time.time()
+
+            with self._lock, self._connection:
+
+                self._connection.execute("DELETE FROM locks WHERE namespace = ? AND key = ? AND expires <= ?", (namespace, hashed_key, now))
+
+                acquired = self._connection.execute("INSERT OR IGNORE INTO locks VALUES (?, ?, ?, ?)", (namespace, hashed_key, owner, now + self.lock_timeout)).rowcount == 1
+
+            if acquired:
+                break
+
+            time.sleep(poll_interval)
+
+        try:
+            yield
+
+        finally:
+
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM locks WHERE namespace = ? AND key = ? AND owner = ?", (namespace, hashed_key, owner))
+
+    def get(self, namespace, key):
+        """Looks up an entry, see MemoryCacheBackend.get.
+        """
+
+        with self._lock:
+
+            row = self._connection.execute("SELECT value, expires FROM entries WHERE namespace = ? AND key = ?", (namespace, hash_key(key))).fetchone()
+
+        if row is None:
+            return False, None
+
+        value, expires = row
+
+        if expires is not None and expires <= time.time():
+
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, hash_key(key)))
+
+            return False, None
+
+        return True, pickle.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        """Stores an entry, see MemoryCacheBackend.set. Values that can't be
+        pickled are not stored.
+        """
+
+        try:
+            value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        # If the key can't be pickled, the entry can still be used but not 
+        # exported
+
+        try:
+            raw_key = pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            raw_key = None
+
+        ttl = ttl if ttl is not None else self.ttl
+
+        expires = time.time() + ttl if ttl is not None else None
+
+        with self._lock, self._connection:
+
+            self._connection.execute("INSERT OR REPLACE INTO entries (namespace, key, value, expires, raw_key) VALUES (?, ?, ?, ?, ?)", (namespace, hash_key(key), value, expires, raw_key))
+
+    def info(self, namespace):
+        """Returns statistics of the entries of a namespace, see 
+        MemoryCacheBackend.info. The size is that of the pickled values on 
+        disk, entries are never evicted.
+        """
+
+        with self._lock:
+
+            currsize, resident_bytes = self._connection.execute("SELECT COUNT(*), SUM(LENGTH(value)) FROM entries WHERE namespace = ?", (namespace,)).fetchone()
+
+        return {"currsize": currsize, "resident_bytes": resident_bytes or 0, "evictions": 0, "maxsize": None}
+
+    def values(self, namespace):
+        """Returns the values of all unexpired entries of a namespace, see
+        MemoryCacheBackend.values.
+        """
+
+        with self._lock:
+
+            rows = self._connection.execute("SELECT value FROM entries WHERE namespace = ? AND (expires IS NULL OR expires > ?)", (namespace, time.time())).fetchall()
+
+        return [pickle.loads(value) for value, in rows]
+
+    def items(self, namespace=None):
+        """Returns all unexpired entries, see MemoryCacheBackend.items. 
+        Entries that were stored without their pickled key are left out.
+        """
+
+        with self._lock:
+
+            if namespace is None:
+                rows = self._connection.execute("SELECT namespace, raw_key, value, expires FROM entries WHERE raw_key IS NOT NULL AND (expires IS NULL OR expires > ?)", (time.time(),)).fetchall()
+            else:
+                rows = self._connection.execute("SELECT namespace, raw_key, value, expires FROM entries WHERE namespace = ? AND raw_key IS NOT NULL AND (expires IS NULL OR expires > ?)", (namespace, time.time())).fetchall()
+
+        return [(entry_namespace, pickle.loads(raw_key), pickle.loads(value), expires) for entry_namespace, raw_key, value, expires in rows]
+
+    def keys(self):
+        """Returns the namespaces and keys of all unexpired entries, see 
+        MemoryCacheBackend.keys. Entries that were stored without their 
+        pickled key are left out.
+        """
+
+        with self._lock:
+
+            rows = self._connection.execute("SELECT namespace, raw_key FROM entries WHERE raw_key IS NOT NULL AND (expires IS NULL OR expires > ?)", (time.time(),)).fetchall()
+
+        return [(namespace, pickle.loads(raw_key)) for namespace, raw_key in rows]
+
+    def clear(self, namespace=None):
+        """Deletes all entries of a namespace, or all entries if namespace is
+        None.
+        """
+
+        with self._lock, self._connection:
+
+            if namespace is None:
+                self._connection.execute("DELETE FROM entries")
+                self._connection.execute("DELETE FROM locks")
+            else:
+                self._connection.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self):
+        """Deletes all expired entries.
+        """
+
+        with self._lock, self._connection:
+
+            self._connection.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
+
+# If the environment variable KGEXTENSION_CACHE_DB is set, e.g. for the 
+# workers of joblib or multiprocessing, all processes share that database
+
+if os.environ.get("KGEXTENSION_CACHE_DB"):
+    _cache_backend = SQLiteCacheBackend(os.environ["KGEXTENSION_CACHE_DB"])
+else:
+    _cache_backend = MemoryCacheBackend()
+
+
+def get_cache_backend():
+    """Returns the backend that is currently used by all cached functions.
+
+    Returns:
+        MemoryCacheBackend/SQLiteCacheBackend: The cache backend.
+    """
+
+    return _cache_backend
+
+
+def set_cache_backend(backend):
+    """Sets the backend that is used by all cached functions, e.g. a
+    SQLiteCacheBackend to keep query results across Python sessions.
+
+    Args:
+        backend (MemoryCacheBackend/SQLiteCacheBackend): The cache backend. Any
+            object with the methods get, set, values, items, keys, info and 
+            clear can be used.
+    """
+
+    global _cache_backend
+
+    _cache_backend = backend
+
+
+_call_state = threading.local()
+
+
+def skip_caching():
+    """Prevents that the results of the cached functions that are currently
+    running (in this thread) are stored, e.g. because they are based on a 
+    failed request that was recorded in the negative cache instead.
+    """
+
+    calls = getattr(_call_state, "calls", None)
+
+    if calls:
+        calls[:] = [True] * len(calls)
+
+
+def cached(namespace, key=None, ttl=None):
+    """Decorator that caches the results of a function in the current cache
+    backend. Like functools.lru_cache, the decorated function offers
+    "cache_info" and "cache_clear" methods and the uncached function as
+    "__wrapped__". Concurrent calls with the same key are coalesced: only the
+    first one calls the function, the others wait for its result (or 
+    exception) and are counted as hits.
+
+    Args:
+        namespace (str): Name under which the entries are stored.
+        key (function, optional): Function that builds the cache key from the
+            bound arguments (an OrderedDict of argument names and values,
+            including defaults). If None, the key is the tuple of all argument
+            names and values. Defaults to None.
+        ttl (float/function, optional): Time to live of the entries (in 
+            seconds), or a function without arguments that returns it when an
+            entry is stored. If None, the default of the backend is used. 
+            Defaults to None.
+    """
+
+    def decorator(fn):
+
+        signature = inspect.signature(fn)
+
+        statistics = {"hits": 0, "misses": 0}
+        statistics_lock = threading.Lock()
+
+        # futures of the calls that are currently running, by cache key
+
+        in_flight = {}
+        in_flight_lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+
+            if key is None:
+                cache_key = tuple(arguments.arguments.items())
+            else:
+                cache_key = key(arguments.arguments)
+
+            backend = get_cache_backend()
+
+            found, value = backend.get(namespace, cache_key)
+
+            if found:
+
+                with statistics_lock:
+                    statistics["hits"] += 1
+
+                return value
+
+            # If the same call is already running in another thread, its 
+            # result is awaited instead of issuing a duplicate request
+
+            with in_flight_lock:
+
+                future = in_flight.get(cache_key)
+
+                leader = future is None
+
+                if leader:
+                    future = in_flight[cache_key] = Future()
+
+            if not leader:
+
+                with statistics_lock:
+                    statistics["hits"] += 1
+
+                return protect(future.result())
+
+            try:
+                value = locked_call(backend, cache_key, args, kwargs)
+
+            except BaseException as exception:
+
+                future.set_exception(exception)
+
+                raise
+
+            else:
+
+                future.set_result(value)
+
+                return value
+
+            finally:
+
+                with in_flight_lock:
+                    del in_flight[cache_key]
+
+        def locked_call(backend, cache_key, args, kwargs):
+
+            # If the backend offers single-flight locks, a missing entry is 
+            # looked up again once the lock is held, since another process 
+            # may have computed it in the meantime
+
+            lock = getattr(backend, "lock", None)
+
+            if lock is None:
+
+                with statistics_lock:
+                    statistics["misses"] += 1
+
+                return call(backend, cache_key, args, kwargs)
+
+            with lock(namespace, cache_key):
+
+                found, value = backend.get(namespace, cache_key)
+
+                with statistics_lock:
+                    statistics["hits" if found else "misses"] += 1
+
+                return value if found else call(backend, cache_key, args, kwargs)
+
+        def call(backend, cache_key, args, kwargs):
+
+            # If skip_caching is called during the call, the value isn't stored
+
+            calls = _call_state.__dict__.setdefault("calls", [])
+
+            calls.append(False)
+
+            try:
+                value = fn(*args, **kwargs)
+            finally:
+                skip = calls.pop()
+
+            if not skip:
+                backend.set(namespace, cache_key, value, ttl() if callable(ttl) else ttl)
+
+            return value
+
+        def cache_info():
+
+            backend_info = get_cache_backend().info(namespace)
+
+            return CacheInfo(statistics["hits"], statistics["misses"], backend_info["maxsize"], backend_info["currsize"], backend_info["evictions"], backend_info["resident_bytes"])
+
+        def cache_clear():
+
+            get_cache_backend().clear(namespace)
+
+            with statistics_lock:
+                statistics["hits"] = 0
+                statistics["misses"] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+
+        return wrapper
+
+    return decorator
+
+
+class EntityResultCache():
+    """Caches the results of bundled (VALUES) queries per entity in the 
+    current cache backend, keyed by (endpoint, query template, URI). The 
+    results must bind the URI to the variable "value". Like a cached function, 
+    it offers "cache_info" and "cache_clear".
+    """
+
+    def __init__(self, namespace, ttl=None):
+        """Configuration of the entity result cache.
+
+        Args:
+            namespace (str): Name under which the entries are stored.
+            ttl (float, optional): Time to live of the entries (in seconds). If
+                None, the default of the backend is used. Defaults to None.
+        """
+
+        self.namespace = namespace
+        self.ttl = ttl
+        self._statistics = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def get_many(self, key, uris):
+        """Looks up the cached results of several URIs.
+
+        Args:
+            key (tuple): Identifies endpoint and query template.
+            uris (list): The URIs to look up.
+
+        Returns:
+            tuple: List of the cached results (DataFrames) and list of the URIs 
+            that are not cached.
+        """
+
+        backend = get_cache_backend()
+
+        results = []
+        missing_uris = []
+
+        for uri in uris:
+
+            found, result = backend.get(self.namespace, key + (uri,))
+
+            if found:
+                results.append(result)
+            else:
+                missing_uris.append(uri)
+
+        with self._lock:
+            self._statistics["hits"] += len(results)
+            self._statistics["misses"] += len(missing_uris)
+
+        return results, missing_uris
+
+    def set_many(self, key, uris, result):
+        """Splits the result of a bundled query by the "value" column and 
+        stores the rows of every URI; URIs without rows are stored with an 
+        empty result. Results with rows, but without a "value" column can't 
+        be split and are not stored.
+
+        Args:
+            key (tuple): Identifies endpoint and query template.
+            uris (list): The URIs that were queried.
+            result (pd.DataFrame): The result of the bundled query.
+        """
+
+        if result.empty:
+            rows = {}
+        elif "value" in result.columns:
+            rows = dict(tuple(result.groupby("value", sort=False)))
+        else:
+            return
+
+        backend = get_cache_backend()
+
+        for uri in uris:
+
+            backend.set(self.namespace, key + (uri,), rows.get(uri, pd.DataFrame()), self.ttl)
+
+    def cache_info(self):
+        """Returns the statistics of the cache (hits and misses are counted 
+        per URI).
+
+        Returns:
+            CacheInfo: The statistics.
+        """
+
+        backend_info = get_cache_backend().info(self.namespace)
+
+        return CacheInfo(self._statistics["hits"], self._statistics["misses"], backend_info["maxsize"], backend_info["currsize"], backend_info["evictions"], backend_info["resident_bytes"])
+
+    def cache_clear(self):
+        """Deletes all entries and resets the statistics.
+        """
+
+        get_cache_backend().clear(self.namespace)
+
+        with self._lock:
+            self._statistics["hits"] = 0
+            self._statistics["misses"] = 0
+
+
+class NegativeCache():
+    """Remembers failed lookups, e.g. URIs that could not be dereferenced or
+    queries that timed out, so that they are not retried on every call. The
+    entries are stored in the current cache backend with their own, usually 
+    shorter time to live and a failure category, e.g. "unreachable", 
+    "timeout", "not_found", "http_error", "unparsable", "retries_exhausted" 
+    or "query_failed". Like a cached 
+    function, it offers "cache_info" and "cache_clear".
+    """
+
+    def __init__(self, namespace="negative_cache", ttl=3600):
+        """Configuration of the negative cache.
+
+        Args:
+            namespace (str, optional): Name under which the entries are 
+                stored. Defaults to "negative_cache".
+            ttl (float, optional): Time to live of the entries (in seconds),
+                i.e. how long a failed lookup isn't retried. If None, the 
+                default of the backend is used. Defaults to 3600.
+        """
+
+        self.namespace = namespace
+        self.ttl = ttl
+        self._statistics = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def check(self, kind, identifier):
+        """Checks if a lookup failed recently. If so, the results of the 
+        cached functions that are currently running are not stored, see 
+        skip_caching.
+
+        Args:
+            kind (str): Kind of the lookup, e.g. "uri", "url", "dll" or 
+                "sparql".
+            identifier (object): The looked up resource, e.g. the URI.
+
+        Returns:
+            dict: The entry of the failure (with the keys "kind", 
+            "identifier", "category", "message" and "expires"), None if the 
+            lookup isn't blacklisted.
+        """
+
+        found, entry = get_cache_backend().get(self.namespace, (kind, identifier))
+
+        with self._lock:
+            self._statistics["hits" if found else "misses"] += 1
+
+        if not found:
+            return None
+
+        skip_caching()
+
+        return entry
+
+    def record(self, kind, identifier, category, message=""):
+        """Records a failed lookup. The results of the cached functions that 
+        are currently running are not stored, see skip_caching.
+
+        Args:
+            kind (str): Kind of the lookup, see check.
+            identifier (object): The looked up resource, e.g. the URI.
+            category (str): Category of the failure, e.g. "unreachable".
+            message (str, optional): Description of the failure, e.g. the 
+                error message. Defaults to "".
+        """
+
+        backend = get_cache_backend()
+
+        ttl = self.ttl if self.ttl is not None else backend.ttl
+
+        entry = {"kind": kind, "identifier": identifier, "category": category, "message": str(message), "expires": time.time() + ttl if ttl is not None else None}
+
+        backend.set(self.namespace, (kind, identifier), entry, ttl)
+
+        skip_caching()
+
+    def blacklist(self, kind=None):
+        """Returns the lookups that are currently blacklisted.
+
+        Args:
+            kind (str, optional): If given, only lookups of this kind (e.g. 
+                "uri") are returned. Defaults to None.
+
+        Returns:
+            pd.DataFrame: One row per failed lookup, with the columns "kind", 
+            "identifier", "category", "message" and "expires" (time until 
+            which the lookup isn't retried).
+        """
+
+        entries = [entry for entry in get_cache_backend().values(self.namespace) if kind is None or entry["kind"] == kind]
+
+        blacklist = pd.DataFrame(entries, columns=["kind", "identifier", "category", "message", "expires"])
+
+        blacklist["expires"] = pd.to_datetime(blacklist["expires"], unit="s")
+
+        return blacklist
+
+    def cache_info(self):
+        """Returns the statistics of the negative cache.
+
+        Returns:
+            CacheInfo: The statistics.
+        """
+
+        backend_info = get_cache_backend().info(self.namespace)
+
+        return CacheInfo(self._statistics["hits"], self._statistics["misses"], backend_info["maxsize"], backend_info["currsize"], backend_info["evictions"], backend_info["resident_bytes"])
+
+    def cache_clear(self):
+        """Deletes all entries, i.e. all failed lookups are retried, and 
+        resets the statistics.
+        """
+
+        get_cache_backend().clear(self.namespace)
+
+        with self._lock:
+            self._statistics["hits"] = 0
+            self._statistics["misses"] = 0
+
+
+negative_cache = NegativeCache()
@@ -1,9 +1,16 @@
+import gzip
+import hashlib
+import pickle
+import re
+import time
 import pandas as pd
 from collections import OrderedDict
 from functools import wraps
+from kgextension import __version__
+from kgextension.cache_backend_helper import get_cache_backend, negative_cache
 from kgextension.utilities_helper import url_exists
-from kgextension.sparql_helper import endpoint_wrapper_logic
-from kgextension.uri_helper import query_uri_logic
+from kgextension.sparql_helper import endpoint_wrapper_logic, entity_result_cache
+from kgextension.uri_helper import query_uri_logic, graph_cache
 from kgextension.linking_helper import (dll_query_resolver,
                                         spotlight_uri_extractor)
 
@@ -13,10 +20,13 @@ def show_cache_info():
     """
 
     print("query_uri_logic: "+str(query_uri_logic.cache_info()))
+    print("query_uri_logic (parsed documents): "+str(graph_cache.cache_info()))
     print("endpoint_wrapper_logic: "+str(endpoint_wrapper_logic.cache_info()))
+    print("endpoint_wrapper_bundled (per URI): "+str(entity_result_cache.cache_info()))
     print("dll_query_resolver: "+str(dll_query_resolver.cache_info()))
     print("spotlight_uri_extractor: "+str(spotlight_uri_extractor.cache_info()))
     print("url_exists: "+str(url_exists.cache_info()))
+    print("negative_cache: "+str(negative_cache.cache_info()))
 
 
 def clear_cache():
@@ -24,16 +34,321 @@ def clear_cache():
     """
 
     query_uri_logic.cache_clear()
+    graph_cache.cache_clear()
     endpoint_wrapper_logic.cache_clear()
+    entity_result_cache.cache_clear()
     dll_query_resolver.cache_clear()
     spotlight_uri_extractor.cache_clear()
-    url_exists.cache_clear()    
+    url_exists.cache_clear()
+    negative_cache.cache_clear()
+
+
+def show_blacklist(kind=None):
+    """Function that returns the URIs, URLs and queries that recently failed 
+    and are therefore skipped until their entry in the negative cache expires.
+
+    Args:
+        kind (str, optional): If given, only failures of this kind are 
+            returned: "uri" (query_uri), "url" (url_exists), "dll" (DBpedia 
+            Lookup) or "sparql" (endpoint_wrapper). Defaults to None.
+
+    Returns:
+        pd.DataFrame: One row per failure, with the columns "kind", 
+        "identifier", "category", "message" and "expires".
+    """
+
+    return negative_cache.blacklist(kind)
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+"""Version of the format of cache snapshots written by export_cache."""
+
+
+def export_cache(file_path, namespaces=None):
+    """Function that writes the entries of all caches (of the current cache 
+    backend) to a snapshot file, e.g. to ship a warm cache to machines without
+    network access. The snapshot contains the results of all cached methods 
+    (SPARQL queries, per-URI results of bundled queries, dereferenced URIs, 
+    DBpedia Lookup and Spotlight results, URL checks) and the negative cache,
+    with their expiry times.
+
+    Args:
+        file_path (str): Path of the snapshot file (a gzipped pickle).
+        namespaces (list, optional): If given, only the entries of these 
+            cached methods are exported, e.g. ["endpoint_wrapper_logic"]. 
+            Defaults to None.
+
+    Returns:
+        int: Number of exported entries.
+    """
+
+    entries = [entry for entry in get_cache_backend().items() if namespaces is None or entry[0] in namespaces]
+
+    write_cache_snapshot(file_path, entries)
+
+    return len(entries)
+
+
+def write_cache_snapshot(file_path, entries):
+    """Writes cache entries to a versioned snapshot file.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+        entries (list): Tuples of namespace, key, value and expiry time.
+    """
+
+    snapshot = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "kgextension_version": __version__,
+        "created": time.time(),
+        "entries": entries}
+
+    with gzip.open(file_path, "wb") as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_cache_snapshot(file_path):
+    """Reads a snapshot file written by export_cache. As snapshots are 
+    pickled, only files from trusted sources should be read.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+
+    Raises:
+        ValueError: Raised if the file isn't a snapshot or was written in a 
+            newer, unsupported format.
+
+    Returns:
+        dict: The snapshot, with the keys "format_version", 
+        "kgextension_version", "created" and "entries".
+    """
+
+    with gzip.open(file_path, "rb") as file:
+        snapshot = pickle.load(file)
+
+    if not isinstance(snapshot, dict) or "format_version" not in snapshot:
+
+        raise ValueError(file_path + " is not a kgextension cache snapshot.")
+
+    if snapshot["format_version"] > SNAPSHOT_FORMAT_VERSION:
+
+        raise ValueError("The cache snapshot " + file_path + " has the format version " + str(snapshot["format_version"]) + ", which is not supported by kgextension " + __version__ + ".")
+
+    return snapshot
+
+
+def import_cache(file_path, overwrite=False):
+    """Function that loads a snapshot written by export_cache into the current
+    cache backend. Several snapshots can be imported one after another to 
+    merge them. Expired entries are skipped, the other entries keep their 
+    remaining time to live.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+        overwrite (bool, optional): If True, cached entries are replaced by 
+            those of the snapshot, otherwise they are kept. Defaults to False.
+
+    Returns:
+        int: Number of imported entries.
+    """
+
+    snapshot = read_cache_snapshot(file_path)
+
+    backend = get_cache_backend()
+
+    now = time.time()
+
+    imported = 0
+
+    for namespace, key, value, expires in snapshot["entries"]:
+
+        if expires is not None and expires <= now:
+            continue
+
+        if not overwrite and backend.get(namespace, key)[0]:
+            continue
+
+        backend.set(namespace, key, value, expires - now if expires is not None else None)
+
+        imported += 1
+
+    return imported
+
+
+def merge_cache_snapshots(file_paths, output_path):
+    """Function that merges several snapshot files into one, e.g. the 
+    snapshots of several feature generation jobs. If an entry is contained in
+    several snapshots, the one of the last snapshot is kept.
+
+    Args:
+        file_paths (list): Paths of the snapshot files.
+        output_path (str): Path of the merged snapshot file.
+
+    Returns:
+        int: Number of entries of the merged snapshot.
+    """
+
+    entries = OrderedDict()
+
+    now = time.time()
+
+    for file_path in file_paths:
+
+        for namespace, key, value, expires in read_cache_snapshot(file_path)["entries"]:
+
+            if expires is None or expires > now:
+                entries[(namespace, key)] = (namespace, key, value, expires)
+
+    write_cache_snapshot(output_path, list(entries.values()))
+
+    return len(entries)
+
+
+_iri_pattern = re.compile(r"<([^<>\s]+)>")
+
+
+def key_uris(key):
+    """Collects the URIs contained in a cache key: strings that are part of 
+    the key and IRIs in angle brackets, e.g. in VALUES clauses of queries.
+
+    Args:
+        key (object): The cache key.
+
+    Returns:
+        set: The URIs (and other strings) of the key.
+    """
+
+    if isinstance(key, str):
+
+        return {key} | set(_iri_pattern.findall(key))
+
+    if isinstance(key, (tuple, list)):
+
+        return set().union(*[key_uris(part) for part in key])
+
+    return set()
+
+
+def cache_coverage(df, columns=None):
+    """Function that reports which share of the URIs of a DataFrame is 
+    covered by the caches of the current cache backend, e.g. to check if an 
+    imported snapshot suffices to run the feature generation offline. A URI 
+    counts as covered by a cached method if it is part of the key of one of 
+    its entries, or of a query in such a key.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the URIs.
+        columns (list, optional): Names of the columns containing the URIs. 
+            If None, all columns are used. Defaults to None.
+
+    Returns:
+        pd.DataFrame: One row per cached method (and a row "any" for the URIs
+        covered by at least one of them) with the number of covered URIs 
+        ("covered"), the number of distinct URIs ("uris") and their ratio 
+        ("coverage").
+    """
+
+    if columns is None:
+        columns = df.columns
+
+    uris = set()
+
+    for column in columns:
+        uris |= {value for value in df[column].dropna().unique() if isinstance(value, str)}
+
+    covered = OrderedDict()
+
+    for namespace, key in get_cache_backend().keys():
+
+        covered.setdefault(namespace, set()).update(key_uris(key) & uris)
+
+    covered["any"] = set().union(*covered.values())
+
+    report = pd.DataFrame(
+        {"covered": [len(namespace_uris) for namespace_uris in covered.values()],
+        "uris": len(uris)},
+        index=list(covered.keys()))
+
+    report["coverage"] = report["covered"] / report["uris"] if uris else 0.0
+
+    return report
+
+
+class FrozenArgument():
+    """Hashable stand-in for an unhashable argument (pandas Series or 
+    dictionary). Hash and equality are based on a fixed-size digest of the 
+    content, so cache keys stay small and cheap to compare; the original value 
+    is kept until the call has finished, so that it can be unfrozen.
+    """
+
+    __slots__ = ("kind", "digest", "value")
+
+    def __init__(self, value):
+
+        if isinstance(value, pd.Series):
+
+            self.kind = "series"
+
+            digest = hashlib.blake2b(digest_size=16)
+
+            try:
+
+                # hashes values and index vectorized, one uint64 per row; 
+                # categorizing first only pays off for many duplicates
+
+                digest.update(pd.util.hash_pandas_object(value, index=True, categorize=False).values.tobytes())
+
+            except TypeError:
+
+                digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+            digest.update(repr((value.name, str(value.dtype), str(value.index.dtype))).encode("utf-8"))
+
+        else:
+
+            self.kind = "dict"
+
+            try:
+                content = pickle.dumps(tuple(value.items()), protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                content = repr(tuple(value.items())).encode("utf-8")
+
+            digest = hashlib.blake2b(content, digest_size=16)
+
+        self.digest = digest.hexdigest()
+        self.value = value
+
+    def __hash__(self):
+
+        return hash((self.kind, self.digest))
+
+    def __eq__(self, other):
+
+        return isinstance(other, FrozenArgument) and self.kind == other.kind and self.digest == other.digest
+
+    def __repr__(self):
+
+        return "FrozenArgument(" + repr(self.kind) + ", " + repr(self.digest) + ")"
+
+    def __getstate__(self):
+
+        # only the digest is pickled, e.g. into the keys of a persistent cache
+        # backend; the original value can't be unfrozen afterwards
+
+        return (self.kind, self.digest)
+
+    def __setstate__(self, state):
+
+        self.kind, self.digest = state
+        self.value = None
 
 
 def freeze_unhashable(freeze_by="argument", freeze_argument=None, freeze_index=None):
     """Wrapper function to "freeze" a unhashable function attribute (dictionary
-    or pandas Series) into a hashable OrderedDict. Used for functions that need
-    to be cached but have these types of arguments as inputs.
+    or pandas Series) into a hashable FrozenArgument, which is identified by a 
+    digest of its content. Used for functions that need to be cached but have 
+    these types of arguments as inputs (the caching decorator has to be 
+    applied below this one).
 
     Args: 
         freeze_by (str, optional): Used to indicate whether the argument that
@@ -53,13 +368,9 @@ def freeze_unhashable(freeze_by="argument", freeze_argument=None, freeze_index=N
 
                 if freeze_argument in kwargs.keys():
 
-                    if type(kwargs[freeze_argument]) == pd.Series:
+                    if type(kwargs[freeze_argument]) in (pd.Series, dict):
 
-                        kwargs[freeze_argument] = (tuple(kwargs[freeze_argument].to_dict(OrderedDict).items()), kwargs[freeze_argument].name)
-
-                    elif type(kwargs[freeze_argument]) == dict:
-                        
-                        kwargs[freeze_argument] = tuple(OrderedDict(kwargs[freeze_argument]).items())
+                        kwargs[freeze_argument] = FrozenArgument(kwargs[freeze_argument])
 
                     else:
                         pass
@@ -79,13 +390,9 @@ def freeze_unhashable(freeze_by="argument", freeze_argument=None, freeze_index=N
 
                     else:
 
-                        if type(args[i]) == pd.Series:
-
-                            args_updated.append((tuple(args[i].to_dict(OrderedDict).items()), args[i].name))
+                        if type(args[i]) in (pd.Series, dict):
 
-                        elif type(args[i]) == dict:
-
-                            args_updated.append(tuple(OrderedDict(args[i]).items()))
+                            args_updated.append(FrozenArgument(args[i]))
 
                         else:
 
@@ -93,7 +400,18 @@ def freeze_unhashable(freeze_by="argument", freeze_argument=None, freeze_index=N
 
                 args = tuple(args_updated)
 
-            response = fn(*args, **kwargs)
+            try:
+
+                response = fn(*args, **kwargs)
+
+            finally:
+
+                # the cache keeps the FrozenArgument in its key, but not the value
+
+                for argument in list(args) + list(kwargs.values()):
+
+                    if isinstance(argument, FrozenArgument):
+                        argument.value = None
 
             return response
         return inner_decorator
@@ -105,17 +423,26 @@ def unfreeze_unhashable(frozen_argument, frozen_type="series"):
     freeze_unhashable function.
 
     Args: 
-        frozen_argument (tuple/OrderedDict): The frozen argument. Pandas Series 
-            as tuple and dictionaries as OrderedDict.
+        frozen_argument (FrozenArgument/tuple): The frozen argument. Tuples 
+            (pandas Series as tuple of items and name, dictionaries as tuple 
+            of items) are supported for arguments frozen by earlier versions.
         frozen_type (str, optional): Indicator whether the frozen arguemnt is a
-            pandas Series ("series") or a dictionary ("dict"). Defaults to
-            "series".
+            pandas Series ("series") or a dictionary ("dict"); only needed for 
+            tuples. Defaults to "series".
 
     Returns: 
-        pd.Series/dict: The content of the OrderedDict in its original format.
+        pd.Series/dict: A copy of the argument in its original format.
     """
 
-    if type(frozen_argument) == tuple:
+    if isinstance(frozen_argument, FrozenArgument):
+
+        if frozen_argument.kind == "series":
+
+            return frozen_argument.value.copy()
+
+        return dict(frozen_argument.value)
+
+    elif type(frozen_argument) == tuple:
 
         if frozen_type == "series":
 
@@ -1,6 +1,7 @@
 from kgextension.sparql_helper import RemoteEndpoint
+from kgextension.retry_helper import RetryPolicy
 
-DBpedia = RemoteEndpoint(url = "https://dbpedia.org/sparql", timeout=120, requests_per_min=100*60, retries=10, page_size=10000)
+DBpedia = RemoteEndpoint(url = "https://dbpedia.org/sparql", timeout=120, requests_per_min=100*60, retries=10, page_size=10000, max_concurrency=25)
 
 """   
 Predefined SPARQL endpoint for DBpedia.
@@ -16,10 +17,13 @@ Settings:
 NOTE: Queries which time out will return PARTIAL results in a best effort
 fashion, and will NOT return an error.
 
+max_concurrency is set to half of the connection limit, to leave room for other
+clients sharing the IP address.
+
 Source. https://wiki.dbpedia.org/public-sparql-endpoint
 """
 
-WikiData = RemoteEndpoint(url = "https://query.wikidata.org/bigdata/namespace/wdq/sparql", timeout=60, requests_per_min=100000, retries=1, page_size=0)
+WikiData = RemoteEndpoint(url = "https://query.wikidata.org/bigdata/namespace/wdq/sparql", timeout=60, requests_per_min=100000, page_size=0, max_concurrency=5, retry_policy=RetryPolicy(retries=1, error_budget=30), processing_time_per_min=60)
 
 """
 Predefined SPARQL endpoint for WikiData.
@@ -28,21 +32,21 @@ NOTE: A user-specific user agent header is needed (https://meta.wikimedia.org/wi
 
 There is a hard query deadline configured which is set to 60 seconds. There are also following limits:
 
-    One client (user agent + IP) is allowed 60 seconds of processing time each 60 seconds
-    One client is allowed 30 error queries per minute
+    One client (user agent + IP) is allowed 60 seconds of processing time each 60 seconds (-> processing_time_per_min=60)
+    One client is allowed 30 error queries per minute (-> error_budget=30)
 
 Clients exceeding the limits above are throttled with HTTP code 429. Use Retry-After header to see when the request can be repeated. If the client ignores 429 responses and continues to produce requests over the limits, it can be temporarily banned from the service. 
 Clients who don’t comply with the User-Agent policy may be blocked completely – make sure to send a good User-Agent header.
 
 Every query will timeout when it takes more time to execute than this configured deadline. You may want to optimize the query or report a problematic query here.
 
-Also note that currently access to the service is limited to 5 parallel queries per IP. The above limits are subject to change depending on resources and usage patterns. 
+Also note that currently access to the service is limited to 5 parallel queries per IP (-> max_concurrency=5). The above limits are subject to change depending on resources and usage patterns. 
 
 Source: https://www.mediawiki.org/wiki/Wikidata_Query_Service/User_Manual#Query_limits
 """
 
 
-EUOpenData = RemoteEndpoint(url = "https://data.europa.eu/euodp/sparqlep", timeout=180, requests_per_min=100000, retries=10, page_size=0)
+EUOpenData = RemoteEndpoint(url = "https://data.europa.eu/euodp/sparqlep", timeout=180, requests_per_min=100000, retries=10, page_size=0, max_concurrency=4)
 
 """
 Predefined SPARQL endpoint for the EU Open Data Portal (EU ODP).
@@ -5,14 +5,14 @@ import re
 from kgextension.endpoints import DBpedia
 from kgextension.generator_helper import get_result_df, hierarchy_graph_generator
 from kgextension.uri_helper import uri_querier
-from kgextension.sparql_helper import regex_string_generator, endpoint_wrapper
+from kgextension.sparql_helper import regex_string_generator, endpoint_wrapper_many, endpoint_wrapper_bundled, BatchLoader
 import numpy as np
 import pandas as pd
 import warnings
 warnings.simplefilter(action="ignore", category=UserWarning)
 
 
-def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, type_filter=None, regex_filter=None, bundled_mode=True, prefix_lookup=False, caching=True):
+def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, type_filter=None, regex_filter=None, bundled_mode=True, prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Generator that takes a dataset with a link to a knowledge graph and 
     creates a new feature for each data property of the given resource.
 
@@ -46,6 +46,12 @@ def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=Fals
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Dataframe with a new column for each property.
@@ -78,10 +84,7 @@ def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=Fals
 
         if bundled_mode and not uri_data_model:
 
-            values = " ( <"+df[col].str.cat(sep="> ) ( <")+"> ) "
-
-            query = "SELECT ?value ?p ?v WHERE {VALUES (?value) {" + \
-                values + "} ?value ?p ?v FILTER(isLITERAL(?v)"
+            query = "SELECT ?value ?p ?v WHERE {VALUES (?value) {**VALUES**} ?value ?p ?v FILTER(isLITERAL(?v)"
 
             if type_filter != None:
 
@@ -93,8 +96,8 @@ def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=Fals
 
             query = query + ")}"
 
-            result_df = endpoint_wrapper(
-                query, endpoint, prefix_lookup = prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
+            result_df = endpoint_wrapper_bundled(
+                df[col], query, endpoint, prefix_lookup = prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
 
         else:
 
@@ -114,32 +117,30 @@ def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=Fals
 
                 query = query + ")}"
 
-                result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching)
+                result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
             else:
-                for uri in df[col].iteritems():
 
-                    if pd.notna(uri[1]):
+                # The single-URI lookups are sent in small batches, which 
+                # bind the URIs with a (SPARQL 1.0) filter instead of VALUES
 
-                        query = "SELECT DISTINCT ?value ?p ?v WHERE {?value ?p ?v . FILTER (?value = <" + \
-                            uri[1]+"> && (isLITERAL(?v))"
+                query = "SELECT DISTINCT ?value ?p ?v WHERE {?value ?p ?v . FILTER (**FILTER** && (isLITERAL(?v))"
 
-                        if type_filter != None:
+                if type_filter != None:
 
-                            query = query + type_filter_str
+                    query = query + type_filter_str
 
-                        if regex_filter != None:
+                if regex_filter != None:
 
-                            query = query + " && regex(?p, \"" + regex_filter + "\")"
+                    query = query + " && regex(?p, \"" + regex_filter + "\")"
 
-                        query = query+")} "
+                query = query+")} "
 
-                        result = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching)
+                with BatchLoader(query, endpoint, prefix_lookup=prefix_lookup, caching=caching, progress=progress) as loader:
 
-                        result_df = result_df.append(result)
+                    results = loader.load_many(df[col].dropna().unique())
 
-                    else:
-                        pass
+                result_df = pd.concat([result_df] + results)
 
         if result_df.empty:
 
@@ -164,7 +165,7 @@ def data_properties_generator(df, columns, endpoint=DBpedia, uri_data_model=Fals
     return df
 
 
-def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, prefix="", regex_filter=None, result_type="boolean", bundled_mode=True, hierarchy=False, prefix_lookup=False, caching=True):
+def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, prefix="", regex_filter=None, result_type="boolean", bundled_mode=True, hierarchy=False, prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Generator that takes a dataset with (a) link(s) to a knowledge graph and
     queries the type(s) of the linked ressources (using rdf:type). The
     resulting types are added as new columns, which are filled either with a
@@ -204,6 +205,12 @@ def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, p
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Returns dataframe with (a) new column(s) containing the 
@@ -234,11 +241,8 @@ def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, p
 
         if bundled_mode and not uri_data_model:
 
-            values = " ( <"+df[column].str.cat(sep="> ) ( <")+"> ) "
-
             query = prefix + \
-                " SELECT DISTINCT ?value ?types WHERE {VALUES (?value) {" + \
-                values+"} ?value rdf:type ?types . "
+                " SELECT DISTINCT ?value ?types WHERE {VALUES (?value) {**VALUES**} ?value rdf:type ?types . "
 
             if regex_filter != None:
                 
@@ -248,8 +252,8 @@ def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, p
 
             query = query+"}"
 
-            result_df = endpoint_wrapper(
-                query, endpoint, prefix_lookup = prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
+            result_df = endpoint_wrapper_bundled(
+                df[column], query, endpoint, prefix_lookup = prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
 
         else:
 
@@ -268,37 +272,34 @@ def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, p
 
                 query = query+"}"
 
-                result_df = uri_querier(df, column, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching)
+                result_df = uri_querier(df, column, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
             else:
 
-                for uri in df[column].iteritems():
-
-                    if pd.notna(uri[1]):
+                # The single-URI lookups are sent in small batches, which 
+                # bind the URIs with a (SPARQL 1.0) filter instead of VALUES
 
-                        query = prefix + \
-                            " SELECT DISTINCT ?value ?types WHERE {?value rdf:type ?types . FILTER (?value = <" + \
-                            uri[1]+">"
+                query = prefix + \
+                    " SELECT DISTINCT ?value ?types WHERE {?value rdf:type ?types . FILTER (**FILTER**"
 
-                        if regex_filter != None:
+                if regex_filter != None:
 
-                            query = query + " && ("+regex_string_generator("?types", regex_filter)+")" 
+                    query = query + " && ("+regex_string_generator("?types", regex_filter)+")" 
 
-                        query = query+") }"
+                query = query+") }"
 
-                        result = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching)
+                with BatchLoader(query, endpoint, prefix_lookup=prefix_lookup, caching=caching, progress=progress) as loader:
 
-                        result_df = result_df.append(result)
+                    results = loader.load_many(df[column].dropna().unique())
 
-                    else:
-                        pass
+                result_df = pd.concat([result_df] + results)
 
             result_df = result_df.rename(
                 {"callret-0": "value"}, axis="columns").drop_duplicates().reset_index(drop=True)
 
         if hierarchy:
             hierarchy_col = hierarchy_graph_generator(
-                result_df["types"], hierarchy_relation="http://www.w3.org/2000/01/rdf-schema#subClassOf", max_hierarchy_depth=None, endpoint=endpoint, uri_data_model=uri_data_model, progress=progress, caching=caching)
+                result_df["types"], hierarchy_relation="http://www.w3.org/2000/01/rdf-schema#subClassOf", max_hierarchy_depth=None, endpoint=endpoint, uri_data_model=uri_data_model, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
             hierarchyGraph = nx.compose(hierarchyGraph, hierarchy_col)
 
@@ -396,7 +397,7 @@ def direct_type_generator(df, columns, endpoint=DBpedia, uri_data_model=False, p
 def unqualified_relation_generator(
     df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, 
     prefix="Link", direction="Out", regex_filter=None, result_type="boolean",
-    prefix_lookup=False, caching=True):
+    prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Unqualified relation generator creates attributes from the existence of 
     relations and adds boolean, counts, relative counts or tfidf-values features
     for incoming and outgoing relations.
@@ -431,6 +432,12 @@ def unqualified_relation_generator(
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Dataframe with new columns containing the links of 
@@ -454,15 +461,13 @@ def unqualified_relation_generator(
 
         if not uri_data_model: 
 
-            values = " ( <"+df[col].str.cat(sep="> ) ( <")+"> ) "
-
             if direction == "Out":
 
-                query = "SELECT DISTINCT ?value ?p ?o WHERE {VALUES (?value) {" + values + "} ?value ?p ?o "
+                query = "SELECT DISTINCT ?value ?p ?o WHERE {VALUES (?value) {**VALUES**} ?value ?p ?o "
 
             elif direction == "In": 
 
-                query = "SELECT DISTINCT ?value ?p ?s WHERE {VALUES (?value) {" + values + "} ?s ?p ?value "
+                query = "SELECT DISTINCT ?value ?p ?s WHERE {VALUES (?value) {**VALUES**} ?s ?p ?value "
 
             if regex_filter != None:
 
@@ -472,7 +477,7 @@ def unqualified_relation_generator(
 
             query = query+"}"
 
-            result_df = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)  
+            result_df = endpoint_wrapper_bundled(df[col], query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)  
 
         else:
 
@@ -492,7 +497,7 @@ def unqualified_relation_generator(
 
             query = query+"}"
 
-            result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching) 
+            result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget) 
 
     if type(result_df) != type(pd.DataFrame()):
 
@@ -519,7 +524,7 @@ def qualified_relation_generator(
     df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, 
     prefix="Link", direction="Out", properties_regex_filter=None, 
     types_regex_filter=None, result_type="boolean", hierarchy=False, 
-    prefix_lookup=False, caching=True):
+    prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Qualified relation generator considers not only relations, but also the 
     related types, adding boolean, counts, relative counts or tfidf-values 
     features for incoming and outgoing relations.
@@ -559,6 +564,12 @@ def qualified_relation_generator(
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Dataframe with new columns containing the links of properties to the knowledge graph
@@ -584,15 +595,13 @@ def qualified_relation_generator(
 
         if not uri_data_model:
 
-            values = " ( <"+df[col].str.cat(sep="> ) ( <")+"> ) "
-
             if direction == "Out":
 
-                query = "SELECT ?value ?p ?o ?type WHERE {VALUES (?value) {" + values + "} ?value ?p ?o. ?o rdf:type ?type. "
+                query = "SELECT ?value ?p ?o ?type WHERE {VALUES (?value) {**VALUES**} ?value ?p ?o. ?o rdf:type ?type. "
 
             elif direction == "In": 
 
-                query = "SELECT ?value ?p ?s ?type WHERE {VALUES (?value) {" + values + "} ?s ?p ?value. ?s rdf:type ?type. "
+                query = "SELECT ?value ?p ?s ?type WHERE {VALUES (?value) {**VALUES**} ?s ?p ?value. ?s rdf:type ?type. "
 
             if properties_regex_filter != None:
 
@@ -608,7 +617,7 @@ def qualified_relation_generator(
 
             query = query+"}"
 
-            result_df = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
+            result_df = endpoint_wrapper_bundled(df[col], query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates().reset_index(drop=True)
 
         else:
 
@@ -634,7 +643,7 @@ def qualified_relation_generator(
 
             query = query+"}"
 
-            result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching) 
+            result_df = uri_querier(df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget) 
 
     if type(result_df) != type(pd.DataFrame()):
 
@@ -647,7 +656,7 @@ def qualified_relation_generator(
     else:
         if hierarchy:
 
-            hierarchy_col = hierarchy_graph_generator(result_df["type"], hierarchy_relation="http://www.w3.org/2000/01/rdf-schema#subClassOf",max_hierarchy_depth=None, endpoint=endpoint, uri_data_model=uri_data_model, progress=progress, caching=caching)
+            hierarchy_col = hierarchy_graph_generator(result_df["type"], hierarchy_relation="http://www.w3.org/2000/01/rdf-schema#subClassOf",max_hierarchy_depth=None, endpoint=endpoint, uri_data_model=uri_data_model, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
             hierarchyGraph = nx.compose(hierarchyGraph, hierarchy_col)
 
@@ -673,7 +682,7 @@ def qualified_relation_generator(
 def specific_relation_generator(
     df, columns, endpoint=DBpedia, uri_data_model=False, progress=True, 
     direct_relation="http://purl.org/dc/terms/subject", 
-    hierarchy_relation=None, max_hierarchy_depth=1, prefix_lookup=False, caching=True):
+    hierarchy_relation=None, max_hierarchy_depth=1, prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Creates attributes from a specific direct relation. Additionally, it is
     possible to append a hierarchy with a user-defined hierarchy relation.
 
@@ -705,6 +714,12 @@ def specific_relation_generator(
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: The dataframe with additional features.
@@ -735,14 +750,13 @@ def specific_relation_generator(
 
         if not uri_data_model:
             # Create Sparql Query
-            values = "(<"+df[col].str.cat(sep=">) (<")+">) "
             query = "SELECT  ?value ?object "
-            query += " WHERE {VALUES (?value) {" + values 
+            query += " WHERE {VALUES (?value) {**VALUES**"
             query += "} ?value (<" + direct_relation + ">) ?object. }"
 
             # Retrieve query results from endpoint
-            query_result = endpoint_wrapper(
-                query, endpoint, prefix_lookup=prefix_lookup, caching=caching).\
+            query_result = endpoint_wrapper_bundled(
+                df[col], query, endpoint, prefix_lookup=prefix_lookup, caching=caching).\
                     drop_duplicates().reset_index(drop=True)
         else:
             # Create URI Query 
@@ -750,7 +764,7 @@ def specific_relation_generator(
             query += " ?value (<" + direct_relation + ">) ?object. }"
                 
             query_result = uri_querier(
-                df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching)
+                df, col, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
         # delete empty columns (for example when hierarchy relation returns
         # nothing)
@@ -765,7 +779,7 @@ def specific_relation_generator(
             hierarchy_col = hierarchy_graph_generator(
                 query_result["object"], hierarchy_relation=hierarchy_relation,
                 max_hierarchy_depth=max_hierarchy_depth, endpoint=endpoint, 
-                uri_data_model=uri_data_model, progress=progress, caching=caching)
+                uri_data_model=uri_data_model, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
             hierarchy = nx.compose(hierarchy, hierarchy_col)
 
         query_grouped = query_result.groupby("value")["object"].apply(list)
@@ -840,20 +854,18 @@ def custom_sparql_generator(df, link_attribute, query, endpoint=DBpedia, progres
 
     df_result = pd.DataFrame()
 
-    if progress:
-        iterator = tqdm(df.iterrows(), total=df.shape[0], desc="Row")
-    else:
-        iterator = df.iterrows()
+    queries = [re.sub(r"\*.*\*", "<" + str(link) + ">", query)
+               for link in df.iloc[:, var_index]]
+
+    # The row queries are issued concurrently, results come back in row order
 
-    for row in iterator:
+    query_results = endpoint_wrapper_many(queries, endpoint, caching=caching, progress=progress)
 
-        query_temp = re.sub(
-            r"\*.*\*", "<" + str(row[1].iloc[var_index]) + ">", query)
+    for link, query_result in zip(df.iloc[:, var_index], query_results):
 
-        df_temp = pd.DataFrame([row[1].iloc[var_index]],
-                               columns=["link_attribute"])
+        df_temp = pd.DataFrame([link], columns=["link_attribute"])
         
-        df_temp = pd.concat([df_temp,endpoint_wrapper(query_temp, endpoint, caching=caching).head(1)], axis=1)
+        df_temp = pd.concat([df_temp, query_result.head(1)], axis=1)
 
         df_result = pd.concat([df_result, df_temp],
                               ignore_index=True, sort=True)
@@ -7,6 +7,7 @@ import pandas as pd
 
 from kgextension.endpoints import DBpedia
 from kgextension.sparql_helper import endpoint_wrapper
+from kgextension.sparql_helper_helper import iterate_xml_results
 from kgextension.utilities import link_validator
 from kgextension.uri_helper import uri_querier
 
@@ -152,12 +153,12 @@ def hierarchy_query_creator(
 
 def create_graph_from_raw(
     DG, results, max_hierarchy_depth, current_level, uri_data_model):
-    """Converts the XML obtained by the endpoint wrapper into a hierarchical
-    directed graph.
+    """Converts the raw XML obtained by the endpoint wrapper (or the DataFrame
+    obtained by the uri_querier) into a hierarchical directed graph.
 
     Args:
         DG (Directed Graph): The empty or preprocessed graph to be appended.
-        results (DOM/pd.DataFrame): The raw results of the SPARQL query
+        results (bytes/pd.DataFrame): The raw results of the SPARQL query
         max_hierarchy_depth (int): The maximum number of hierarchy levels when
             the direct search is used.
         current_level (pd.Series): In case of iterative hierarchy generation
@@ -194,45 +195,40 @@ def create_graph_from_raw(
             DG = nx.compose(DG, to_append)
             current_level = results['hierarchy_selector']
 
-    # if endpoint_wrapper is used, the graph is generated from the XML data
+    # if endpoint_wrapper is used, the graph is generated from the XML data,
+    # which is streamed result by result into the edge list
     else:
-        for result_node in results.getElementsByTagName("result"):
-            for binding in result_node.getElementsByTagName("binding"):
-
-                attr_name = binding.getAttribute("name")
-
-                for childnode in binding.childNodes:    
-                    if childnode.firstChild is not None:
-                        # get the attribute name and add it as node to the graph
-                        value = childnode.firstChild.nodeValue
-                        DG.add_node(value)
-
-                        if max_hierarchy_depth:    
-                            # as long as the attribute is not the base
-                            # class/category, add an edge from the predecessing
-                            # attribute
-                                
-                            if not attr_name == "value":
-                                DG.add_edge(predecessing_value, value)
-                            predecessing_value = value
-
-                        else:
-                            if isinstance(current_level, pd.Series):
-                                current_level = list(current_level)
-                            if attr_name == "value":
-                                current_value = value
-
-                            elif attr_name == "hierarchy_selector":
-                                # add an edge from the lower hierarchy value to the
-                                # upper hierarchy value
-                                if not DG.has_edge(current_value, value):
-                                    DG.add_edge(current_value, value)
-                                    current_level += [value]
-
-                # in case of the iterative search, update the values to the current
-                # hierarchy level
-                if not max_hierarchy_depth:
-                    current_level = pd.Series(list(dict.fromkeys(current_level)))
+        for bindings in iterate_xml_results(results):
+            for attr_name, value in bindings:
+                # get the attribute name and add it as node to the graph
+                DG.add_node(value)
+
+                if max_hierarchy_depth:    
+                    # as long as the attribute is not the base
+                    # class/category, add an edge from the predecessing
+                    # attribute
+                        
+                    if not attr_name == "value":
+                        DG.add_edge(predecessing_value, value)
+                    predecessing_value = value
+
+                else:
+                    if isinstance(current_level, pd.Series):
+                        current_level = list(current_level)
+                    if attr_name == "value":
+                        current_value = value
+
+                    elif attr_name == "hierarchy_selector":
+                        # add an edge from the lower hierarchy value to the
+                        # upper hierarchy value
+                        if not DG.has_edge(current_value, value):
+                            DG.add_edge(current_value, value)
+                            current_level += [value]
+
+            # in case of the iterative search, update the values to the current
+            # hierarchy level
+            if not max_hierarchy_depth:
+                current_level = pd.Series(list(dict.fromkeys(current_level)))
     
     return DG, current_level
         
@@ -240,7 +236,7 @@ def create_graph_from_raw(
 def hierarchy_graph_generator(
     col, 
     hierarchy_relation = "http://www.w3.org/2000/01/rdf-schema#subClassOf", 
-    max_hierarchy_depth = None, endpoint = DBpedia, uri_data_model = False, progress=False, caching=True):
+    max_hierarchy_depth = None, endpoint = DBpedia, uri_data_model = False, progress=False, caching=True, max_workers=4, time_budget=None):
     """Computes a hierarchy graph from an original set of features, where 
     directed edges symbolise a hierarchy relation from subclass to superclass.
 
@@ -260,6 +256,12 @@ def hierarchy_graph_generator(
             "uri_data_model" = True). Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         nx.DirectedGraph: Graph where edges point to direct superclasses of
@@ -309,7 +311,7 @@ def hierarchy_graph_generator(
                 uri_data_model)  
             temp_frame = pd.DataFrame(current_level)
             results = uri_querier(
-                temp_frame, current_level.name, query, progress=progress, caching=caching)
+                temp_frame, current_level.name, query, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
             current_level=list()
             DG, current_level = create_graph_from_raw(
@@ -328,7 +330,7 @@ def hierarchy_graph_generator(
             if uri_data_model:
                 temp_frame = pd.DataFrame(current_level)
                 results = uri_querier(
-                    temp_frame, current_level.name, query, progress=progress, caching=caching)            
+                    temp_frame, current_level.name, query, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)            
             else:
                 results = endpoint_wrapper(query, endpoint, return_XML=True, caching=caching)
             current_level=list()
@@ -0,0 +1,38 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def create_session(pool_size=10):
+    """Creates a requests Session with a keep-alive connection pool. The
+    session negotiates gzip/deflate compressed responses, which are decoded
+    transparently.
+
+    Args:
+        pool_size (int, optional): Maximal number of connections that are kept
+            open per host. Defaults to 10.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+
+    session = requests.Session()
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"})
+
+    return session
+
+
+shared_session = create_session()
+
+"""
+Pooled session shared by the linkers and url_exists. Can also be passed to a
+RemoteEndpoint via its "session" argument, so that all requests to a host
+reuse the same connections.
+"""
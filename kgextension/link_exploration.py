@@ -5,7 +5,7 @@ from tqdm.auto import tqdm
 from kgextension.uri_helper import uri_querier
 
 
-def link_explorer(df, base_link_column, number_of_hops = 1, links_to_follow = ["owl:sameAs"], lod_sources = [], exclude_sources = [], prefix_lookup=False, progress = True, caching=True):
+def link_explorer(df, base_link_column, number_of_hops = 1, links_to_follow = ["owl:sameAs"], lod_sources = [], exclude_sources = [], prefix_lookup=False, progress = True, caching=True, max_workers=4, time_budget=None):
     """Follows the defined links starting from a base link to a certain number 
     of hops. Adds the discovered links as new columns to the dataframe.
 
@@ -36,6 +36,12 @@ def link_explorer(df, base_link_column, number_of_hops = 1, links_to_follow = ["
             True.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently. Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs; URIs that have not been started when it is
+            exhausted are skipped with a warning. If None, there is no limit.
+            Defaults to None.
             
     Returns:
         pd.DataFrame: Dataframe with a new column for each discovered link.
@@ -68,9 +74,9 @@ def link_explorer(df, base_link_column, number_of_hops = 1, links_to_follow = ["
         query = query_raw.format(str(hop),str(hop))
         
         if hop == 1:
-            df_result = uri_querier(df, base_link_column, query, prefix_lookup=prefix_lookup, caching=caching, progress=progress)
+            df_result = uri_querier(df, base_link_column, query, prefix_lookup=prefix_lookup, caching=caching, progress=progress, max_workers=max_workers, time_budget=time_budget)
         else:
-            df_result = uri_querier(df_result, "uri"+str(hop-1), query, prefix_lookup=prefix_lookup, caching=caching, progress=progress)
+            df_result = uri_querier(df_result, "uri"+str(hop-1), query, prefix_lookup=prefix_lookup, caching=caching, progress=progress, max_workers=max_workers, time_budget=time_budget)
 
         if df_result.empty:
             break
@@ -8,7 +8,7 @@ from tqdm.auto import tqdm
 from kgextension.endpoints import DBpedia
 from kgextension.linking_helper import (dll_query_resolver,
                                         spotlight_uri_extractor)
-from kgextension.sparql_helper import endpoint_wrapper, regex_string_generator
+from kgextension.sparql_helper import endpoint_wrapper_many, endpoint_wrapper_bundled, regex_string_generator, BatchLoader
 from kgextension.uri_helper import uri_querier
 from kgextension.utilities import check_uri_redirects
 
@@ -215,12 +215,9 @@ def label_linker(
 
     result_df = pd.DataFrame()
 
-    if progress:
-        iterator = tqdm(df[column].iteritems(), total=df.shape[0])
-    else:
-        iterator = df[column].iteritems()
+    queries = []
 
-    for col in iterator:
+    for col in df[column].iteritems():
 
         if not pd.isnull(col[1]):
             query = "SELECT DISTINCT ?label ?uri WHERE { ?uri "+label_property+" ?label . filter"
@@ -244,8 +241,11 @@ def label_linker(
             if max_hits:
                 query = query + " LIMIT " + str(max_hits)
 
-            result = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching)
-            result_df = result_df.append(result)
+            queries.append(query)
+
+    results = endpoint_wrapper_many(queries, endpoint, prefix_lookup=prefix_lookup, caching=caching, progress=progress)
+
+    result_df = pd.concat([result_df] + results)
 
     result_df = result_df.reset_index(drop=True)
 
@@ -347,7 +347,7 @@ def dbpedia_spotlight_linker(
 def sameas_linker(
     df, column, new_attribute_name="new_link", progress=True, endpoint=DBpedia, 
     result_filter=None, uri_data_model=False, bundled_mode=True, 
-    prefix_lookup=False, caching=True):
+    prefix_lookup=False, caching=True, max_workers=4, time_budget=None):
     """Function that takes URIs from a column of a DataFrame and queries a
     given SPARQL endpoint for ressources which are connected to these URIs via
     owl:sameAs. Found ressources are added as new columns to the dataframe and
@@ -381,6 +381,12 @@ def sameas_linker(
                         Defaults to False.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Returns dataframe with (a) new column(s) containing the
@@ -391,10 +397,7 @@ def sameas_linker(
 
     if bundled_mode and not uri_data_model:
 
-        values = " ( <"+df[column].str.cat(sep="> ) ( <")+"> ) "
-
-        query = " SELECT DISTINCT ?value ?sameas_uris WHERE {VALUES (?value) {" + \
-            values+"} ?value owl:sameAs ?sameas_uris . "
+        query = " SELECT DISTINCT ?value ?sameas_uris WHERE {VALUES (?value) {**VALUES**} ?value owl:sameAs ?sameas_uris . "
 
         if result_filter != None:
 
@@ -403,8 +406,8 @@ def sameas_linker(
 
         query = query+"}"
 
-        result_df = endpoint_wrapper(
-            query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates()
+        result_df = endpoint_wrapper_bundled(
+            df[column], query, endpoint, prefix_lookup=prefix_lookup, caching=caching).drop_duplicates()
 
     else:
 
@@ -423,37 +426,28 @@ def sameas_linker(
             query = query+"}"
 
             result_df = uri_querier(
-                df, column, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching)
+                df, column, query, prefix_lookup=prefix_lookup, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
 
         else:
 
-            if progress:
-                iterator = tqdm(df[column].iteritems(), total=df.shape[0])
-            else:
-                iterator = df[column].iteritems()
-
-            for uri in iterator:
-
-                if pd.isna(uri[1]):
+            # The single-URI lookups are sent in small batches, which bind
+            # the URIs with a (SPARQL 1.0) filter instead of VALUES
 
-                    pass
+            query = " SELECT DISTINCT ?value ?sameas_uris WHERE {?value owl:sameAs ?sameas_uris. FILTER (**FILTER**"
 
-                else:
-
-                    query = " SELECT DISTINCT ?value ?sameas_uris WHERE {?value owl:sameAs ?sameas_uris. FILTER (?value = <"+uri[
-                        1]+">"
+            if result_filter != None:
 
-                    if result_filter != None:
+                query = query + \
+                    " && ("+regex_string_generator("?sameas_uris",
+                                                   result_filter)+")"
 
-                        query = query + \
-                            " && ("+regex_string_generator("?sameas_uris",
-                                                           result_filter)+")"
+            query = query+") }"
 
-                    query = query+") }"
+            with BatchLoader(query, endpoint, prefix_lookup=prefix_lookup, caching=caching, progress=progress) as loader:
 
-                    result = endpoint_wrapper(query, endpoint, prefix_lookup=prefix_lookup, caching=caching)
+                results = loader.load_many(df[column].dropna().unique())
 
-                    result_df = result_df.append(result)
+            result_df = pd.concat([result_df] + results)
 
         result_df = result_df.rename(
             {"callret-0": "value"}, axis="columns").drop_duplicates().reset_index(drop=True)
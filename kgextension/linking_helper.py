@@ -1,13 +1,15 @@
+import warnings
 import pandas as pd
 from lxml import etree
 import numpy as np
 import requests
 import spotlight
 from urllib.error import HTTPError
-from functools import lru_cache
+from kgextension.cache_backend_helper import cached, negative_cache
+from kgextension.http_helper import shared_session
 
 
-@lru_cache(maxsize=None)
+@cached("dll_query_resolver")
 def dll_query_resolver(query_link, maxHits):
     """Resolves a query link for the DBpedia Lookup API to a series of the URIs 
     returned for that query.
@@ -18,7 +20,9 @@ def dll_query_resolver(query_link, maxHits):
             API.
     
     Returns:
-        pd.Series: Containing the URIs as strings.
+        pd.Series: Containing the URIs as strings. If the request fails, or
+        failed recently according to the negative cache, maxHits NaNs are 
+        returned.
     """
     
     # Check if query_link is empty
@@ -29,9 +33,39 @@ def dll_query_resolver(query_link, maxHits):
     
     else:
 
+        # If the request failed recently, it isn't sent again until the entry
+        # of the negative cache expires
+
+        if negative_cache.check("dll", query_link) is not None:
+
+            return pd.Series([np.nan] * maxHits)
+
         # Parse XML file from the provided link.
 
-        root = etree.fromstring(requests.get(query_link).content)
+        try:
+
+            response = shared_session.get(query_link)
+
+            response.raise_for_status()
+
+            root = etree.fromstring(response.content)
+
+        except (requests.exceptions.RequestException, etree.XMLSyntaxError) as exception:
+
+            if isinstance(exception, etree.XMLSyntaxError):
+                category = "unparsable"
+            elif isinstance(exception, requests.exceptions.Timeout):
+                category = "timeout"
+            elif isinstance(exception, requests.exceptions.HTTPError):
+                category = "http_error"
+            else:
+                category = "unreachable"
+
+            negative_cache.record("dll", query_link, category, exception)
+
+            warnings.warn("The DBpedia Lookup request " + query_link + " failed: " + str(exception))
+
+            return pd.Series([np.nan] * maxHits)
       
         # Converte the located URIs to string and add them to a list.
 
@@ -54,7 +88,7 @@ def dll_query_resolver(query_link, maxHits):
         return pd.Series(results_as_str)
 
 
-@lru_cache(maxsize=None)
+@cached("spotlight_uri_extractor")
 def spotlight_uri_extractor(entry, link, max_hits=1, selection="first", confidence=0.5, support=20,
                             min_similarity_score=0.8):
     """Finds linked DBPedia entities of a string and returns them as a list.
@@ -0,0 +1,291 @@
+import bz2
+import gzip
+import io
+import itertools
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import BNode, util
+from rdflib.plugins.parsers.nquads import NQuadsParser
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+
+
+# formats with one triple (or quad) per line, which can be split anywhere
+# between two lines
+
+LINE_FORMATS = ("nt", "nt11", "ntriples", "nquads")
+
+_COMPRESSIONS = {".gz": gzip.open, ".bz2": bz2.open}
+
+
+def guess_file_format(file_path):
+    """Guesses the RDF format of a file from its extension; the extension of
+    a compression (.gz or .bz2) is skipped, e.g. "dump.nt.bz2" is "nt".
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        str: The rdflib format, None if it's unknown.
+    """
+
+    root, extension = os.path.splitext(file_path)
+
+    if extension.lower() in _COMPRESSIONS:
+        file_path = root
+
+    return util.guess_format(file_path)
+
+
+def open_dump(file_path):
+    """Opens a file for reading bytes, which are decompressed on the fly if
+    the file is compressed (.gz or .bz2).
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        file: The binary file object.
+    """
+
+    opener = _COMPRESSIONS.get(os.path.splitext(file_path)[1].lower(), open)
+
+    return opener(file_path, "rb")
+
+
+class _BlankNodeLabels(dict):
+    """Blank node context of the parser, which maps every label of a file to
+    the same blank node in all chunks (the chunks are parsed independently,
+    possibly in different processes).
+    """
+
+    def __init__(self, prefix):
+
+        super().__init__()
+
+        self.prefix = prefix
+
+    def get(self, label, default=None):
+
+        return BNode(self.prefix + label)
+
+
+class _TripleSink():
+    """Collects the triples of a chunk; for N-Quads, it is also the graph of
+    every context, i.e. the graph names are dropped. Equal terms are shared,
+    so that each is pickled only once per chunk.
+    """
+
+    def __init__(self):
+
+        self.triples = []
+        self.default_context = self
+        self._terms = {}
+
+    def triple(self, s, p, o):
+
+        self.add((s, p, o))
+
+    def add(self, triple):
+
+        self.triples.append(tuple(self._terms.setdefault(term, term) for term in triple))
+
+    def get_context(self, identifier):
+
+        return self
+
+
+def _parse_chunk(chunk, file_format, bnode_prefix):
+    """Parses a chunk of complete lines.
+
+    Args:
+        chunk (bytes/tuple): The lines, or the path, start and end offset of
+            the lines in an uncompressed file.
+        file_format (str): One of LINE_FORMATS.
+        bnode_prefix (str): Prefix of the blank nodes of the file.
+
+    Returns:
+        list: The triples.
+    """
+
+    if isinstance(chunk, tuple):
+
+        file_path, start, end = chunk
+
+        with open(file_path, "rb") as file:
+
+            file.seek(start)
+
+            chunk = file.read(end - start)
+
+    sink = _TripleSink()
+
+    parser = NQuadsParser(sink=sink) if file_format == "nquads" else W3CNTriplesParser(sink=sink)
+
+    # NQuadsParser.parse expects a whole document, its line parser is used
+    # via the N-Triples loop
+
+    W3CNTriplesParser.parse(parser, io.StringIO(chunk.decode("utf-8")), bnode_context=_BlankNodeLabels(bnode_prefix))
+
+    return sink.triples
+
+
+def _file_ranges(file_path, chunk_size):
+    """Splits an uncompressed file into byte ranges of about "chunk_size"
+    bytes, which end at line breaks.
+
+    Yields:
+        tuple: Path, start and end offset of each range.
+    """
+
+    size = os.path.getsize(file_path)
+
+    with open(file_path, "rb") as file:
+
+        start = 0
+
+        while start < size:
+
+            file.seek(min(start + chunk_size, size) - 1)
+            file.readline()
+
+            end = min(file.tell(), size)
+
+            yield (file_path, start, end)
+
+            start = end
+
+
+def _stream_blocks(file_path, chunk_size):
+    """Reads a (compressed) file in blocks of about "chunk_size" bytes, which
+    end at line breaks.
+
+    Yields:
+        bytes: The blocks.
+    """
+
+    with open_dump(file_path) as file:
+
+        rest = b""
+
+        while True:
+
+            block = file.read(chunk_size)
+
+            if not block:
+
+                if rest:
+                    yield rest
+
+                return
+
+            block = rest + block
+
+            # If the block holds no complete line, it is extended by the next
+
+            cut = block.rfind(b"\n") + 1
+
+            rest = block[cut:]
+
+            if cut:
+                yield block[:cut]
+
+
+def iterate_triples(file_path, file_format="nt", processes=None, chunk_size=16777216):
+    """Parses an N-Triples or N-Quads file in parallel: the file is split into
+    chunks of complete lines, which are parsed in a process pool. Compressed
+    files (.gz or .bz2) are decompressed as a stream and handed out in
+    blocks. At most two chunks per process are pending at a time, so the
+    memory doesn't grow with the size of the file.
+
+    Args:
+        file_path (str): Path of the (compressed) file.
+        file_format (str, optional): One of LINE_FORMATS. Defaults to "nt".
+        processes (int, optional): Number of worker processes, None for one
+            per CPU core. With one process (or a file of a single chunk), the
+            file is parsed in the calling process. Defaults to None.
+        chunk_size (int, optional): Size of the chunks in bytes. Defaults to
+            16777216 (16 MiB).
+
+    Raises:
+        ValueError: Raised if the format isn't line-based.
+
+    Yields:
+        tuple: The triples in the order of the file; the graph names of
+        N-Quads are dropped.
+    """
+
+    if file_format not in LINE_FORMATS:
+        raise ValueError("The format " + str(file_format) + " can't be split into chunks, try one of " + ", ".join(LINE_FORMATS) + ".")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    # blank node labels are scoped to the file, so they are prefixed with an
+    # identifier of this load
+
+    bnode_prefix = uuid.uuid4().hex + "_"
+
+    if os.path.splitext(file_path)[1].lower() in _COMPRESSIONS:
+        chunks = _stream_blocks(file_path, chunk_size)
+    else:
+        chunks = _file_ranges(file_path, chunk_size)
+
+    first_chunks = list(itertools.islice(chunks, 2))
+
+    chunks = itertools.chain(first_chunks, chunks)
+
+    if processes == 1 or len(first_chunks) < 2:
+
+        for chunk in chunks:
+            yield from _parse_chunk(chunk, file_format, bnode_prefix)
+
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+
+        pending = deque()
+
+        for chunk in chunks:
+
+            pending.append(executor.submit(_parse_chunk, chunk, file_format, bnode_prefix))
+
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_file(graph, file_path, file_format="auto", processes=None):
+    """Loads a (compressed) RDF file into a graph. N-Triples and N-Quads are
+    parsed in parallel, see iterate_triples; other formats are parsed by
+    rdflib.
+
+    Args:
+        graph (rdflib.Graph): The graph, e.g. backed by a SQLiteTripleStore.
+        file_path (str): Path of the file.
+        file_format (str, optional): Format of the file, "auto" guesses it
+            from the extension. Defaults to "auto".
+        processes (int, optional): Number of worker processes for line-based
+            formats, None for one per CPU core. Defaults to None.
+    """
+
+    if file_format == "auto":
+        file_format = guess_file_format(file_path)
+
+    if file_format in LINE_FORMATS:
+
+        for triple in iterate_triples(file_path, file_format, processes):
+            graph.add(triple)
+
+    elif os.path.splitext(file_path)[1].lower() in _COMPRESSIONS:
+
+        with open_dump(file_path) as file:
+            graph.parse(file, format=file_format)
+
+    else:
+
+        graph.parse(file_path, format=file_format)
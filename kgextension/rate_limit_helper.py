@@ -0,0 +1,208 @@
+import contextlib
+import json
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucket():
+    """Token bucket that refills continuously at a fixed rate. The state is
+    either kept in memory or, to coordinate several processes, in a shared
+    JSON file.
+    """
+
+    def __init__(self, rate, capacity, name="default", persistence_file_path=None):
+        """Configuration of a token bucket. The bucket starts full.
+
+        Args:
+            rate (float): Number of tokens that are added per second.
+            capacity (float): Maximal number of tokens in the bucket, i.e. the
+                allowed burst.
+            name (str, optional): Name of the bucket within the persistence
+                file. Defaults to "default".
+            persistence_file_path (str, optional): Path of a file that is
+                shared by all processes that should draw from the same bucket.
+                The file is locked while it is updated (POSIX only, on other
+                platforms the updates are not locked). If None, the bucket is
+                only kept in memory. Defaults to None.
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.persistence_file_path = persistence_file_path
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, updated, now, cost, wait):
+        """Refills the bucket and takes "cost" tokens out of it, if possible.
+
+        Returns:
+            tuple: New number of tokens and the time (in seconds) to wait
+            before the tokens are available (0 if they were taken).
+        """
+
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        if wait and tokens < cost:
+
+            return tokens, (cost - tokens) / self.rate
+
+        return tokens - cost, 0
+
+    def _update(self, cost, wait):
+        """Updates the bucket state in memory or in the persistence file.
+
+        Returns:
+            float: Time (in seconds) to wait before the tokens are available, 0
+            if they were taken.
+        """
+
+        if self.persistence_file_path is None:
+
+            with self._lock:
+
+                now = time.monotonic()
+
+                self._tokens, wait_time = self._take(self._tokens, self._updated, now, cost, wait)
+                self._updated = now
+
+            return wait_time
+
+        # the wall clock is used, since the file is shared between processes
+
+        with self._lock, open(self.persistence_file_path, "a+") as file:
+
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+
+            try:
+
+                file.seek(0)
+
+                content = file.read()
+
+                buckets = json.loads(content) if content else {}
+
+                now = time.time()
+
+                tokens, updated = buckets.get(self.name, (self.capacity, now))
+
+                tokens, wait_time = self._take(tokens, updated, now, cost, wait)
+
+                buckets[self.name] = (tokens, now)
+
+                file.seek(0)
+                file.truncate()
+                json.dump(buckets, file)
+                file.flush()
+
+            finally:
+
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+            return wait_time
+
+    def acquire(self, cost=1):
+        """Blocks until "cost" tokens are available and takes them. With a
+        cost of 0, it waits until the bucket is no longer in debt.
+
+        Args:
+            cost (float, optional): Number of tokens to take. Defaults to 1.
+        """
+
+        while True:
+
+            wait_time = self._update(cost, True)
+
+            if wait_time <= 0:
+                return
+
+            time.sleep(wait_time)
+
+    def charge(self, cost):
+        """Takes "cost" tokens without waiting; the bucket may go into debt,
+        which delays later calls of "acquire".
+
+        Args:
+            cost (float): Number of tokens to take.
+        """
+
+        self._update(cost, False)
+
+
+class RateLimiter():
+    """Rate limiter for a RemoteEndpoint, which limits the number of requests
+    per minute and optionally the processing time per minute. The processing
+    time is charged by the measured latency of the requests.
+    """
+
+    def __init__(self, requests_per_min, processing_time_per_min=None, name="default", persistence_file_path=None):
+        """Configuration of the rate limiter.
+
+        Args:
+            requests_per_min (int): Maximal number of requests per minute.
+            processing_time_per_min (float, optional): Maximal processing time
+                (in seconds) that the requests may take per minute, e.g. 60 for
+                WikiData. If None, the processing time is not limited. Defaults
+                to None.
+            name (str, optional): Name of the limiter within the persistence
+                file, e.g. the URL of the endpoint. Defaults to "default".
+            persistence_file_path (str, optional): Path of a file to share the
+                limits between processes, see TokenBucket. If None, the limits
+                are kept in memory. Defaults to None.
+        """
+
+        self.requests_per_min = requests_per_min
+        self.processing_time_per_min = processing_time_per_min
+
+        self.request_bucket = TokenBucket(requests_per_min / 60, requests_per_min, name + " requests", persistence_file_path)
+
+        if processing_time_per_min is not None:
+            self.processing_time_bucket = TokenBucket(processing_time_per_min / 60, processing_time_per_min, name + " processing time", persistence_file_path)
+        else:
+            self.processing_time_bucket = None
+
+    def acquire(self):
+        """Waits until a request is allowed, i.e. takes a request token and
+        waits until the processing time budget isn't in debt.
+        """
+
+        self.request_bucket.acquire(1)
+
+        if self.processing_time_bucket is not None:
+            self.processing_time_bucket.acquire(0)
+
+    @contextlib.contextmanager
+    def measure(self):
+        """Context manager around a request that was allowed by "acquire":
+        charges its latency to the processing time budget.
+        """
+
+        started = time.monotonic()
+
+        try:
+            yield
+
+        finally:
+
+            if self.processing_time_bucket is not None:
+                self.processing_time_bucket.charge(time.monotonic() - started)
+
+    @contextlib.contextmanager
+    def limit(self):
+        """Context manager around a single request: waits until the request
+        is allowed and charges its latency to the processing time budget, see
+        "acquire" and "measure".
+        """
+
+        self.acquire()
+
+        with self.measure():
+            yield
@@ -0,0 +1,181 @@
+import collections
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+
+class SPARQLQueryError(RuntimeError):
+    """Raised when a SPARQL endpoint could not answer a query.
+    """
+
+    def __init__(self, message, url=None, attempts=0):
+
+        super().__init__(message)
+
+        self.url = url
+        self.attempts = attempts
+
+
+class RetriesExhaustedError(SPARQLQueryError):
+    """Raised when a query still fails after all retries of the endpoint's
+    RetryPolicy have been used up.
+    """
+    pass
+
+
+class ErrorBudgetExceededError(SPARQLQueryError):
+    """Raised when a query fails while the error budget of the endpoint's
+    RetryPolicy is exhausted, i.e. too many queries failed within the budget
+    period. No further retries are made, to avoid being banned by the
+    endpoint.
+    """
+    pass
+
+
+def parse_retry_after(value):
+    """Parses the value of a Retry-After HTTP header.
+
+    Args:
+        value (str): Header value, either a number of seconds or a HTTP date.
+
+    Returns:
+        float: Number of seconds to wait, None if the value can't be parsed.
+    """
+
+    if value is None:
+
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+
+        return float(value)
+
+    try:
+
+        retry_date = email.utils.parsedate_to_datetime(value)
+
+    except (TypeError, ValueError):
+
+        return None
+
+    if retry_date is None:
+
+        return None
+
+    return max(0.0, retry_date.timestamp() - time.time())
+
+
+class RetryPolicy():
+    """Decides if and when a failed query to a RemoteEndpoint is retried.
+    """
+
+    def __init__(self, retries=10, backoff_factor=1, max_backoff=60, retry_statuses=(429, 500, 502, 503, 504), error_budget=None, error_budget_period=60):
+        """Configuration of the retry behaviour of an endpoint. Failed queries
+        are retried after an exponentially growing, randomized delay; if the
+        endpoint sends a Retry-After header with a 429 or 503 response, its
+        value is used instead. Each RemoteEndpoint should have its own
+        RetryPolicy, as the error budget is kept per policy.
+
+        Args:
+            retries (int, optional): Defines the number of times a query is
+                retried. Defaults to 10.
+            backoff_factor (float, optional): Upper bound of the delay (in
+                seconds) before the first retry; it doubles with every further
+                retry. Defaults to 1.
+            max_backoff (float, optional): Maximal delay (in seconds) between
+                two attempts, unless the endpoint asks for a longer one via
+                Retry-After. Defaults to 60.
+            retry_statuses (tuple, optional): HTTP status codes that are
+                retried. Connection errors and timeouts are always retried,
+                other HTTP errors are not. Defaults to (429, 500, 502, 503,
+                504).
+            error_budget (int, optional): Maximal number of failed queries
+                within "error_budget_period" seconds, e.g. 30 for WikiData. If
+                exceeded, failing queries are not retried anymore. If None,
+                there is no budget. Defaults to None.
+            error_budget_period (float, optional): Period (in seconds) of the
+                error budget. Defaults to 60.
+        """
+
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.error_budget = error_budget
+        self.error_budget_period = error_budget_period
+        self._errors = collections.deque()
+        self._lock = threading.Lock()
+
+    def is_retryable(self, exception):
+        """Checks if a query that failed with the given exception should be
+        retried.
+
+        Args:
+            exception (Exception): The exception raised by the attempt.
+
+        Returns:
+            bool: True if the query should be retried.
+        """
+
+        if isinstance(exception, requests.exceptions.HTTPError):
+
+            return exception.response is not None and exception.response.status_code in self.retry_statuses
+
+        # timeouts, connection errors and broken transfers
+
+        return isinstance(exception, requests.exceptions.RequestException)
+
+    def backoff(self, attempt, exception=None):
+        """Computes the delay before the next attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting with 0.
+            exception (Exception, optional): The exception raised by the
+                attempt, used to read the Retry-After header. Defaults to
+                None.
+
+        Returns:
+            float: Delay in seconds.
+        """
+
+        response = getattr(exception, "response", None)
+
+        if response is not None and response.status_code in (429, 503):
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if retry_after is not None:
+
+                return retry_after
+
+        # "full jitter": a random delay up to the exponentially growing bound
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def record_error(self):
+        """Records a failed query in the error budget.
+
+        Returns:
+            bool: False if the error budget is exceeded, True otherwise.
+        """
+
+        if self.error_budget is None:
+
+            return True
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            while self._errors and self._errors[0] <= now - self.error_budget_period:
+
+                self._errors.popleft()
+
+            self._errors.append(now)
+
+            return len(self._errors) <= self.error_budget
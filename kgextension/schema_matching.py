@@ -17,7 +17,7 @@ from kgextension.uri_helper import uri_querier
 
 
 def relational_matching(
-    df, endpoints=[DBpedia, WikiData], uri_data_model=False, match_score=1, progress=True, caching=True):
+    df, endpoints=[DBpedia, WikiData], uri_data_model=False, match_score=1, progress=True, caching=True, max_workers=4, time_budget=None):
     """Creates a mapping of matching attributes in the schema by checking for
     owl:sameAs, owl:equivalentClass, owl:Equivalent and wdt:P1628 links between 
     them.
@@ -36,6 +36,12 @@ def relational_matching(
             "uri_data_model" = True). Defaults to True.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Two columns with matching links and a third column with
@@ -64,7 +70,7 @@ def relational_matching(
              (owl:equivalentProperty|owl:equivalentClass|owl:sameAs|wdt:P1628)\
                   ?object. }"
         temp_df = pd.DataFrame(cat_cols_stripped, columns=["values"])
-        same_cats = uri_querier(temp_df, "values", query, caching=caching, progress=progress)
+        same_cats = uri_querier(temp_df, "values", query, caching=caching, progress=progress, max_workers=max_workers, time_budget=time_budget)
 
         if same_cats.empty:
             return matches
@@ -127,7 +133,7 @@ def relational_matching(
 def string_similarity_matching(
     df, predicate="rdfs:label", to_lowercase=True, remove_prefixes=True, 
     remove_punctuation=True, similarity_metric="norm_levenshtein", 
-    prefix_threshold=1, n=2, progress=True, caching=True):
+    prefix_threshold=1, n=2, progress=True, caching=True, max_workers=4, time_budget=None):
     """Calculates the string similarity from the text field obtained by
     querying the attributes for the predicate, by default rdfs:label.
 
@@ -151,6 +157,12 @@ def string_similarity_matching(
             True.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently. Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs; URIs that have not been started when it is
+            exhausted are skipped with a warning. If None, there is no limit.
+            Defaults to None.
 
     Returns:
         pd.DataFrame: Two columns with matching links and a third column with
@@ -169,7 +181,7 @@ def string_similarity_matching(
     query += predicate +" ?o. FILTER (lang(?o) = 'en') }"
 
     labels = uri_querier(pd.DataFrame(cat_cols_stripped),
-                         0, query, progress=progress, caching=caching).set_index("value")
+                         0, query, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget).set_index("value")
 
     # Get common prefixes
 
@@ -218,7 +230,7 @@ def string_similarity_matching(
 
 def label_schema_matching(
     df, endpoint=DBpedia, uri_data_model=False, to_lowercase=True, remove_prefixes=True, 
-    remove_punctuation=True, prefix_threshold=1, progress=True, caching=True):
+    remove_punctuation=True, prefix_threshold=1, progress=True, caching=True, max_workers=4, time_budget=None):
     """A schema matching method by checking for attribute -- rdfs:label between 
     links.
 
@@ -242,6 +254,12 @@ def label_schema_matching(
             "uri_data_model" = True). Defaults to True.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Returns:
         pd.DataFrame: Two columns with matching links and a third column with the overlapped label.
@@ -262,7 +280,7 @@ def label_schema_matching(
         # Query these URIs for the label
         query = "SELECT ?value ?o WHERE {VALUES (?value) {(<**URI**>)} ?value rdfs:label ?o. FILTER (lang(?o) = 'en') }"
         labels = uri_querier(pd.DataFrame(cat_cols_stripped),
-                             0, query, progress = progress, caching=caching).drop_duplicates().set_index("value")
+                             0, query, progress = progress, caching=caching, max_workers=max_workers, time_budget=time_budget).drop_duplicates().set_index("value")
 
     else:
 
@@ -1,16 +1,30 @@
-from SPARQLWrapper import SPARQLWrapper, CSV, JSON, XML, POSTDIRECTLY, POST, __agent__
-import warnings
+from SPARQLWrapper import __agent__
 import pandas as pd
 import io
+import os
+import itertools
 import time
 import json
 import re
 import urllib.request
-from rdflib import Graph, util
-from ratelimit import limits, sleep_and_retry
-from functools import lru_cache
-
-from kgextension.sparql_helper_helper import get_initial_query_offset, get_initial_query_limit
+import requests
+import urllib3
+import threading
+import warnings
+from xml.etree import ElementTree
+from concurrent.futures import Future, ThreadPoolExecutor
+from rdflib import Graph
+from tqdm.auto import tqdm
+
+from kgextension.cache_backend_helper import cached, normalize_query, negative_cache, EntityResultCache
+from kgextension.http_helper import create_session
+from kgextension.rate_limit_helper import RateLimiter
+from kgextension.retry_helper import RetryPolicy, SPARQLQueryError, RetriesExhaustedError, ErrorBudgetExceededError
+from kgextension.ntriples_helper import LINE_FORMATS, guess_file_format, iterate_triples, load_file
+from kgextension.triple_pattern_helper import query_graph
+from kgextension.triple_store_helper import SQLiteTripleStore
+from kgextension.triple_table_helper import TripleTableStore, build_triple_table, read_table_meta
+from kgextension.sparql_helper_helper import get_initial_query_offset, get_initial_query_limit, values_clause, values_chunks, filter_clause, xml_results_to_frame, json_results_to_frame, tsv_results_to_frame
 
 
 def regex_string_generator(attribute, filters, logical_connective = "OR"):
@@ -48,6 +62,18 @@ def regex_string_generator(attribute, filters, logical_connective = "OR"):
     return regex_string    
     
 
+# HTTP statuses of queries that took too long or were too large, chunks 
+# that fail with them are split
+
+_split_statuses = (408, 413, 414, 504)
+
+_accept_headers = {
+    "XML": "application/sparql-results+xml",
+    "JSON": "application/sparql-results+json,application/json,text/javascript,application/javascript",
+    "CSV": "text/csv",
+    "TSV": "text/tab-separated-values"}
+
+
 class Endpoint():
     """Base Endpoint class.
     """
@@ -58,7 +84,7 @@ class RemoteEndpoint(Endpoint):
     """RemoteEndpoint class, that handles remote SPARQL endpoints.
     """
     
-    def __init__(self, url, timeout=60, requests_per_min = 100000, retries=10, page_size=0, supports_bundled_mode=True, persistence_file_path="rate_limits.db", agent=__agent__):
+    def __init__(self, url, timeout=60, requests_per_min = 100000, retries=10, page_size=0, supports_bundled_mode=True, persistence_file_path=None, agent=__agent__, pool_size=10, session=None, max_concurrency=4, return_format="XML", values_batch_size=500, values_batch_bytes=50000, retry_policy=None, processing_time_per_min=None):
         """Configuration of a SPARQL Endpoint.
 
         Args:
@@ -68,160 +94,248 @@ class RemoteEndpoint(Endpoint):
             requests_per_min (int, optional): Defines the maximal number of  
                 requests per minute. Defaults to 100000.
             retries (int, optional): Defines the number of times a query is 
-                retried. Defaults to 10.
+                retried. Ignored if "retry_policy" is passed. Defaults to 10.
             page_size (int, optional): Limits the page size of the results, 
                 since many endpoints have limitations. Defaults to 0.
             supports_bundled_mode (boolean, optional): If true, bundled mode 
                 will be used to query the endpoint. Defaults to True.
-            persistence_file_path (str, optional): Sets the file path for the 
-                database that keeps track of past query activities (to comply 
-                with usage policies). Defaults to "rate_limits.db".
+            persistence_file_path (str, optional): Sets the path of a file 
+                through which several processes share the query limits of the 
+                endpoint (to comply with usage policies). If None, the limits 
+                are only kept in memory. Defaults to None.
             agent (str, optional): The User-Agent for the HTTP request header. 
                 Defaults to SPARQLWrapper.__agent__.
+            pool_size (int, optional): Number of keep-alive connections that 
+                are pooled for the endpoint (at least "max_concurrency"). 
+                Ignored if "session" is passed. Defaults to 10.
+            session (requests.Session, optional): Pooled session that should 
+                be used for the requests, e.g. 
+                kgextension.http_helper.shared_session. If None, the endpoint 
+                creates its own session. Defaults to None.
+            max_concurrency (int, optional): Maximal number of queries that 
+                are sent to the endpoint in parallel. Defaults to 4.
+            return_format (str, optional): Preferred results format that is 
+                requested from the endpoint, if no format is requested 
+                explicitly ("XML", "JSON", "CSV" or "TSV"). TSV is the cheapest 
+                to transfer and parse, but not supported by every endpoint. 
+                Defaults to "XML".
+            values_batch_size (int, optional): Maximal number of URIs that are 
+                put into the VALUES clause of a single bundled query; larger 
+                URI lists are split into several queries. 0 for no maximum. 
+                Defaults to 500.
+            values_batch_bytes (int, optional): Maximal size (in bytes) of the 
+                VALUES clause of a single bundled query. 0 for no maximum. 
+                Defaults to 50000.
+            retry_policy (RetryPolicy, optional): Policy that decides if and 
+                when failed queries are retried (backoff, Retry-After, error 
+                budget). If None, a RetryPolicy with "retries" retries is 
+                used. Defaults to None.
+            processing_time_per_min (float, optional): Maximal processing time 
+                (in seconds) the queries may take per minute, measured by 
+                their latency, e.g. 60 for WikiData. If None, the processing 
+                time is not limited. Defaults to None.
         """
         
         self.url = url
         self.timeout = timeout
         self.requests_per_min = requests_per_min
-        self.retries = retries
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(retries=retries)
+        self.retries = self.retry_policy.retries
         self.page_size = page_size
         self.supports_bundled_mode = supports_bundled_mode
         self.persistence_file_path = persistence_file_path
-        self.query = sleep_and_retry(limits(calls=requests_per_min, period=60, storage=self.persistence_file_path, name='"'+url+'"')(self._query))
+        self.processing_time_per_min = processing_time_per_min
+        self.rate_limiter = RateLimiter(requests_per_min, processing_time_per_min, url, persistence_file_path)
+        self.query = self._query
         self.agent = agent
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.return_format = return_format
+        self.values_batch_size = values_batch_size
+        self.values_batch_bytes = values_batch_bytes
+        self.session = session if session is not None else create_session(max(pool_size, max_concurrency))
+
+    @property
+    def cache_key(self):
+        """str: Identifies the endpoint in the keys of cached query results.
+        """
+
+        return self.url
+
+    @property
+    def max_concurrency(self):
+        """int: Maximal number of queries that are sent to the endpoint in 
+        parallel.
+        """
+
+        return self._max_concurrency
+
+    @max_concurrency.setter
+    def max_concurrency(self, value):
+
+        self._max_concurrency = max(1, int(value))
+        self._concurrency_limit = threading.BoundedSemaphore(self._max_concurrency)
     
-    def _query(self, query, request_return_format = "XML", verbose = False, return_XML=False):
+    def _query(self, query, request_return_format = None, verbose = False, return_XML=False):
         """Function that queries a user-specified remote SPARQL endpoint with a 
         user-specified query and returnes the results as a pandas DataFrame.
         
         Args:
             query (str): Query that should be sent to the SPARQL endpoint.
             request_return_format (str, optional): Requesting a specific return 
-                format from the SPARQL endpont (str) - mainly for debugging and 
-                testing. Defaults to "XML".
+                format from the SPARQL endpont ("XML", "JSON", "CSV" or "TSV") - 
+                mainly for debugging and testing. If None, the endpoint's 
+                "return_format" is requested. Defaults to None.
             verbose (bool, optional): Set to True to let the function print 
                 additional information about the returned data - for debugging 
                 and testing. Defaults to False.
-            return_XML (bool, optional): If True it returns the XML results 
-                instead of a dataframe. Defaults to False.
+            return_XML (bool, optional): If True it returns the raw XML results 
+                (bytes) instead of a dataframe. Defaults to False.
         
         Raises:
             RuntimeError: Is returned when the returned data is neither a XML, 
-            CSV or JSON, for whatever reason.
+                CSV, TSV or JSON, for whatever reason.
+            SPARQLQueryError: Raised if the endpoint rejects the query with an 
+                HTTP error that is not retried.
+            RetriesExhaustedError: Raised if the query still fails after all 
+                retries.
+            ErrorBudgetExceededError: Raised if the query fails while the 
+                error budget of the endpoint is exhausted.
         
         Returns:
             pd.DataFrame: The query results in form of a DataFrame.
         """
 
-        retries_count = 0
+        attempt = 0
         while True:
             
             try:
-                sparql = SPARQLWrapper(self.url, agent=self.agent)
-                sparql.setRequestMethod(POSTDIRECTLY)
-                sparql.setMethod(POST)
-                sparql.setTimeout(self.timeout)
-                
-                sparql.setQuery(query)
-                return_formats = {"XML": XML, "CSV": CSV, "JSON": JSON}
+                if request_return_format is None:
+                    request_return_format = self.return_format
+
+                # Virtuoso does not accept "tsv" as format parameter, but the mime type
+
+                return_formats = {"XML": "xml", "CSV": "csv", "JSON": "json", "TSV": "text/tab-separated-values"}
                 requested_format = return_formats[request_return_format]
 
-                # Catch RuntimeWarning that is raised by SPARQLWrapper when retunred and requested format do not match.
+                # Every attempt draws from the rate limits before it takes a
+                # slot of max_concurrency, so throttled queries don't block
+                # the slots
 
-                with warnings.catch_warnings():
+                self.rate_limiter.acquire()
 
-                    warnings.filterwarnings("ignore",category=RuntimeWarning)
+                # The latency is charged to the processing time budget; the
+                # body is streamed, so the connection holds its slot until it
+                # is parsed
 
-                    # Try to query with ReturnFormat that is requested through requested_format and check which format is returned
+                with self._concurrency_limit, self.rate_limiter.measure(), self.session.post(
+                        self.url,
+                        # endpoints disagree on the name of the format 
+                        # parameter, so it is repeated
+                        params={"format": requested_format, "output": requested_format, "results": requested_format},
+                        # the query is sent directly as POST body
+                        data=query.encode("utf-8"),
+                        headers={
+                            "User-Agent": self.agent,
+                            "Accept": _accept_headers[request_return_format],
+                            "Content-Type": "application/sparql-query"},
+                        timeout=self.timeout,
+                        stream=True) as response:
 
-                    sparql.setReturnFormat(requested_format)
-                    results_raw = sparql.query()
+                    response.raise_for_status()
 
-                    returned_content_type = results_raw.info()["content-type"]
+                    returned_content_type = response.headers.get("content-type", "")
 
                     if verbose:
 
                         print(returned_content_type)
 
-                # If the returned format is XML, query with requested ReturnFormat = XML and process accordingly
+                    # If the returned format is XML, stream the bindings into per-variable columns
+
+                    if "application/sparql-results+xml" in returned_content_type:
 
-                if "application/sparql-results+xml" in returned_content_type:
+                        if return_XML:
+                            return response.content
 
-                    results = results_raw.convert()
+                        response.raw.decode_content = True
 
-                    if return_XML:
-                        return results
+                        # If the stream breaks (e.g. a truncated body or a 
+                        # read timeout), the error is raised as a requests 
+                        # error, so that the query is retried
 
-                    result_dict = {}
-                    result_index = 0
+                        try:
 
-                    for result_node in results.getElementsByTagName("result"):
+                            return xml_results_to_frame(response.raw)
 
-                        temp_result_dict = {}
+                        except urllib3.exceptions.ReadTimeoutError as e:
 
-                        for binding in result_node.getElementsByTagName("binding"):
+                            raise requests.exceptions.ConnectionError(e, response=response) from e
 
-                            attr_name = binding.getAttribute("name")
+                        except (urllib3.exceptions.HTTPError, ElementTree.ParseError) as e:
 
-                            for childnode in binding.childNodes:
+                            raise requests.exceptions.ChunkedEncodingError(e, response=response) from e
 
-                                if childnode.firstChild is not None:
-                                    value = childnode.firstChild.nodeValue
-                                    temp_result_dict.update({attr_name: value})
+                    # If the returned format is JSON, decode the (already 
+                    # received) document column by column
 
+                    elif "application/sparql-results+json" in returned_content_type:
 
-                        result_dict[result_index] = temp_result_dict
+                        return json_results_to_frame(response.json())
 
-                        result_index += 1
+                    # If the returned format is TSV, decode the RDF terms column-wise
 
-                    return pd.DataFrame.from_dict(result_dict, orient="index")
+                    elif "text/tab-separated-values" in returned_content_type:
 
-                # If the returned format is JSON, query with requested ReturnFormat = JSON and process accordingly
+                        return tsv_results_to_frame(response.content)
 
-                elif "application/sparql-results+json" in returned_content_type:
+                    # If the returned format is CSV, query with requested ReturnFormat = CSV and process accordingly
 
-                    results = sparql.query().convert()
+                    elif "text/csv" in returned_content_type:
 
-                    results_df = pd.DataFrame(results["results"]["bindings"])
-                    results_df = results_df.applymap(lambda x: x["value"])
+                        results = io.BytesIO(response.content)
 
-                    return results_df
+                        return pd.read_csv(results, delimiter=",", dtype=str)
 
-                # If the returned format is CSV, query with requested ReturnFormat = CSV and process accordingly
+                    # If the returned format is neither XML, CSV, TSV or JSON, raise RuntimeError
 
-                elif "text/csv" in returned_content_type:
+                    else:
 
-                    results = results_raw.convert()
+                        raise RuntimeError("The results format returned by the SPARQL endpoint ("+returned_content_type+") is not supported!")
 
-                    results = io.BytesIO(results)
+            except Exception as e: 
 
-                    return pd.read_csv(results, delimiter=",", dtype=str)
+                within_budget = self.retry_policy.record_error()
 
-                # If the returned format is neither XML, CSV or JSON, raise RuntimeError
+                if not self.retry_policy.is_retryable(e):
 
-                else:
+                    if isinstance(e, requests.exceptions.HTTPError):
+                        raise SPARQLQueryError("The SPARQL endpoint "+self.url+" rejected the query: "+str(e), self.url, attempt+1) from e
 
-                    raise RuntimeError("The results format returned by the SPARQL endpoint ("+returned_content_type+") is not supported!")
-                
-                break
-                
-            except Exception as e: 
-                
-                retries_count+=1
-                if retries_count > self.retries:
-                    print(e)
-                    break
-                time.sleep(1)
+                    raise
+
+                if not within_budget:
+                    raise ErrorBudgetExceededError("The error budget of the SPARQL endpoint "+self.url+" is exhausted, the query is not retried: "+str(e), self.url, attempt+1) from e
+
+                if attempt >= self.retry_policy.retries:
+                    raise RetriesExhaustedError("The query to the SPARQL endpoint "+self.url+" failed after "+str(attempt+1)+" attempts: "+str(e), self.url, attempt+1) from e
+
+                # the delay is waited outside of the concurrency limit, so other queries can proceed
+
+                time.sleep(self.retry_policy.backoff(attempt, e))
+
+                attempt += 1
 
 
 class LocalEndpoint(Endpoint):
     """LocalEndpoint class, that handles access to local RDF files.
     """
 
-    def __init__(self, file_path, file_format = "auto"):
+    def __init__(self, file_path, file_format = "auto", typed_literals = False, store_path = None, engine = "sqlite", processes = None):
         """Class to allow working with local RDF files. Turns the local file
         into a LocalEndpoint. Should support: html, hturtle, mdata, microdata
-        n3, nquads, nt, rdfa, rdfa1.0, rdfa1.1, trix, turtle, xml.
+        n3, nquads, nt, rdfa, rdfa1.0, rdfa1.1, trix, turtle, xml. Files
+        compressed with gzip or bzip2 (.gz or .bz2) are decompressed while
+        they are loaded.
 
         Args:
             file_path (str): Path of the local RDF file.
@@ -230,35 +344,238 @@ class LocalEndpoint(Endpoint):
                 automatically determine the format. For more info see: 
                 https://rdflib.readthedocs.io/en/stable/plugin_parsers.html  
                 Defaults to "auto".
+            typed_literals (bool, optional): If True, literals in the query 
+                results are converted according to their datatypes (e.g. 
+                xsd:integer into numbers) instead of inferring the column 
+                types from their texts. Defaults to False.
+            store_path (str, optional): Path of a persistent store, see 
+                "engine". If set, the data is loaded into this store instead 
+                of into memory; later initializations open the store without
+                parsing the file again. If one of the files in the store was
+                modified, the store is rebuilt. If None, the data is kept in 
+                memory. Defaults to None.
+            engine (str, optional): Type of the persistent store: "sqlite" 
+                for a SQLiteTripleStore (a database file, which supports fast
+                appends) or "table" for a memory-mapped TripleTable (a 
+                directory of arrays, which answers the generator queries 
+                fastest and is shared between processes, but is rebuilt on 
+                appends). Defaults to "sqlite".
+            processes (int, optional): Number of processes that parse 
+                N-Triples and N-Quads files in parallel, None for one per CPU
+                core. Defaults to None.
+
+        Raises:
+            ValueError: Raised if the engine is unknown.
         """
+
+        if engine not in ("sqlite", "table"):
+
+            raise ValueError("Unknown engine " + str(engine) + ", try \"sqlite\" or \"table\".")
   
         #if is_local_file:
         
         self.file_path = file_path
         self.file_format = file_format
+        self.typed_literals = typed_literals
+        self.store_path = store_path
+        self.engine = engine
+        self.processes = processes
+        self.appended = []
+
+    @property
+    def cache_key(self):
+        """tuple: Identifies the local file (path, format and modification 
+        time), the appended files and the literal conversion in the keys of 
+        cached query results.
+        """
+
+        file_path = os.path.abspath(self.file_path)
+
+        modified = os.path.getmtime(file_path) if os.path.exists(file_path) else None
+
+        return ("local", file_path, self.file_format, modified, self.typed_literals, tuple(self.appended))
+
+    def _sources(self):
+        """Returns the files in the persistent store.
+
+        Returns:
+            dict: The format and modification time of each path, in the order
+            the files were loaded.
+        """
+
+        if self.engine == "sqlite":
+            return self.endpoint.store.sources()
+
+        meta = read_table_meta(self.store_path)
+
+        return {} if meta is None else meta["sources"]
+
+    def _clear_store(self):
+        """Deletes the persistent store and opens an empty one.
+        """
+
+        if self.engine == "sqlite":
+
+            self.endpoint.store.destroy(self.store_path)
+
+            self.endpoint = Graph(store=SQLiteTripleStore(self.store_path))
+
+        else:
+
+            if self.endpoint is not None:
+                self.endpoint.close()
+
+            # without its metadata, the directory holds no table anymore
+
+            os.remove(os.path.join(self.store_path, "meta.json"))
+
+            self.endpoint = None
+
+    def _load(self, file_path, file_format):
+        """Parses a file into the graph of the endpoint, unless the 
+        persistent store already contains its current version. If the store
+        contains an older version, it is rebuilt from the current versions of
+        its files, since the triples of the files can't be told apart.
+
+        Returns:
+            tuple: Absolute path and modification time of the file, None if it
+            was already loaded.
+        """
+
+        file_path = os.path.abspath(file_path)
+
+        modified = os.path.getmtime(file_path)
+
+        if file_format == "auto":
+            file_format = guess_file_format(file_path)
+
+        if self.store_path is not None:
+
+            sources = self._sources()
+
+            if file_path in sources:
+
+                if sources[file_path][1] == modified:
+                    return None
+
+                self._clear_store()
+
+                # files that were deleted in the meantime are left out
+
+                for other_file_path, (other_file_format, _) in sources.items():
+
+                    if other_file_path != file_path and os.path.exists(other_file_path):
+                        self._load(other_file_path, other_file_format)
+
+        if self.store_path is None:
+
+            load_file(self.endpoint, file_path, file_format, self.processes)
+
+        elif self.engine == "sqlite":
+
+            load_file(self.endpoint, file_path, file_format, self.processes)
+
+            self.endpoint.store.record_source(file_path, file_format, modified)
+
+        else:
+
+            sources = self._sources()
+
+            # the table is rebuilt from its triples and those of the file; 
+            # line-based files are streamed into it without a temporary graph
+
+            graph = Graph()
+
+            if file_format in LINE_FORMATS:
+                triples = iterate_triples(file_path, file_format, self.processes)
+            else:
+                load_file(graph, file_path, file_format)
+                triples = graph
+
+            existing = Graph() if self.endpoint is None else self.endpoint
+
+            sources[file_path] = (file_format, modified)
+
+            build_triple_table(self.store_path, itertools.chain(existing, triples), itertools.chain(existing.namespaces(), graph.namespaces()), sources)
+
+            self.endpoint = Graph(store=TripleTableStore(self.store_path))
+
+        return (file_path, modified)
 
     def initialize(self):
-        """Initializing the LocalEndpoint, i.e. loading the data into memory.
+        """Initializing the LocalEndpoint, i.e. loading the data into memory,
+        or into the persistent store (if "store_path" is set and the file
+        wasn't loaded before).
         """
 
-        g = Graph()
-    
-        if self.file_format == "auto":
-        
-            format_guess = util.guess_format(self.file_path)
-        
-            g.parse(self.file_path, format=format_guess)
-        
+        if self.store_path is None:
+
+            self.endpoint = Graph()
+
+            self.appended = []
+
+        elif self.engine == "sqlite":
+
+            self.endpoint = Graph(store=SQLiteTripleStore(self.store_path))
+
         else:
-        
-            g.parse(self.file_path, format=self.file_format)
-        
-        self.endpoint = g
+
+            self.endpoint = Graph(store=TripleTableStore(self.store_path)) if read_table_meta(self.store_path) is not None else None
+
+        self._load(self.file_path, self.file_format)
+
+        # files appended in earlier sessions are still in the store
+
+        if self.store_path is not None:
+            self.appended = self._appended_sources()
+
+    def _appended_sources(self):
+        """Returns the appended files in the persistent store.
+
+        Returns:
+            list: Absolute path and modification time of each file.
+        """
+
+        main_file_path = os.path.abspath(self.file_path)
+
+        return [(file_path, source[1]) for file_path, source in self._sources().items() if file_path != main_file_path]
+
+    def append(self, file_path, file_format = "auto"):
+        """Adds the data of another file (e.g. a further dump) to the 
+        initialized LocalEndpoint. With a persistent store, the file is kept
+        in the store and isn't loaded again, unless it was modified.
+
+        Args:
+            file_path (str): Path of the local RDF file.
+            file_format (str, optional): Format of the file, see __init__. 
+                Defaults to "auto".
+
+        Raises:
+            RuntimeError: Raised if the LocalEndpoint isn't initialized.
+        """
+
+        if getattr(self, "endpoint", None) is None:
+
+            raise RuntimeError("The LocalEndpoint has to be initialized before files can be appended.")
+
+        source = self._load(file_path, file_format)
+
+        if self.store_path is not None:
+
+            self.appended = self._appended_sources()
+
+        elif source is not None:
+
+            self.appended = [appended for appended in self.appended if appended[0] != source[0]] + [source]
     
     def close(self):
-        """Closing the LocalEndpoint, i.e. releasing the data from memory.
+        """Closing the LocalEndpoint, i.e. releasing the data from memory (or
+        closing the persistent store).
         """
 
+        if getattr(self, "endpoint", None) is not None:
+            self.endpoint.close()
+
         self.endpoint = None
 
     def query(self, query):
@@ -271,21 +588,18 @@ class LocalEndpoint(Endpoint):
             pd.DataFrame: The query results as DataFrame.
         """
     
-        results = self.endpoint.query(query)
+        return query_graph(self.endpoint, query, self.typed_literals)
 
-        results_csv = io.StringIO(str(results.serialize(format="csv"),"utf-8")) 
 
-        return pd.read_csv(results_csv)
-
-
-def endpoint_wrapper(query: str, endpoint: Endpoint, request_return_format = "XML", verbose = False, return_XML = False, prefix_lookup=False, caching=True):
+def endpoint_wrapper(query: str, endpoint: Endpoint, request_return_format = None, verbose = False, return_XML = False, prefix_lookup=False, caching=True):
     """Wrapper function for sparql-querier and local rdf-files.
     
     Args:
         query (str): Query that should be sent to the SPARQL endpoint
         endpoint (Endpoint): Link to the SPARQL endpoint that should be queried.
         request_return_format (str, optional): Requesting a specific return 
-            format from the SPARQL endpoint. Defaults to "XML".
+            format from the SPARQL endpoint. If None, the endpoint's 
+            "return_format" is used. Defaults to None.
         verbose (bool, optional): Set to True to let the function print 
             additional information about the returned data - for
             debugging and testing. Defaults to False.
@@ -299,8 +613,13 @@ def endpoint_wrapper(query: str, endpoint: Endpoint, request_return_format = "XM
                         dict: User provides a dictionary with prefixes and 
                         namespaces.
                         Defaults to False.
-        caching (bool, optional): Turn result caching on or off. Defaults to 
-            True.
+        caching (bool, optional): Turn result caching on or off. Queries that
+            failed are recorded in the negative cache and not sent again until
+            the entry expires. Defaults to True.
+
+    Raises:
+        SPARQLQueryError: Raised if the query failed, or failed recently 
+            according to the negative cache.
 
     Returns:
         pd.DataFrame: The query results in form of a DataFrame.
@@ -330,12 +649,592 @@ def endpoint_wrapper(query: str, endpoint: Endpoint, request_return_format = "XM
             + "> " for x in query_prefixes if x in namespace_prefixes.keys()]) + query
 
     if caching:
-        return endpoint_wrapper_logic(query = query, endpoint = endpoint, request_return_format = request_return_format, verbose = verbose, return_XML = return_XML)
+
+        # If the query failed recently, it isn't sent again until the entry 
+        # of the negative cache expires
+
+        failed_query = (getattr(endpoint, "cache_key", repr(endpoint)), normalize_query(query), request_return_format)
+
+        failure = negative_cache.check("sparql", failed_query)
+
+        if failure is not None:
+            raise SPARQLQueryError("The query failed recently (" + failure["category"] + ") and is not retried before the entry of the negative cache expires: " + failure["message"], getattr(endpoint, "url", None))
+
+        try:
+            return endpoint_wrapper_logic(query = query, endpoint = endpoint, request_return_format = request_return_format, verbose = verbose, return_XML = return_XML)
+
+        except ErrorBudgetExceededError:
+
+            # the failure is caused by other queries, not by this one
+            raise
+
+        except SPARQLQueryError as exception:
+
+            negative_cache.record("sparql", failed_query, "retries_exhausted" if isinstance(exception, RetriesExhaustedError) else "query_failed", exception)
+
+            raise
+
     else:
         return endpoint_wrapper_logic.__wrapped__(query = query, endpoint = endpoint, request_return_format = request_return_format, verbose = verbose, return_XML = return_XML)
 
 
-@lru_cache(maxsize=None)
+def endpoint_wrapper_many(queries, endpoint: Endpoint, request_return_format = None, verbose = False, return_XML = False, prefix_lookup=False, caching=True, progress=False, return_exceptions=False):
+    """Issues several queries against the same endpoint via endpoint_wrapper. 
+    Queries against a RemoteEndpoint run concurrently (at most 
+    "max_concurrency" at a time), LocalEndpoints are queried sequentially.
+
+    Args:
+        queries (list): Queries that should be sent to the SPARQL endpoint.
+        endpoint (Endpoint): Link to the SPARQL endpoint that should be queried.
+        request_return_format (str, optional): Requesting a specific return 
+            format from the SPARQL endpoint. If None, the endpoint's 
+            "return_format" is used. Defaults to None.
+        verbose (bool, optional): Set to True to let the function print 
+            additional information about the returned data - for
+            debugging and testing. Defaults to False.
+        return_XML (bool, optional): if True it returns the XML results instead 
+            of a dataframe. Defaults to False.
+        prefix_lookup (bool/str/dict, optional): See endpoint_wrapper. Defaults 
+            to False.
+        caching (bool, optional): Turn result caching on or off. Defaults to 
+            True.
+        progress (bool, optional): If True, a progress bar over the finished 
+            queries is shown. Defaults to False.
+        return_exceptions (bool, optional): If True, the exception of a failed 
+            query is returned in place of its result instead of being raised. 
+            Defaults to False.
+
+    Returns:
+        list: The query results, in the same order as the queries.
+    """
+
+    def run_query(query):
+
+        try:
+
+            return endpoint_wrapper(query, endpoint, request_return_format=request_return_format, verbose=verbose, return_XML=return_XML, prefix_lookup=prefix_lookup, caching=caching)
+
+        except Exception as e:
+
+            if return_exceptions:
+                return e
+
+            raise
+
+    if isinstance(endpoint, RemoteEndpoint) and endpoint.max_concurrency > 1 and len(queries) > 1:
+
+        with ThreadPoolExecutor(max_workers=min(endpoint.max_concurrency, len(queries))) as executor:
+
+            # executor.map yields the results in submission order
+
+            results = executor.map(run_query, queries)
+
+            if progress:
+                results = tqdm(results, total=len(queries), leave=False, desc="Query")
+
+            return list(results)
+
+    else:
+
+        if progress:
+            iterator = tqdm(queries, leave=False, desc="Query")
+        else:
+            iterator = queries
+
+        return [run_query(query) for query in iterator]
+
+
+entity_result_cache = EntityResultCache("endpoint_wrapper_bundled")
+
+"""
+Per-URI cache of the results of endpoint_wrapper_bundled.
+"""
+
+
+def _chunk_too_large(exception):
+    """Decides if the query of a chunk failed because of the size of the 
+    chunk, i.e. it still failed after all retries (typically timeouts) or was 
+    rejected with a timeout or "too large" status. Other errors (e.g. a 
+    malformed query) would fail for the halves as well.
+
+    Args:
+        exception (Exception): The error of the chunk query.
+
+    Returns:
+        bool: True if the chunk should be split.
+    """
+
+    if isinstance(exception, RetriesExhaustedError):
+
+        return True
+
+    if not isinstance(exception, SPARQLQueryError) or isinstance(exception, ErrorBudgetExceededError):
+
+        return False
+
+    response = getattr(exception.__cause__, "response", None)
+
+    return response is not None and response.status_code in _split_statuses
+
+
+def endpoint_wrapper_bundled(uris, query, endpoint: Endpoint, request_return_format = None, prefix_lookup=False, caching=True, progress=False, max_chunk_splits=3, batch_size=None):
+    """Issues a bundled query (using the VALUES method, or a filter for 
+    endpoints without VALUES support) for a list of URIs. The URIs are 
+    deduplicated, missing values are dropped and for RemoteEndpoints the URIs
+    are split into chunks according to the endpoint's "values_batch_size" (or 
+    "batch_size") and "values_batch_bytes". The chunks are 
+    queried concurrently via endpoint_wrapper_many and the results are merged. 
+    Chunks that time out or are too large (i.e. still fail after all retries
+    or are rejected with the status 408, 413, 414 or 504) are split in half 
+    and queried again, at most "max_chunk_splits" times. Other errors are 
+    raised at once. If the error budget of the endpoint is exhausted, no 
+    further chunks are split. 
+
+    If caching is turned on, the results are cached per URI (see 
+    entity_result_cache) and only the URIs without cached results are queried. 
+    This requires that the query binds the URIs to the variable "value" 
+    ("callret-0" is renamed to "value").
+
+    Args:
+        uris (pd.Series/list): URIs that should be bound in the VALUES clause.
+        query (str): Query containing the placeholder "**VALUES**" for the 
+            VALUES body, e.g. "SELECT ?value ?types WHERE {VALUES (?value) 
+            {**VALUES**} ?value rdf:type ?types . }", or the placeholder 
+            "**FILTER**" for a filter expression (see filter_clause), e.g. 
+            "SELECT ?value ?types WHERE {?value rdf:type ?types . FILTER 
+            **FILTER** }".
+        endpoint (Endpoint): Link to the SPARQL endpoint that should be queried.
+        request_return_format (str, optional): Requesting a specific return 
+            format from the SPARQL endpoint. If None, the endpoint's 
+            "return_format" is used. Defaults to None.
+        prefix_lookup (bool/str/dict, optional): See endpoint_wrapper. Defaults 
+            to False.
+        caching (bool, optional): Turn per-URI result caching on or off. 
+            Defaults to True.
+        progress (bool, optional): If True, a progress bar over the finished 
+            chunks is shown. Defaults to False.
+        max_chunk_splits (int, optional): Maximal number of times a failing 
+            chunk is split in half. Defaults to 3.
+        batch_size (int, optional): Maximal number of URIs per chunk. If None,
+            the endpoint's "values_batch_size" is used. Defaults to None.
+
+    Raises:
+        SPARQLQueryError: The error of a chunk that is rejected by the 
+            endpoint, or that still fails after it has been split 
+            "max_chunk_splits" times.
+        ErrorBudgetExceededError: Raised if a chunk fails while the error 
+            budget of the endpoint is exhausted.
+
+    Returns:
+        pd.DataFrame: The merged query results of all chunks.
+    """
+
+    uris = pd.Series(uris, dtype=object).dropna().drop_duplicates().tolist()
+
+    results = []
+
+    # If caching is on, only the URIs without cached results are queried
+
+    if caching:
+
+        entity_key = (getattr(endpoint, "cache_key", repr(endpoint)), normalize_query(query), request_return_format)
+
+        results, uris = entity_result_cache.get_many(entity_key, uris)
+
+    if not uris:
+
+        return merge_results(results)
+
+    if isinstance(endpoint, RemoteEndpoint):
+
+        chunks = values_chunks(uris, batch_size or endpoint.values_batch_size, endpoint.values_batch_bytes)
+
+    else:
+
+        chunks = [uris]
+
+    # every chunk is paired with the number of times it has been split
+
+    chunks = [(chunk, 0) for chunk in chunks]
+
+    while chunks:
+
+        queries = [query.replace("**VALUES**", values_clause(chunk)).replace("**FILTER**", filter_clause(chunk)) for chunk, _ in chunks]
+
+        # the chunk queries themselves are not cached, their results are cached per URI
+
+        chunk_results = endpoint_wrapper_many(queries, endpoint, request_return_format=request_return_format, prefix_lookup=prefix_lookup, caching=False, progress=progress, return_exceptions=True)
+
+        failed_chunks = []
+
+        for (chunk, splits), chunk_result in zip(chunks, chunk_results):
+
+            if not isinstance(chunk_result, Exception):
+
+                # some endpoints (e.g. Virtuoso) name the variable "callret-0", 
+                # it is renamed before the results are split per URI
+
+                chunk_result = chunk_result.rename({"callret-0": "value"}, axis="columns")
+
+                results.append(chunk_result)
+
+                if caching:
+                    entity_result_cache.set_many(entity_key, chunk, chunk_result)
+
+            elif _chunk_too_large(chunk_result) and len(chunk) > 1 and splits < max_chunk_splits:
+
+                # If a chunk times out or is too large, it is retried in two 
+                # halves
+
+                middle = len(chunk) // 2
+
+                failed_chunks += [(chunk[:middle], splits + 1), (chunk[middle:], splits + 1)]
+
+            else:
+
+                raise chunk_result
+
+        chunks = failed_chunks
+
+    return merge_results(results)
+
+
+def merge_results(results):
+    """Concatenates query results, leaving out empty ones.
+
+    Args:
+        results (list): The query results (DataFrames).
+
+    Returns:
+        pd.DataFrame: The merged results.
+    """
+
+    results = [result for result in results if not result.empty]
+
+    if not results:
+
+        return pd.DataFrame()
+
+    return pd.concat(results, ignore_index=True)
+
+
+class BatchLoader():
+    """Collects lookups of single URIs and sends them as batched queries via 
+    endpoint_wrapper_bundled (dataloader pattern): A batch is sent as soon as 
+    it holds "batch_size" URIs or "window" seconds after its first lookup. 
+    The rows of the results are demultiplexed by the variable "value", so 
+    every lookup gets the rows of its URI. Can be used as a context manager,
+    which sends the remaining lookups when it is left.
+    """
+
+    def __init__(self, query, endpoint, batch_size=20, window=0.01, request_return_format=None, prefix_lookup=False, caching=True, progress=False):
+        """Configuration of the batch loader.
+
+        Args:
+            query (str): Query containing the placeholder "**VALUES**" or 
+                "**FILTER**", see endpoint_wrapper_bundled. Endpoints without 
+                VALUES support can be queried with "**FILTER**".
+            endpoint (Endpoint): Link to the SPARQL endpoint that should be 
+                queried.
+            batch_size (int, optional): Maximal number of URIs per batch. 
+                Defaults to 20.
+            window (float, optional): Time (in seconds) lookups are collected
+                before an incomplete batch is sent. Defaults to 0.01.
+            request_return_format (str, optional): Requesting a specific 
+                return format from the SPARQL endpoint. If None, the 
+                endpoint's "return_format" is used. Defaults to None.
+            prefix_lookup (bool/str/dict, optional): See endpoint_wrapper. 
+                Defaults to False.
+            caching (bool, optional): Turn per-URI result caching on or off. 
+                Defaults to True.
+            progress (bool, optional): If True, a progress bar over the 
+                answered lookups is shown, which advances with every batch. 
+                Defaults to False.
+        """
+
+        self.query = query
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.window = window
+        self.request_return_format = request_return_format
+        self.prefix_lookup = prefix_lookup
+        self.caching = caching
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=getattr(endpoint, "max_concurrency", 1))
+        self._progress_bar = tqdm(total=0, leave=False, desc="Query") if progress else None
+
+    def load(self, uri):
+        """Adds the lookup of a URI to the current batch.
+
+        Args:
+            uri (str): The URI.
+
+        Returns:
+            concurrent.futures.Future: Future of the rows of the URI (an empty
+            DataFrame if there are none).
+        """
+
+        future = Future()
+
+        with self._lock:
+
+            self._pending.append((uri, future))
+
+            if self._progress_bar is not None:
+                self._progress_bar.total += 1
+
+            if len(self._pending) >= self.batch_size:
+
+                batch = self._take_batch()
+
+            else:
+
+                batch = None
+
+                # the first lookup of a batch starts the window
+
+                if self._timer is None:
+
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            self._executor.submit(self._send_batch, batch)
+
+        return future
+
+    def load_many(self, uris):
+        """Looks up several URIs and waits for their rows.
+
+        Args:
+            uris (list): The URIs.
+
+        Returns:
+            list: The rows of every URI (DataFrames), in the order of "uris".
+        """
+
+        futures = [self.load(uri) for uri in uris]
+
+        self.flush()
+
+        return [future.result() for future in futures]
+
+    def flush(self):
+        """Sends the current batch without waiting for the window to end.
+        """
+
+        with self._lock:
+            batch = self._take_batch()
+
+        if batch:
+            self._executor.submit(self._send_batch, batch)
+
+    def close(self):
+        """Sends the current batch and waits until all batches are answered.
+        """
+
+        self.flush()
+
+        self._executor.shutdown(wait=True)
+
+        if self._progress_bar is not None:
+            self._progress_bar.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+    def _take_batch(self):
+        """Removes the pending lookups and stops the window timer (the lock 
+        must be held).
+        """
+
+        batch = self._pending
+
+        self._pending = []
+
+        if self._timer is not None:
+
+            self._timer.cancel()
+            self._timer = None
+
+        return batch
+
+    def _send_batch(self, batch):
+        """Queries the URIs of a batch and resolves the futures of the 
+        lookups.
+        """
+
+        uris = list(dict.fromkeys([uri for uri, _ in batch]))
+
+        try:
+
+            result = endpoint_wrapper_bundled(uris, self.query, self.endpoint, request_return_format=self.request_return_format, prefix_lookup=self.prefix_lookup, caching=self.caching, batch_size=self.batch_size)
+
+        except Exception as exception:
+
+            for _, future in batch:
+                future.set_exception(exception)
+
+            self._advance_progress(len(batch))
+
+            return
+
+        if "value" in result.columns and not result.empty:
+            rows = dict(tuple(result.groupby("value", sort=False)))
+        else:
+            rows = {}
+
+        for uri, future in batch:
+
+            if uri in rows:
+                future.set_result(rows[uri].reset_index(drop=True))
+            else:
+                future.set_result(pd.DataFrame())
+
+        self._advance_progress(len(batch))
+
+    def _advance_progress(self, lookups):
+        """Advances the progress bar (if shown) by the answered lookups.
+        """
+
+        if self._progress_bar is not None:
+
+            with self._lock:
+                self._progress_bar.update(lookups)
+
+
+def paginated_query(query, endpoint, page_size, offset, max_results, request_return_format, verbose):
+    """Fetches the results of a query page by page (using LIMIT/OFFSET) from a 
+    RemoteEndpoint. Pages are requested in windows of "max_concurrency" 
+    concurrent queries; paging stops at the first empty page. If a page is 
+    shorter than requested, either the results end there or the endpoint caps
+    the results per query below "page_size" (e.g. 10000 for DBpedia), so a 
+    single page right after it is requested with the size of that page. Only
+    if it returns results (a warning is issued), paging continues in windows.
+    The pages are concatenated once at the end.
+
+    Args:
+        query (str): SPARQL query without LIMIT and OFFSET.
+        endpoint (RemoteEndpoint): Endpoint that should be queried.
+        page_size (int): Number of results per page, should not exceed the 
+            maximum number of results the endpoint returns per query.
+        offset (int): Offset of the first page.
+        max_results (int): Offset at which paging stops (0 for no maximum).
+        request_return_format (str): Requested return format.
+        verbose (bool): Passed on to the endpoint.
+
+    Returns:
+        pd.DataFrame: The combined query results.
+    """
+
+    def page_queries(page_offset, size):
+
+        while max_results == 0 or page_offset < max_results:
+
+            page_limit = size
+
+            if max_results > 0:
+                page_limit = min(size, max_results - page_offset)
+
+            yield query + "LIMIT " + str(page_limit) + " OFFSET " + str(page_offset), page_offset, page_limit
+
+            page_offset += page_limit
+
+    pages = []
+    remaining_pages = page_queries(offset, page_size)
+    capped_page_size = None
+    warned = False
+    probing = False
+
+    with ThreadPoolExecutor(max_workers=endpoint.max_concurrency) as executor:
+
+        while True:
+
+            # After a short page, a single page is requested to find out if
+            # further results follow
+
+            window = list(itertools.islice(remaining_pages, 1 if probing else endpoint.max_concurrency))
+
+            if not window:
+                break
+
+            futures = [(executor.submit(endpoint.query, page_query, request_return_format, verbose, False), page_offset, page_limit) for page_query, page_offset, page_limit in window]
+
+            finished = False
+            next_offset = None
+
+            for future, page_offset, page_limit in futures:
+
+                query_result = future.result()
+
+                # the pages after an empty or short page are not used
+                if finished or next_offset is not None:
+                    continue
+
+                if query_result.empty:
+                    finished = True
+                    continue
+
+                if capped_page_size is not None and not warned:
+
+                    warnings.warn("The SPARQL endpoint " + endpoint.url + " returned at most " + str(capped_page_size) + " results per query, which is less than the page size " + str(page_size) + "; the page size is reduced accordingly.")
+
+                    warned = True
+
+                pages.append(query_result)
+
+                # If a page is short, paging continues right after it
+                if len(query_result) < page_limit:
+
+                    capped_page_size = len(query_result)
+
+                    next_offset = page_offset + capped_page_size
+
+            if finished:
+                break
+
+            if next_offset is not None:
+                remaining_pages = page_queries(next_offset, capped_page_size)
+
+            probing = next_offset is not None
+
+    if not pages:
+        return pd.DataFrame()
+
+    return pd.concat(pages, ignore_index=True)
+
+
+def endpoint_wrapper_cache_key(arguments):
+    """Builds the cache key of endpoint_wrapper_logic from its arguments: the 
+    normalized query, the endpoint's cache key, the requested return format 
+    and return_XML.
+
+    Args:
+        arguments (OrderedDict): The bound arguments of endpoint_wrapper_logic.
+
+    Returns:
+        tuple: The cache key.
+    """
+
+    endpoint = arguments["endpoint"]
+
+    request_return_format = arguments["request_return_format"]
+
+    if request_return_format is None:
+        request_return_format = getattr(endpoint, "return_format", None)
+
+    return (normalize_query(arguments["query"]), getattr(endpoint, "cache_key", repr(endpoint)), request_return_format, arguments["return_XML"])
+
+
+@cached("endpoint_wrapper_logic", key=endpoint_wrapper_cache_key)
 def endpoint_wrapper_logic(query, endpoint, request_return_format, verbose, return_XML):
     """This is a helper function for "endpoint_wrapper", outsourced for caching purposes. Not intended for end-user usage. #TODO: Schöner lösen?
     """
@@ -365,35 +1264,14 @@ def endpoint_wrapper_logic(query, endpoint, request_return_format, verbose, retu
         
         if query_limit > 0:
             
-            df_result = pd.DataFrame()
-            
             #delete limit and offset from query
             query = query.split("OFFSET")[0]
             query = query.split("LIMIT")[0]
-            while True:
-                
-                if max_results > 0:
-                    
-                    #check if max_results reached
-                    if query_offset >= max_results:
-                        return df_result
-                
-                    elif query_offset + query_limit > max_results:
-                    
-                        query_limit = max_results - query_offset
-                
-                query = query.split("LIMIT")[0] + "LIMIT " + str(query_limit) + " OFFSET " + str(query_offset)
-                    
-                query_offset += query_limit
-                
-                query_result = endpoint.query(query, request_return_format, verbose, return_XML)
-                if return_XML:
-                    return query_result
-                if query_result.empty:
-                    return df_result
-                else:
-                    df_result = df_result.append(query_result)
-                    df_result = df_result.reset_index(drop=True).reindex(index=range(len(df_result)))
+
+            if return_XML:
+                return endpoint.query(query + "LIMIT " + str(query_limit) + " OFFSET " + str(query_offset), request_return_format, verbose, return_XML)
+
+            return paginated_query(query, endpoint, query_limit, query_offset, max_results, request_return_format, verbose)
                             
         else:
             return endpoint.query(query, request_return_format, verbose, return_XML)
@@ -1,4 +1,13 @@
+import csv
+import datetime
+import decimal
+import io
 import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+import pandas as pd
+from rdflib import BNode, Literal
 
 
 def get_initial_query_offset(query: str):
@@ -43,4 +52,399 @@ def get_initial_query_limit(query: str):
 
     else:
 
-        return int(match.group(2))
\ No newline at end of file
+        return int(match.group(2))
+
+
+def iterate_xml_results(source):
+    """Incrementally parses a SPARQL XML result document and yields the 
+    results one by one, without building a DOM of the whole document.
+
+    Args:
+        source (bytes/file-like): The SPARQL XML result document.
+
+    Yields:
+        list: The bindings of one result as (variable name, value) tuples, in 
+        document order. Bindings without a value are left out.
+    """
+
+    if isinstance(source, bytes):
+
+        source = io.BytesIO(source)
+
+    bindings = None
+    results = None
+
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+
+        # strip the namespace, i.e. "{http://www.w3.org/2005/sparql-results#}result" -> "result"
+
+        tag = element.tag.rpartition("}")[2]
+
+        if event == "start":
+
+            if tag == "results":
+                results = element
+
+            elif tag == "result":
+                bindings = []
+
+        elif tag == "binding" and bindings is not None:
+
+            for value_node in element:
+
+                if value_node.text:
+                    bindings.append((element.get("name"), value_node.text))
+
+        elif tag == "result":
+
+            yield bindings
+
+            bindings = None
+
+            # release the parsed result and detach it from <results>, so 
+            # memory stays bounded by one result
+            element.clear()
+
+            if results is not None:
+                results.remove(element)
+
+
+def xml_results_to_frame(source):
+    """Converts a SPARQL XML result document into a DataFrame. The bindings are
+    streamed directly into one value list per variable, the DataFrame is built
+    once at the end.
+
+    Args:
+        source (bytes/file-like): The SPARQL XML result document.
+
+    Returns:
+        pd.DataFrame: One row per result and one column per bound variable 
+        (in order of first appearance); unbound values are NaN.
+    """
+
+    columns = {}
+    row_count = 0
+
+    for bindings in iterate_xml_results(source):
+
+        for name, value in bindings:
+
+            column = columns.get(name)
+
+            if column is None:
+                column = columns[name] = [np.nan] * row_count
+
+            if len(column) > row_count:
+                column[row_count] = value
+            else:
+                column.append(value)
+
+        row_count += 1
+
+        for column in columns.values():
+
+            if len(column) < row_count:
+                column.append(np.nan)
+
+    if row_count == 0:
+
+        return pd.DataFrame()
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(row_count))
+
+
+def json_results_to_frame(results):
+    """Converts a decoded SPARQL JSON result document into a DataFrame. The
+    values are written directly into one preallocated list per variable.
+
+    Args:
+        results (dict): The SPARQL JSON result document.
+
+    Returns:
+        pd.DataFrame: One row per result and one column per bound variable 
+        (in order of first appearance); unbound values are NaN.
+    """
+
+    bindings = results["results"]["bindings"]
+
+    if len(bindings) == 0:
+
+        return pd.DataFrame()
+
+    columns = {}
+
+    for row_index, binding in enumerate(bindings):
+
+        for name, term in binding.items():
+
+            column = columns.get(name)
+
+            if column is None:
+                column = columns[name] = [np.nan] * len(bindings)
+
+            column[row_index] = term["value"]
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(bindings)))
+
+
+_TSV_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", "\"": "\"", "'": "'", "\\": "\\"}
+
+
+def _unescape_tsv_match(match):
+    """Resolves a single N-Triples escape sequence matched in a TSV literal.
+    """
+
+    escape = match.group(1)
+
+    if escape[0] in "uU":
+        return chr(int(escape[1:], 16))
+
+    return _TSV_ESCAPES.get(escape, match.group(0))
+
+
+def tsv_results_to_frame(source):
+    """Converts a SPARQL TSV result document into a DataFrame. The cells hold 
+    RDF terms in N-Triples syntax, which are decoded column-wise: IRIs are 
+    unwrapped, literals are stripped of their quotes, language tags and 
+    datatypes.
+
+    Args:
+        source (bytes/file-like): The SPARQL TSV result document.
+
+    Returns:
+        pd.DataFrame: One row per result and one column per bound variable; 
+        unbound values are NaN.
+    """
+
+    if isinstance(source, bytes):
+
+        source = io.BytesIO(source)
+
+    results = pd.read_csv(source, sep="\t", dtype=str, quoting=csv.QUOTE_NONE, keep_default_na=False, na_values=[""], skip_blank_lines=False)
+
+    if results.empty:
+
+        return pd.DataFrame()
+
+    # like for the other formats, variables that are never bound are dropped
+
+    results = results.dropna(axis=1, how="all")
+
+    results.columns = [column[1:] if column.startswith("?") else column for column in results.columns]
+
+    for column in results.columns:
+
+        values = results[column]
+
+        is_iri = values.str.startswith("<", na=False)
+
+        values = values.mask(is_iri, values.str.slice(1, -1))
+
+        literals = values.str.extract(r'^"(.*)"(?:@[A-Za-z0-9-]+|\^\^\S+)?$', expand=False)
+
+        is_literal = literals.notna() & ~is_iri
+
+        if is_literal.any():
+
+            literals = literals.str.replace(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)", _unescape_tsv_match, regex=True)
+
+            values = values.mask(is_literal, literals)
+
+        results[column] = values
+
+    return results
+
+
+# the strings that "pd.read_csv" reads as missing values by default; since 
+# pandas 2.0, "None" is one of them, too
+
+_CSV_NA_VALUES = frozenset(["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "n/a", "nan", "null"])
+
+# cells that "pd.read_csv" may read as numbers or booleans (and some more)
+
+_csv_scalar_pattern = re.compile(r"\s*[+-]?(?:[0-9.]+(?:[eE][+-]?[0-9]*)?|inf|infinity|nan|true|false)\s*\Z", re.IGNORECASE)
+
+
+def _csv_cell(term):
+    """Converts an RDF term into the text of a SPARQL CSV result cell.
+    """
+
+    if term is None:
+
+        return ""
+
+    if isinstance(term, BNode):
+
+        return "_:" + term
+
+    return str(term)
+
+
+def _read_csv_column(name, cells):
+    """Reads a single column of SPARQL CSV result cells with "pd.read_csv".
+    """
+
+    stream = io.StringIO()
+
+    writer = csv.writer(stream)
+
+    writer.writerow([name])
+    writer.writerows([cell] for cell in cells)
+
+    stream.seek(0)
+
+    return pd.read_csv(stream)[name]
+
+
+def _csv_column(name, cells):
+    """Converts a column of SPARQL CSV result cells like "pd.read_csv" does.
+    Columns of texts that can't be numbers or booleans (e.g. IRIs) are built
+    directly, missing values become NaN. All other columns are read with 
+    "pd.read_csv" itself, so that their types are inferred the same way.
+    """
+
+    texts = [cell for cell in cells if cell not in _CSV_NA_VALUES]
+
+    if texts and "None" not in texts and not any(_csv_scalar_pattern.match(cell) for cell in texts):
+
+        return pd.Series([np.nan if cell in _CSV_NA_VALUES else cell for cell in cells], dtype=object, name=name)
+
+    return _read_csv_column(name, cells)
+
+
+def _typed_value(term):
+    """Converts an RDF term into a Python value: literals of numeric, boolean
+    and date(time) datatypes into numbers, booleans and timestamps, all 
+    other terms into texts as in _csv_cell.
+    """
+
+    if term is None:
+
+        return np.nan
+
+    if isinstance(term, Literal) and term.datatype is not None:
+
+        value = term.toPython()
+
+        if isinstance(value, (bool, int, float)):
+            return value
+
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return pd.Timestamp(value)
+
+    return _csv_cell(term)
+
+
+def terms_to_frame(variables, rows, typed_literals=False):
+    """Converts rows of RDF terms (e.g. query results of rdflib) into a 
+    DataFrame, without serializing them. By default, the result equals 
+    reading the SPARQL CSV serialization of the rows with "pd.read_csv": 
+    terms are represented by their lexical forms (blank nodes as "_:id") and
+    the column types are inferred the same way.
+
+    Args:
+        variables (list): Names of the variables, i.e. the columns.
+        rows (list): One tuple of terms (None if unbound) per result.
+        typed_literals (bool, optional): If True, the column types follow the
+            datatypes of the literals instead: numeric literals become 
+            numbers, xsd:boolean literals booleans and xsd:date(Time) literals
+            timestamps, e.g. "01"^^xsd:string stays a text. Defaults to False.
+
+    Returns:
+        pd.DataFrame: One row per result and one column per variable.
+    """
+
+    variables = [str(variable) for variable in variables]
+
+    if len(rows) == 0:
+
+        return pd.read_csv(io.StringIO(",".join(variables) + "\n"))
+
+    if typed_literals:
+
+        columns = zip(*[[_typed_value(term) for term in row] for row in rows])
+
+        return pd.DataFrame({variable: pd.Series(values, name=variable) for variable, values in zip(variables, columns)}, index=pd.RangeIndex(len(rows)))
+
+    columns = zip(*[[_csv_cell(term) for term in row] for row in rows])
+
+    return pd.DataFrame({variable: _csv_column(variable, list(cells)) for variable, cells in zip(variables, columns)}, index=pd.RangeIndex(len(rows)))
+
+
+def values_clause(uris):
+    """Creates the body of a SPARQL VALUES clause for a single variable.
+
+    Args:
+        uris (list): URIs that should be bound to the variable.
+
+    Returns:
+        str: VALUES body, e.g. " ( <http://a> ) ( <http://b> ) ".
+    """
+
+    return " ( <" + "> ) ( <".join(uris) + "> ) "
+
+
+def filter_clause(uris, variable="?value"):
+    """Creates a SPARQL 1.0 compatible filter expression that binds a 
+    variable to one of several URIs, for endpoints without VALUES support.
+
+    Args:
+        uris (list): URIs the variable may be bound to.
+        variable (str, optional): The variable. Defaults to "?value".
+
+    Returns:
+        str: Filter expression, e.g. "(?value = <http://a> || ?value = 
+        <http://b>)".
+    """
+
+    return "(" + " || ".join([variable + " = <" + uri + ">" for uri in uris]) + ")"
+
+
+def values_chunks(uris, max_entities, max_bytes):
+    """Splits a list of URIs into chunks for bundled (VALUES) queries, so that 
+    no chunk contains more than "max_entities" URIs or has a VALUES body of 
+    more than "max_bytes" bytes. A URI which alone exceeds "max_bytes" gets 
+    a chunk of its own.
+
+    Args:
+        uris (list): URIs that should be chunked.
+        max_entities (int): Maximal number of URIs per chunk (0 for no 
+            maximum).
+        max_bytes (int): Maximal byte length of the VALUES body per chunk (0 
+            for no maximum).
+
+    Returns:
+        list: List of chunks (lists of URIs), in the order of "uris".
+    """
+
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+
+    for uri in uris:
+
+        # each URI takes up " ( <" + uri + "> ) " in the VALUES body
+
+        uri_bytes = len(uri.encode("utf-8")) + 8
+
+        entities_exceeded = max_entities > 0 and len(chunk) >= max_entities
+
+        bytes_exceeded = max_bytes > 0 and chunk_bytes + uri_bytes > max_bytes
+
+        if chunk and (entities_exceeded or bytes_exceeded):
+
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+
+        chunk.append(uri)
+        chunk_bytes += uri_bytes
+
+    if chunk:
+
+        chunks.append(chunk)
+
+    return chunks
@@ -0,0 +1,594 @@
+import re
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import RDF
+
+from kgextension.sparql_helper_helper import terms_to_frame
+
+
+_token_pattern = re.compile(r"""\s*(?:
+    (?P<iri><[^<>"{}|^`\\\s]*>)
+    | (?P<var>[?$][A-Za-z0-9_]+)
+    | (?P<pname>(?:[A-Za-z][\w-]*)?:(?:[\w-]+(?:\.[\w-]+)*)?)
+    | (?P<keyword>[A-Za-z]+)
+    | (?P<punct>&&|\|\||[{}().=])
+    )""", re.VERBOSE)
+
+_term_tests = {
+    "isliteral": lambda term: isinstance(term, Literal),
+    "isiri": lambda term: isinstance(term, URIRef),
+    "isuri": lambda term: isinstance(term, URIRef),
+    "isblank": lambda term: isinstance(term, BNode)}
+
+
+class UnsupportedQuery(Exception):
+    """Raised by the parser of the fast path for queries that have to be
+    answered by the SPARQL engine of rdflib.
+    """
+    pass
+
+
+def tokenize_query(query):
+    """Splits a query into the tokens of the subset of SPARQL supported by the
+    fast path.
+
+    Args:
+        query (str): SPARQL query.
+
+    Raises:
+        UnsupportedQuery: Raised if the query contains other tokens, e.g.
+            literals or comments.
+
+    Returns:
+        list: (kind, text) tuples; keywords are lower case.
+    """
+
+    tokens = []
+
+    position = 0
+
+    query = query.rstrip()
+
+    while position < len(query):
+
+        match = _token_pattern.match(query, position)
+
+        if match is None:
+            raise UnsupportedQuery(query[position:position+20])
+
+        kind = match.lastgroup
+        text = match.group(kind)
+
+        # "a" is the only case-sensitive keyword
+
+        if kind == "keyword" and text != "a":
+            text = text.lower()
+
+        tokens.append((kind, text))
+
+        position = match.end()
+
+    return tokens
+
+
+class _Parser():
+    """Recursive descent parser for the SELECT queries of the generators: a
+    basic graph pattern with an optional VALUES block and FILTERs that test 
+    term types or compare a variable with IRIs.
+    """
+
+    def __init__(self, tokens, namespaces):
+
+        self.tokens = tokens
+        self.position = 0
+        self.prefixes = dict(namespaces)
+
+    def peek(self):
+
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+        return (None, None)
+
+    def next(self):
+
+        token = self.peek()
+
+        if token[0] is None:
+            raise UnsupportedQuery("unexpected end of query")
+
+        self.position += 1
+
+        return token
+
+    def expect(self, text):
+
+        if self.next()[1] != text:
+            raise UnsupportedQuery("expected " + text)
+
+    def term(self):
+        """Parses a variable, IRI, prefixed name or "a".
+        """
+
+        kind, text = self.next()
+
+        if kind == "var":
+            return ("var", text[1:])
+
+        if kind == "iri":
+            return URIRef(text[1:-1])
+
+        if kind == "pname":
+
+            prefix, local_name = text.split(":", 1)
+
+            if prefix not in self.prefixes:
+                raise UnsupportedQuery("unknown prefix " + prefix)
+
+            return URIRef(self.prefixes[prefix] + local_name)
+
+        if (kind, text) == ("keyword", "a"):
+            return RDF.type
+
+        # a predicate path of a single IRI, e.g. "(<http://...>)"
+
+        if text == "(":
+
+            term = self.term()
+
+            self.expect(")")
+
+            if not isinstance(term, URIRef):
+                raise UnsupportedQuery("only IRIs are supported as paths")
+
+            return term
+
+        raise UnsupportedQuery("unexpected " + str(text))
+
+    def query(self):
+        """Parses the whole query.
+
+        Returns:
+            dict: The "variables" and "distinct" flag of the SELECT clause and
+            the "group" of the WHERE clause.
+        """
+
+        while self.peek() == ("keyword", "prefix"):
+
+            self.next()
+
+            kind, text = self.next()
+
+            if kind != "pname" or not text.endswith(":"):
+                raise UnsupportedQuery("invalid prefix declaration")
+
+            kind, iri = self.next()
+
+            if kind != "iri":
+                raise UnsupportedQuery("invalid prefix declaration")
+
+            self.prefixes[text[:-1]] = iri[1:-1]
+
+        self.expect("select")
+
+        distinct = self.peek() == ("keyword", "distinct")
+
+        if distinct:
+            self.next()
+
+        variables = []
+
+        while self.peek()[0] == "var":
+            variables.append(self.next()[1][1:])
+
+        if not variables:
+            raise UnsupportedQuery("only explicit projections are supported")
+
+        self.expect("where")
+
+        group = self.group()
+
+        if self.peek()[0] is not None:
+            raise UnsupportedQuery("solution modifiers are not supported")
+
+        return {"variables": variables, "distinct": distinct, "group": group}
+
+    def group(self):
+        """Parses a group graph pattern in curly braces.
+        """
+
+        self.expect("{")
+
+        group = {"values": None, "patterns": [], "filters": []}
+
+        while True:
+
+            kind, text = self.peek()
+
+            if text == "}":
+
+                self.next()
+
+                return group
+
+            if text == ".":
+
+                self.next()
+
+            elif (kind, text) == ("keyword", "values"):
+
+                self.next()
+
+                if group["values"] is not None:
+                    raise UnsupportedQuery("only one VALUES block is supported")
+
+                group["values"] = self.values()
+
+            elif (kind, text) == ("keyword", "filter"):
+
+                self.next()
+
+                group["filters"].append(self.expression())
+
+            else:
+
+                group["patterns"].append((self.term(), self.term(), self.term()))
+
+    def values(self):
+        """Parses the variable and IRIs of a VALUES block with one variable.
+        """
+
+        parenthesized = self.peek()[1] == "("
+
+        if parenthesized:
+            self.next()
+
+        kind, variable = self.next()
+
+        if kind != "var":
+            raise UnsupportedQuery("invalid VALUES block")
+
+        if parenthesized:
+            self.expect(")")
+
+        self.expect("{")
+
+        iris = []
+
+        while self.peek()[1] != "}":
+
+            if parenthesized:
+                self.expect("(")
+
+            kind, text = self.next()
+
+            if kind != "iri":
+                raise UnsupportedQuery("only IRIs are supported in VALUES")
+
+            iris.append(URIRef(text[1:-1]))
+
+            if parenthesized:
+                self.expect(")")
+
+        self.next()
+
+        return (variable[1:], iris)
+
+    def expression(self):
+        """Parses a disjunction of conjunctions.
+        """
+
+        operands = [self.conjunction()]
+
+        while self.peek()[1] == "||":
+
+            self.next()
+
+            operands.append(self.conjunction())
+
+        return operands[0] if len(operands) == 1 else ("or", operands)
+
+    def conjunction(self):
+
+        operands = [self.primary()]
+
+        while self.peek()[1] == "&&":
+
+            self.next()
+
+            operands.append(self.primary())
+
+        return operands[0] if len(operands) == 1 else ("and", operands)
+
+    def primary(self):
+        """Parses a parenthesized expression, a term test like
+        "isLITERAL(?v)" or a comparison of a variable with an IRI.
+        """
+
+        kind, text = self.peek()
+
+        if text == "(":
+
+            self.next()
+
+            expression = self.expression()
+
+            self.expect(")")
+
+            return expression
+
+        if kind == "keyword" and text in _term_tests:
+
+            self.next()
+
+            self.expect("(")
+
+            term = self.term()
+
+            self.expect(")")
+
+            if not isinstance(term, tuple):
+                raise UnsupportedQuery("term tests are only supported for variables")
+
+            return ("test", text, term[1])
+
+        left = self.term()
+
+        self.expect("=")
+
+        right = self.term()
+
+        if isinstance(left, URIRef):
+            left, right = right, left
+
+        if not isinstance(left, tuple) or not isinstance(right, URIRef):
+            raise UnsupportedQuery("only comparisons of variables with IRIs are supported")
+
+        return ("equals", left[1], right)
+
+
+def parse_pattern_query(query, namespaces=()):
+    """Parses a query of the subset of SPARQL that is answered by the fast
+    path: SELECT (DISTINCT) queries with explicit variables over a basic
+    graph pattern, at most one VALUES block with IRIs and FILTERs combining 
+    isLITERAL/isIRI/isURI/isBLANK tests and comparisons of variables with 
+    IRIs. This covers the queries of the generators and linkers without regex
+    filters; OPTIONAL patterns (e.g. of the hierarchy generator) are left to
+    the SPARQL engine, whose results for unmatched VALUES differ from the 
+    standard.
+
+    Args:
+        query (str): SPARQL query.
+        namespaces (iterable, optional): (prefix, namespace) pairs that are
+            known without PREFIX declarations, e.g. those of the graph.
+            Defaults to ().
+
+    Returns:
+        dict: The parsed query, None if the query isn't supported.
+    """
+
+    try:
+
+        return _Parser(tokenize_query(query), namespaces).query()
+
+    except UnsupportedQuery:
+
+        return None
+
+
+def _evaluate(expression, solution):
+    """Evaluates a filter expression; errors, i.e. unbound variables, count as
+    False.
+    """
+
+    operator = expression[0]
+
+    if operator == "or":
+        return any(_evaluate(operand, solution) for operand in expression[1])
+
+    if operator == "and":
+        return all(_evaluate(operand, solution) for operand in expression[1])
+
+    if operator == "test":
+
+        term = solution.get(expression[2])
+
+        return term is not None and _term_tests[expression[1]](term)
+
+    term = solution.get(expression[1])
+
+    return isinstance(term, URIRef) and term == expression[2]
+
+
+def _iri_alternatives(expression):
+    """Returns the variable and IRIs of an expression like "(?value = <a> ||
+    ?value = <b>)", None for other expressions.
+    """
+
+    if expression[0] == "equals":
+        return expression[1], [expression[2]]
+
+    if expression[0] != "or":
+        return None
+
+    alternatives = [_iri_alternatives(operand) for operand in expression[1]]
+
+    if any(alternative is None for alternative in alternatives) or len(set(alternative[0] for alternative in alternatives)) > 1:
+        return None
+
+    return alternatives[0][0], [iri for alternative in alternatives for iri in alternative[1]]
+
+
+def _match_patterns(graph, patterns, solution):
+    """Joins the triple patterns with a solution by looking up each pattern
+    (with the variables bound so far) in the indices of the graph.
+
+    Yields:
+        dict: The extended solutions.
+    """
+
+    if not patterns:
+
+        yield solution
+
+        return
+
+    pattern = patterns[0]
+
+    lookup = tuple(solution.get(term[1]) if isinstance(term, tuple) else term for term in pattern)
+
+    for triple in graph.triples(lookup):
+
+        extended = solution
+
+        for term, value in zip(pattern, triple):
+
+            if not isinstance(term, tuple):
+                continue
+
+            bound = extended.get(term[1])
+
+            if bound is None:
+
+                if extended is solution:
+                    extended = dict(solution)
+
+                extended[term[1]] = value
+
+            # a variable that occurs twice in the pattern must match twice
+
+            elif bound != value:
+                break
+
+        else:
+
+            yield from _match_patterns(graph, patterns[1:], extended)
+
+
+def plan_pattern_query(parsed_query):
+    """Determines how a query parsed by parse_pattern_query is evaluated: 
+    which variable is bound to which IRIs before the lookups, which filters
+    remain and in which order the triple patterns are looked up.
+
+    Args:
+        parsed_query (dict): The query parsed by parse_pattern_query.
+
+    Returns:
+        tuple: The initially bound variable (None if there is none), its 
+        IRIs, the remaining filter expressions and the ordered triple 
+        patterns.
+    """
+
+    group = parsed_query["group"]
+
+    filters = list(group["filters"])
+
+    pattern_variables = set(term[1] for pattern in group["patterns"] for term in pattern if isinstance(term, tuple))
+
+    variable, iris = None, None
+
+    if group["values"] is not None:
+
+        variable, iris = group["values"]
+
+    else:
+
+        # A filter like "(?value = <a> || ?value = <b>)" (used by the
+        # BatchLoader) binds the variable before the lookups instead of
+        # filtering all triples of the graph
+
+        for expression in filters:
+
+            alternatives = _iri_alternatives(expression)
+
+            if alternatives is not None and alternatives[0] in pattern_variables:
+
+                variable, iris = alternatives[0], list(dict.fromkeys(alternatives[1]))
+
+                filters.remove(expression)
+
+                break
+
+    # like the SPARQL engine, patterns with fewer unbound variables are looked
+    # up first
+
+    bound = set() if variable is None else {variable}
+
+    patterns = sorted(group["patterns"], key=lambda pattern: sum(1 for term in pattern if isinstance(term, tuple) and term[1] not in bound))
+
+    return variable, iris, filters, patterns
+
+
+def execute_pattern_query(graph, parsed_query):
+    """Answers a query parsed by parse_pattern_query with lookups in the
+    indices of the graph instead of the SPARQL engine. The results equal those
+    of the SPARQL engine, only the order of the rows may differ.
+
+    Args:
+        graph (rdflib.Graph): The graph to query.
+        parsed_query (dict): The query parsed by parse_pattern_query.
+
+    Returns:
+        tuple: The names of the variables and the rows of terms (None if
+        unbound).
+    """
+
+    variable, iris, filters, patterns = plan_pattern_query(parsed_query)
+
+    seeds = [{}] if variable is None else [{variable: iri} for iri in iris]
+
+    solutions = (solution for seed in seeds for solution in _match_patterns(graph, patterns, seed))
+
+    rows = [tuple(solution.get(variable) for variable in parsed_query["variables"]) for solution in solutions if all(_evaluate(expression, solution) for expression in filters)]
+
+    if parsed_query["distinct"]:
+
+        rows = list(dict.fromkeys(rows))
+
+    return parsed_query["variables"], rows
+
+
+def query_graph(graph, query, typed_literals=False):
+    """Issues a SPARQL query against an rdflib graph. Queries supported by 
+    parse_pattern_query are answered by execute_pattern_query, all others by 
+    the SPARQL engine of rdflib. In both cases, the resulting terms are 
+    converted into columns directly, see terms_to_frame.
+
+    Args:
+        graph (rdflib.Graph): The graph to query.
+        query (str): SPARQL SELECT query.
+        typed_literals (bool, optional): If True, literals are converted 
+            according to their datatypes, see terms_to_frame. Defaults to 
+            False.
+
+    Raises:
+        ValueError: Raised if the query isn't a SELECT query.
+
+    Returns:
+        pd.DataFrame: The query results.
+    """
+
+    parsed_query = parse_pattern_query(query, graph.namespaces())
+
+    if parsed_query is not None:
+
+        # stores with their own executor (e.g. a TripleTableStore) may answer
+        # the query at once, instead of pattern by pattern
+
+        store_execute = getattr(graph.store, "execute_pattern_query", None)
+
+        result = store_execute(parsed_query) if store_execute is not None else None
+
+        if result is None:
+            result = execute_pattern_query(graph, parsed_query)
+
+        return terms_to_frame(*result, typed_literals)
+
+    results = graph.query(query)
+
+    if results.type != "SELECT":
+        raise ValueError("Only the results of SELECT queries can be converted into a DataFrame, not of " + results.type + " queries.")
+
+    rows = [tuple(binding.get(variable) for variable in results.vars) for binding in results.bindings]
+
+    return terms_to_frame(results.vars, rows, typed_literals)
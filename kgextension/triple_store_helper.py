@@ -0,0 +1,428 @@
+import os
+import sqlite3
+import threading
+import time
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import Store, VALID_STORE
+
+
+def term_key(term):
+    """Encodes an RDF term as the key of the term dictionary of a
+    SQLiteTripleStore.
+
+    Args:
+        term (rdflib.term.Identifier): IRI, blank node or literal.
+
+    Raises:
+        TypeError: Raised for other terms, e.g. variables or formulas.
+
+    Returns:
+        tuple: Kind ("U", "B" or "L"), lexical form, datatype and language
+        ("" if absent).
+    """
+
+    if isinstance(term, URIRef):
+        return ("U", str(term), "", "")
+
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+
+    if isinstance(term, Literal):
+        return ("L", str(term), str(term.datatype or ""), term.language or "")
+
+    raise TypeError("Terms of the type " + type(term).__name__ + " can't be stored in a SQLiteTripleStore.")
+
+
+def key_term(kind, value, datatype, language):
+    """Decodes a key of the term dictionary, see term_key.
+
+    Returns:
+        rdflib.term.Identifier: The term.
+    """
+
+    if kind == "U":
+        return URIRef(value)
+
+    if kind == "B":
+        return BNode(value)
+
+    return Literal(value, lang=language or None, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteTripleStore(Store):
+    """Persistent rdflib store in a SQLite database. The terms are interned
+    into integer IDs, the triples are kept as ID triples with indices in SPO,
+    POS and OSP order, so that every triple pattern is answered by an index
+    lookup. A graph backed by the store, e.g. Graph(store=
+    SQLiteTripleStore("dump.db")), can be reopened later without parsing the
+    data again. The store only holds one graph and isn't context aware.
+    """
+
+    def __init__(self, configuration=None, identifier=None, batch_size=50000, term_cache_size=1000000):
+        """Configuration of the store.
+
+        Args:
+            configuration (str, optional): Path of the database file, which is
+                created if it doesn't exist. If None, the store has to be
+                opened with "open". Defaults to None.
+            identifier (rdflib.URIRef, optional): Identifier of the store.
+                Defaults to None.
+            batch_size (int, optional): Number of added triples that are
+                buffered before they are written. Defaults to 50000.
+            term_cache_size (int, optional): Maximal number of term IDs that
+                are kept in memory, in each direction. Defaults to 1000000.
+        """
+
+        self.batch_size = batch_size
+        self.term_cache_size = term_cache_size
+        self._connection = None
+        self._pending = []
+        self._term_ids = {}
+        self._terms = {}
+        self._lock = threading.RLock()
+
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration, create=True):
+        """Opens (and creates) the database.
+
+        Args:
+            configuration (str): Path of the database file.
+            create (bool, optional): Ignored, the database is always created
+                if it doesn't exist. Defaults to True.
+
+        Returns:
+            int: rdflib.store.VALID_STORE.
+        """
+
+        self.path = configuration
+
+        connection = sqlite3.connect(configuration, check_same_thread=False)
+
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        with connection:
+
+            connection.execute("CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, kind TEXT, value TEXT, datatype TEXT, language TEXT, UNIQUE (kind, value, datatype, language))")
+            connection.execute("CREATE TABLE IF NOT EXISTS triples (s INTEGER, p INTEGER, o INTEGER, PRIMARY KEY (s, p, o)) WITHOUT ROWID")
+            connection.execute("CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s)")
+            connection.execute("CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p)")
+            connection.execute("CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, namespace TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, format TEXT, modified REAL, loaded REAL)")
+
+        self._connection = connection
+
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=True):
+        """Writes the buffered triples (unless "commit_pending_transaction" is
+        False) and closes the database.
+        """
+
+        with self._lock:
+
+            if self._connection is None:
+                return
+
+            if commit_pending_transaction:
+                self.commit()
+
+            self._connection.close()
+
+            self._connection = None
+            self._pending = []
+
+    def destroy(self, configuration):
+        """Deletes the database file.
+        """
+
+        self.close(False)
+
+        for suffix in ("", "-wal", "-shm"):
+
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def commit(self):
+        """Writes the buffered triples.
+        """
+
+        with self._lock:
+
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, []
+
+            ids = self._intern(set(term for triple in pending for term in triple))
+
+            with self._connection:
+                self._connection.executemany("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", [(ids[s], ids[p], ids[o]) for s, p, o in pending])
+
+    def rollback(self):
+        """Discards the buffered triples.
+        """
+
+        with self._lock:
+            self._pending = []
+
+    def _intern(self, terms):
+        """Returns the IDs of the terms, which are added to the dictionary if
+        necessary.
+        """
+
+        ids = {}
+        keys = {}
+
+        for term in terms:
+
+            key = term_key(term)
+
+            term_id = self._term_ids.get(key)
+
+            if term_id is None:
+                keys[key] = term
+            else:
+                ids[term] = term_id
+
+        if keys:
+
+            with self._connection:
+
+                for key, term in keys.items():
+
+                    cursor = self._connection.execute("INSERT OR IGNORE INTO terms (kind, value, datatype, language) VALUES (?, ?, ?, ?)", key)
+
+                    # If the term was known, but not cached, it is looked up
+
+                    if cursor.rowcount == 1:
+                        ids[term] = cursor.lastrowid
+                    else:
+                        ids[term] = self._connection.execute("SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND language = ?", key).fetchone()[0]
+
+            if len(self._term_ids) + len(keys) > self.term_cache_size:
+                self._term_ids.clear()
+
+            self._term_ids.update((key, ids[term]) for key, term in keys.items())
+
+        return ids
+
+    def _lookup(self, term):
+        """Returns the ID of a term, None if it isn't in the dictionary.
+        """
+
+        key = term_key(term)
+
+        term_id = self._term_ids.get(key)
+
+        if term_id is None:
+
+            row = self._connection.execute("SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND language = ?", key).fetchone()
+
+            if row is None:
+                return None
+
+            term_id = row[0]
+
+        return term_id
+
+    def _decode(self, ids):
+        """Returns a dict from the IDs to their terms.
+        """
+
+        terms = {}
+        missing = []
+
+        for term_id in ids:
+
+            term = self._terms.get(term_id)
+
+            if term is None:
+                missing.append(term_id)
+            else:
+                terms[term_id] = term
+
+        # SQLite allows at most 999 parameters per statement in old versions
+
+        for start in range(0, len(missing), 900):
+
+            chunk = missing[start:start+900]
+
+            rows = self._connection.execute("SELECT id, kind, value, datatype, language FROM terms WHERE id IN (" + ",".join("?" * len(chunk)) + ")", chunk).fetchall()
+
+            for term_id, kind, value, datatype, language in rows:
+                terms[term_id] = key_term(kind, value, datatype, language)
+
+        if missing:
+
+            if len(self._terms) + len(missing) > self.term_cache_size:
+                self._terms.clear()
+
+            self._terms.update((term_id, terms[term_id]) for term_id in missing)
+
+        return terms
+
+    def add(self, triple, context=None, quoted=False):
+        """Adds a triple; it is buffered until "batch_size" triples are
+        pending or the store is committed or queried.
+        """
+
+        for term in triple:
+            term_key(term)
+
+        with self._lock:
+
+            self._pending.append(triple)
+
+            if len(self._pending) >= self.batch_size:
+                self.commit()
+
+    def _pattern_condition(self, triple_pattern):
+        """Translates a triple pattern into a WHERE clause of the triples
+        table, None if a bound term isn't in the dictionary.
+        """
+
+        conditions = []
+        parameters = []
+
+        for column, term in zip("spo", triple_pattern):
+
+            if term is None:
+                continue
+
+            term_id = self._lookup(term)
+
+            if term_id is None:
+                return None
+
+            conditions.append(column + " = ?")
+            parameters.append(term_id)
+
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def remove(self, triple_pattern, context=None):
+        """Removes all triples that match the pattern.
+        """
+
+        with self._lock:
+
+            self.commit()
+
+            condition = self._pattern_condition(triple_pattern)
+
+            if condition is None:
+                return
+
+            with self._connection:
+                self._connection.execute("DELETE FROM triples" + condition[0], condition[1])
+
+    def triples(self, triple_pattern, context=None):
+        """Yields the triples that match the pattern; None matches any term.
+
+        Yields:
+            tuple: The triple and an (empty) iterator of its contexts.
+        """
+
+        with self._lock:
+
+            self.commit()
+
+            condition = self._pattern_condition(triple_pattern)
+
+            if condition is None:
+                return
+
+            cursor = self._connection.execute("SELECT s, p, o FROM triples" + condition[0], condition[1])
+
+        while True:
+
+            with self._lock:
+
+                rows = cursor.fetchmany(10000)
+
+                if not rows:
+                    return
+
+                terms = self._decode(set(term_id for row in rows for term_id in row))
+
+            for s, p, o in rows:
+                yield (terms[s], terms[p], terms[o]), iter(())
+
+    def __len__(self, context=None):
+
+        with self._lock:
+
+            self.commit()
+
+            return self._connection.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def bind(self, prefix, namespace, override=True):
+
+        with self._lock, self._connection:
+
+            if override:
+
+                self._connection.execute("DELETE FROM namespaces WHERE namespace = ?", (str(namespace),))
+                self._connection.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)", (prefix, str(namespace)))
+
+            elif self.namespace(prefix) is None and self.prefix(namespace) is None:
+
+                self._connection.execute("INSERT INTO namespaces VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+
+        with self._lock:
+
+            row = self._connection.execute("SELECT namespace FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+
+        return None if row is None else URIRef(row[0])
+
+    def prefix(self, namespace):
+
+        with self._lock:
+
+            row = self._connection.execute("SELECT prefix FROM namespaces WHERE namespace = ?", (str(namespace),)).fetchone()
+
+        return None if row is None else row[0]
+
+    def namespaces(self):
+
+        with self._lock:
+
+            rows = self._connection.execute("SELECT prefix, namespace FROM namespaces").fetchall()
+
+        for prefix, namespace in rows:
+            yield prefix, URIRef(namespace)
+
+    def sources(self):
+        """Returns the files that were loaded into the store, see
+        record_source.
+
+        Returns:
+            dict: The format and modification time of each path.
+        """
+
+        with self._lock:
+
+            rows = self._connection.execute("SELECT path, format, modified FROM sources ORDER BY loaded").fetchall()
+
+        return {path: (file_format, modified) for path, file_format, modified in rows}
+
+    def record_source(self, path, file_format, modified):
+        """Records that a file was loaded into the store, so that it isn't
+        loaded again.
+
+        Args:
+            path (str): Absolute path of the file.
+            file_format (str): Format of the file.
+            modified (float): Modification time of the file.
+        """
+
+        with self._lock:
+
+            self.commit()
+
+            with self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)", (path, file_format, modified, time.time()))
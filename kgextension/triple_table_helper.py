@@ -0,0 +1,572 @@
+import json
+import os
+
+import numpy as np
+from rdflib import URIRef
+from rdflib.store import Store, VALID_STORE
+
+from kgextension.triple_pattern_helper import plan_pattern_query
+from kgextension.triple_store_helper import term_key, key_term
+
+
+TABLE_FORMAT_VERSION = 1
+
+# the column order of each index, e.g. "pos" is sorted by predicate, object
+# and subject
+
+_ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+_KINDS = {"U": 0, "B": 1, "L": 2}
+
+_term_tests = {"isliteral": (2,), "isiri": (0,), "isuri": (0,), "isblank": (1,)}
+
+
+def encode_term(term):
+    """Encodes an RDF term as the key of the term dictionary of a
+    TripleTable. The value comes last, so that it may contain the separator.
+
+    Args:
+        term (rdflib.term.Identifier): IRI, blank node or literal.
+
+    Returns:
+        bytes: The encoded term.
+    """
+
+    kind, value, datatype, language = term_key(term)
+
+    return "\x00".join((kind, datatype, language, value)).encode("utf-8")
+
+
+def decode_term(key):
+    """Decodes a key of the term dictionary, see encode_term.
+
+    Returns:
+        rdflib.term.Identifier: The term.
+    """
+
+    kind, datatype, language, value = key.decode("utf-8").split("\x00", 3)
+
+    return key_term(kind, value, datatype, language)
+
+
+def _save(directory, name, array):
+    """Saves an array via a temporary file, so that tables that are still
+    memory-mapped by readers keep their data.
+    """
+
+    path = os.path.join(directory, name)
+
+    with open(path + ".tmp", "wb") as file:
+        np.save(file, array)
+
+    os.replace(path + ".tmp", path)
+
+
+def build_triple_table(directory, triples, namespaces=(), sources=None):
+    """Builds a TripleTable: the terms are interned into integer IDs (their
+    rank in the sorted term dictionary), the ID triples are deduplicated and
+    stored as sorted columns in SPO, POS and OSP order. All arrays are saved
+    as .npy files, which TripleTable maps into memory.
+
+    Args:
+        directory (str): Directory of the table, which is created if
+            necessary. An existing table is replaced.
+        triples (iterable): The triples of rdflib terms, e.g. a Graph.
+        namespaces (iterable, optional): (prefix, namespace) pairs that are
+            stored with the table. Defaults to ().
+        sources (dict, optional): The loaded files with their format and
+            modification time, see LocalEndpoint. Defaults to None.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    # the terms are numbered in order of appearance first, then by rank
+
+    term_indices = {}
+
+    columns = ([], [], [])
+
+    for triple in triples:
+
+        for column, term in zip(columns, triple):
+
+            index = term_indices.get(term)
+
+            if index is None:
+                index = term_indices[term] = len(term_indices)
+
+            column.append(index)
+
+    keys = [encode_term(term) for term in term_indices]
+
+    del term_indices
+
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys))
+
+    keys = [keys[index] for index in order]
+
+    dtype = np.int32 if len(keys) < 2**31 else np.int64
+
+    spo = ranks[np.array(columns, dtype=np.int64).reshape(3, -1)].T.astype(dtype)
+
+    del columns
+
+    # np.unique sorts the rows, i.e. yields the SPO order
+
+    spo = np.unique(spo, axis=0) if len(spo) else spo.reshape(0, 3)
+
+    with open(os.path.join(directory, "terms.bin.tmp"), "wb") as file:
+        file.write(b"".join(keys))
+
+    os.replace(os.path.join(directory, "terms.bin.tmp"), os.path.join(directory, "terms.bin"))
+
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(key) for key in keys])
+
+    _save(directory, "term_offsets.npy", offsets)
+    _save(directory, "term_kinds.npy", np.array([_KINDS[chr(key[0])] for key in keys], dtype=np.uint8))
+
+    for name, (first, second, third) in _ORDERS.items():
+
+        rows = spo[np.lexsort((spo[:, third], spo[:, second], spo[:, first]))]
+
+        for position, column in enumerate((first, second, third)):
+            _save(directory, name + "_" + str(position) + ".npy", np.ascontiguousarray(rows[:, column]))
+
+        # the first two columns combined, to look up pairs with one search
+
+        _save(directory, name + "_01.npy", rows[:, first].astype(np.int64) * len(keys) + rows[:, second])
+
+    meta = {
+        "version": TABLE_FORMAT_VERSION,
+        "terms": len(keys),
+        "triples": len(spo),
+        "namespaces": {prefix: str(namespace) for prefix, namespace in namespaces},
+        "sources": sources or {}}
+
+    with open(os.path.join(directory, "meta.json.tmp"), "w") as file:
+        json.dump(meta, file)
+
+    os.replace(os.path.join(directory, "meta.json.tmp"), os.path.join(directory, "meta.json"))
+
+
+def read_table_meta(directory):
+    """Reads the metadata of a TripleTable.
+
+    Args:
+        directory (str): Directory of the table.
+
+    Returns:
+        dict: The metadata, see build_triple_table; None if there is no
+        table of the current format in the directory.
+    """
+
+    try:
+
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+
+    except FileNotFoundError:
+
+        return None
+
+    return meta if meta.get("version") == TABLE_FORMAT_VERSION else None
+
+
+class TripleTable():
+    """Read-only, dictionary-encoded triple table, built by
+    build_triple_table. All arrays are memory-mapped, so opening a table is
+    instant and several processes share one copy of the data in the page
+    cache. Triple patterns are looked up by binary search in the index whose
+    leading columns are bound; the patterns of the generator queries are
+    joined with vectorized array operations for all entities at once.
+    """
+
+    def __init__(self, directory, term_cache_size=1000000):
+        """Opens a table.
+
+        Args:
+            directory (str): Directory of the table.
+            term_cache_size (int, optional): Maximal number of decoded terms
+                that are kept in memory. Defaults to 1000000.
+
+        Raises:
+            ValueError: Raised if the directory contains no table of the
+                current format.
+        """
+
+        meta = read_table_meta(directory)
+
+        if meta is None:
+            raise ValueError(directory + " does not contain a triple table of version " + str(TABLE_FORMAT_VERSION) + ".")
+
+        self.directory = directory
+        self.meta = meta
+        self.term_count = meta["terms"]
+        self.triple_count = meta["triples"]
+        self.term_cache_size = term_cache_size
+        self._terms = {}
+
+        terms_path = os.path.join(directory, "terms.bin")
+
+        # empty files can't be memory-mapped
+
+        if os.path.getsize(terms_path) > 0:
+            self._blob = np.memmap(terms_path, dtype=np.uint8, mode="r")
+        else:
+            self._blob = np.zeros(0, dtype=np.uint8)
+
+        self._offsets = self._load("term_offsets.npy")
+        self.kinds = self._load("term_kinds.npy")
+
+        self.indices = {name: [self._load(name + "_" + suffix + ".npy") for suffix in ("0", "1", "2", "01")] for name in _ORDERS}
+
+    def _load(self, name):
+
+        return np.load(os.path.join(self.directory, name), mmap_mode="r")
+
+    def _key(self, term_id):
+
+        return self._blob[self._offsets[term_id]:self._offsets[term_id+1]].tobytes()
+
+    def term_id(self, term):
+        """Looks up the ID of a term by binary search in the sorted term
+        dictionary.
+
+        Args:
+            term (rdflib.term.Identifier): The term.
+
+        Returns:
+            int: The ID, None if the term doesn't occur in the table.
+        """
+
+        key = encode_term(term)
+
+        low, high = 0, self.term_count
+
+        while low < high:
+
+            middle = (low + high) // 2
+
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.term_count and self._key(low) == key:
+            return low
+
+        return None
+
+    def term(self, term_id):
+        """Decodes a term ID.
+
+        Args:
+            term_id (int): The ID.
+
+        Returns:
+            rdflib.term.Identifier: The term.
+        """
+
+        term = self._terms.get(term_id)
+
+        if term is None:
+
+            if len(self._terms) >= self.term_cache_size:
+                self._terms.clear()
+
+            term = self._terms[term_id] = decode_term(self._key(term_id))
+
+        return term
+
+    def match(self, pattern, solutions, count):
+        """Joins a triple pattern with a set of solutions.
+
+        Args:
+            pattern (tuple): Subject, predicate and object, each an ID or a
+                ("var", name) tuple.
+            solutions (dict): Array of IDs per bound variable.
+            count (int): Number of solutions.
+
+        Returns:
+            tuple: The extended solutions and their number.
+        """
+
+        bound = [position for position, term in enumerate(pattern) if not isinstance(term, tuple) or term[1] in solutions]
+
+        name = next(name for name, order in _ORDERS.items() if set(order[:len(bound)]) == set(bound))
+
+        order = _ORDERS[name]
+        index = self.indices[name]
+
+        keys = [np.full(count, pattern[position], dtype=np.int64) if not isinstance(pattern[position], tuple) else solutions[pattern[position][1]].astype(np.int64) for position in order[:len(bound)]]
+
+        # the range of matching rows of the index for each solution
+
+        if not bound:
+
+            low = np.zeros(count, dtype=np.int64)
+            high = np.full(count, self.triple_count, dtype=np.int64)
+
+        elif len(bound) == 1:
+
+            low = np.searchsorted(index[0], keys[0], "left")
+            high = np.searchsorted(index[0], keys[0], "right")
+
+        else:
+
+            pairs = keys[0] * self.term_count + keys[1]
+
+            low = np.searchsorted(index[3], pairs, "left")
+            high = np.searchsorted(index[3], pairs, "right")
+
+        lengths = high - low
+
+        parents = np.repeat(np.arange(count), lengths)
+
+        rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(low, lengths)
+
+        keep = np.ones(len(rows), dtype=bool)
+
+        if len(bound) == 3:
+            keep &= index[2][rows] == keys[2][parents]
+
+        extended = {variable: values[parents] for variable, values in solutions.items()}
+
+        for position, term in enumerate(pattern):
+
+            if position in bound:
+                continue
+
+            values = index[order.index(position)][rows]
+
+            # a variable that occurs twice in the pattern must match twice
+
+            if term[1] in extended:
+                keep &= extended[term[1]] == values
+            else:
+                extended[term[1]] = values
+
+        if not keep.all():
+
+            extended = {variable: values[keep] for variable, values in extended.items()}
+
+        return extended, int(keep.sum())
+
+    def _filter_mask(self, expression, solutions, count):
+        """Evaluates a filter expression for all solutions.
+        """
+
+        operator = expression[0]
+
+        if operator in ("or", "and"):
+
+            masks = [self._filter_mask(operand, solutions, count) for operand in expression[1]]
+
+            return np.logical_or.reduce(masks) if operator == "or" else np.logical_and.reduce(masks)
+
+        variable = expression[2] if operator == "test" else expression[1]
+
+        if variable not in solutions:
+            return np.zeros(count, dtype=bool)
+
+        if operator == "test":
+            return np.isin(self.kinds[solutions[variable]], _term_tests[expression[1]])
+
+        term_id = self.term_id(expression[2])
+
+        return solutions[variable] == (-1 if term_id is None else term_id)
+
+    def execute_pattern_query(self, parsed_query):
+        """Answers a query parsed by parse_pattern_query with vectorized
+        lookups and joins, see triple_pattern_helper.execute_pattern_query.
+
+        Args:
+            parsed_query (dict): The query parsed by parse_pattern_query.
+
+        Returns:
+            tuple: The names of the variables and the rows of terms (None if
+            unbound); None if the query has to be answered pattern by
+            pattern.
+        """
+
+        variable, iris, filters, patterns = plan_pattern_query(parsed_query)
+
+        solutions, count = {}, 1
+
+        if variable is not None:
+
+            # IRIs that aren't in the table can't match the patterns,
+            # variables bound only by VALUES are left to the other executor
+
+            if not any(isinstance(term, tuple) and term[1] == variable for pattern in patterns for term in pattern):
+                return None
+
+            ids = [self.term_id(iri) for iri in iris]
+
+            solutions = {variable: np.array([term_id for term_id in ids if term_id is not None], dtype=np.int64)}
+
+            count = len(solutions[variable])
+
+        for pattern in patterns:
+
+            encoded = tuple(term if isinstance(term, tuple) else self.term_id(term) for term in pattern)
+
+            if None in encoded:
+                solutions, count = {name: np.zeros(0, dtype=np.int64) for name in solutions}, 0
+
+            if count == 0:
+                break
+
+            solutions, count = self.match(encoded, solutions, count)
+
+        if count > 0 and filters:
+
+            keep = np.logical_and.reduce([self._filter_mask(expression, solutions, count) for expression in filters])
+
+            solutions = {name: values[keep] for name, values in solutions.items()}
+
+            count = int(keep.sum())
+
+        variables = parsed_query["variables"]
+
+        columns = [solutions.get(name, np.full(count, -1, dtype=np.int64)) if count else np.zeros(0, dtype=np.int64) for name in variables]
+
+        if parsed_query["distinct"] and count > 0:
+
+            _, first = np.unique(np.stack(columns, axis=1), axis=0, return_index=True)
+
+            first.sort()
+
+            columns = [column[first] for column in columns]
+
+        terms = {-1: None}
+
+        for column in columns:
+
+            for term_id in np.unique(column):
+
+                if term_id not in terms:
+                    terms[term_id] = self.term(int(term_id))
+
+        rows = list(zip(*[[terms[term_id] for term_id in column.tolist()] for column in columns]))
+
+        return variables, rows
+
+    def triples(self, triple_pattern):
+        """Yields the triples that match the pattern; None matches any term.
+
+        Yields:
+            tuple: The triple.
+        """
+
+        pattern = []
+
+        for position, term in enumerate(triple_pattern):
+
+            if term is None:
+
+                pattern.append(("var", position))
+
+            else:
+
+                term_id = self.term_id(term)
+
+                if term_id is None:
+                    return
+
+                pattern.append(term_id)
+
+        solutions, count = self.match(tuple(pattern), {}, 1)
+
+        for values in zip(*[solutions[position].tolist() if position in solutions else [pattern[position]] * count for position in range(3)]):
+            yield tuple(self.term(term_id) for term_id in values)
+
+
+class TripleTableStore(Store):
+    """Read-only rdflib store over a TripleTable, e.g. Graph(store=
+    TripleTableStore("dump_table")). Queries supported by the fast path of
+    query_graph are answered by the vectorized executor of the table, all
+    others by the SPARQL engine of rdflib via "triples".
+    """
+
+    def __init__(self, configuration=None, identifier=None):
+        """Configuration of the store.
+
+        Args:
+            configuration (str, optional): Directory of the table. If None,
+                the store has to be opened with "open". Defaults to None.
+            identifier (rdflib.URIRef, optional): Identifier of the store.
+                Defaults to None.
+        """
+
+        self.table = None
+        self._namespaces = {}
+
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration, create=False):
+        """Opens the table.
+
+        Returns:
+            int: rdflib.store.VALID_STORE.
+        """
+
+        self.table = TripleTable(configuration)
+
+        self._namespaces = dict(self.table.meta["namespaces"])
+
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+
+        self.table = None
+
+    def add(self, triple, context=None, quoted=False):
+
+        raise TypeError("A TripleTableStore is read-only, use build_triple_table to add triples.")
+
+    def remove(self, triple_pattern, context=None):
+
+        raise TypeError("A TripleTableStore is read-only, use build_triple_table to remove triples.")
+
+    def triples(self, triple_pattern, context=None):
+
+        for triple in self.table.triples(triple_pattern):
+            yield triple, iter(())
+
+    def execute_pattern_query(self, parsed_query):
+
+        return self.table.execute_pattern_query(parsed_query)
+
+    def __len__(self, context=None):
+
+        return self.table.triple_count
+
+    def bind(self, prefix, namespace, override=True):
+
+        # the bindings are only kept in memory, the table is read-only
+
+        if override or (prefix not in self._namespaces and self.prefix(namespace) is None):
+
+            self._namespaces = {bound_prefix: bound_namespace for bound_prefix, bound_namespace in self._namespaces.items() if bound_namespace != str(namespace)}
+
+            self._namespaces[prefix] = str(namespace)
+
+    def namespace(self, prefix):
+
+        namespace = self._namespaces.get(prefix)
+
+        return None if namespace is None else URIRef(namespace)
+
+    def prefix(self, namespace):
+
+        return next((prefix for prefix, bound_namespace in self._namespaces.items() if bound_namespace == str(namespace)), None)
+
+    def namespaces(self):
+
+        for prefix, namespace in list(self._namespaces.items()):
+            yield prefix, URIRef(namespace)
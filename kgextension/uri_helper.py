@@ -1,25 +1,357 @@
 from rdflib import Graph
-from rdflib.plugins.sparql.results.csvresults import CSVResultSerializer
-from functools import lru_cache
+from kgextension.cache_backend_helper import cached, normalize_query, negative_cache, get_cache_backend, CacheInfo, MemoryCacheBackend
+from kgextension.http_helper import shared_session
+from kgextension.triple_pattern_helper import query_graph
 import pandas as pd
 import numpy as np
 import requests
 import re
-import io
 import urllib.error
 import urllib.parse
 import json
 import re
+import socket
+import sys
+import threading
+import time
 import urllib.request
 import warnings
 import xml
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from tqdm.auto import tqdm
 
 
-@lru_cache(maxsize=None)
-def query_uri_logic(uri, query_string, return_format):
+_accept_headers = {
+    "application/rdf+xml": "application/rdf+xml",
+    "xml": "application/rdf+xml",
+    "n3": "text/n3",
+    "turtle": "text/turtle",
+    "ttl": "text/turtle",
+    "nt": "application/n-triples",
+    "json-ld": "application/ld+json"}
+
+
+def fetch_document(uri, return_format, validators=None):
+    """Dereferences a URI via HTTP(S). If the validators of an earlier 
+    response are given, the request is conditional, i.e. the server answers 
+    with "304 Not Modified" and without the document if it is unchanged.
+
+    Args:
+        uri (str): Dereferencable URI.
+        return_format (str): Format of the document, see query_uri_logic.
+        validators (dict, optional): The "etag" and "last_modified" headers of
+            an earlier response. Defaults to None.
+
+    Raises:
+        requests.exceptions.RequestException: Raised if the request fails.
+
+    Returns:
+        dict: The document ("content") and its validators ("etag", 
+        "last_modified"), None if the document is unchanged.
+    """
+
+    headers = {"Accept": _accept_headers.get(return_format, "*/*")}
+
+    if validators is not None:
+
+        if validators["etag"] is not None:
+            headers["If-None-Match"] = validators["etag"]
+
+        if validators["last_modified"] is not None:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = shared_session.get(urllib.parse.quote(uri, safe=":/"), headers=headers, timeout=60)
+
+    if validators is not None and response.status_code == 304:
+
+        return None
+
+    response.raise_for_status()
+
+    return {"content": response.content, "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+
+def parse_graph(uri, return_format, content=None):
+    """Parses the document of a URI. If no content is given, the URI is 
+    dereferenced by rdflib, e.g. for local files.
+
+    Args:
+        uri (str): Dereferencable URI.
+        return_format (str): Format of the document, see query_uri_logic.
+        content (bytes, optional): The document. Defaults to None.
+
+    Returns:
+        rdflib.Graph: The parsed graph.
+    """
+
+    graph = Graph()
+
+    if content is None:
+        graph.parse(urllib.parse.quote(uri, safe=":/"), format=return_format)
+    else:
+        graph.parse(data=content, format=return_format, publicID=uri)
+
+    return graph
+
+
+def estimate_graph_size(graph):
+    """Estimates the memory footprint of a parsed graph: the size of its terms
+    plus the overhead of the store's indices per triple.
+
+    Args:
+        graph (rdflib.Graph): The graph.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+
+    return sum(sys.getsizeof(term) for triple in graph for term in triple) + 250 * len(graph)
+
+
+class GraphCache():
+    """Caches the parsed documents of dereferenced URIs, keyed by URI and 
+    format, so that all queries against a URI run on the same graph instead of
+    downloading and parsing the document again. When the estimated size of 
+    the graphs exceeds "max_bytes", the least recently used graphs are 
+    evicted. The graphs are kept in memory only and must not be changed by 
+    callers. Like a cached function, it offers "cache_info" and 
+    "cache_clear".
+
+    Documents fetched via HTTP(S) are revalidated with conditional requests 
+    (ETag/Last-Modified) once they are older than "ttl": if the server 
+    answers "304 Not Modified", the graph is kept. If the current cache 
+    backend is persistent (e.g. a SQLiteCacheBackend), the documents and their
+    validators are also stored there ("dereferenced_documents"), so that 
+    later processes revalidate them instead of downloading them again.
+    """
+
+    def __init__(self, max_bytes=256*1024**2, ttl=24*60*60):
+        """Configuration of the graph cache.
+
+        Args:
+            max_bytes (int, optional): Memory budget (in bytes) of all graphs, 
+                as estimated by estimate_graph_size. Defaults to 256*1024**2 
+                (256 MiB).
+            ttl (float, optional): Time (in seconds) after which a graph is 
+                revalidated. If None, graphs are never revalidated. Defaults to
+                24*60*60 (one day).
+        """
+
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.resident_bytes = 0
+        self._graphs = OrderedDict()
+        self._in_flight = {}
+        self._statistics = {"hits": 0, "misses": 0, "evictions": 0, "revalidations": 0}
+        self._lock = threading.Lock()
+
+    def get_graph(self, uri, return_format):
+        """Returns the parsed document of a URI, which is dereferenced and 
+        parsed if it isn't cached (or revalidated if it is outdated). 
+        Concurrent requests for the same document wait for the first one.
+
+        Args:
+            uri (str): Dereferencable URI.
+            return_format (str): Format of the document, see query_uri_logic.
+
+        Returns:
+            rdflib.Graph: The parsed graph.
+        """
+
+        key = (uri, return_format)
+
+        with self._lock:
+
+            entry = self._graphs.get(key)
+
+            if entry is not None and (self.ttl is None or time.time() - entry["fetched"] < self.ttl):
+
+                self._graphs.move_to_end(key)
+
+                self._statistics["hits"] += 1
+
+                return entry["graph"]
+
+            future = self._in_flight.get(key)
+
+            leader = future is None
+
+            if leader:
+
+                future = self._in_flight[key] = Future()
+
+                self._statistics["misses"] += 1
+
+            else:
+
+                self._statistics["hits"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            graph = self._load(key, entry)
+
+        except BaseException as exception:
+
+            with self._lock:
+                del self._in_flight[key]
+
+            future.set_exception(exception)
+
+            raise
+
+        future.set_result(graph)
+
+        return graph
+
+    def _load(self, key, entry):
+        """Dereferences (or revalidates) and parses a document and stores the
+        graph.
+        """
+
+        uri, return_format = key
+
+        # other URIs, e.g. local files, are parsed by rdflib directly
+
+        if not uri.startswith(("http://", "https://")):
+
+            graph = parse_graph(uri, return_format)
+
+            self._store(key, {"graph": graph, "validators": None, "fetched": time.time()})
+
+            return graph
+
+        backend = get_cache_backend()
+
+        # the memory backend would only duplicate the documents of the graphs
+
+        persistent = not isinstance(backend, MemoryCacheBackend)
+
+        document = None
+
+        if entry is not None:
+            validators = entry["validators"]
+        elif persistent:
+            document = backend.get("dereferenced_documents", key)[1]
+            validators = document
+        else:
+            validators = None
+
+        new_document = fetch_document(uri, return_format, validators)
+
+        if new_document is None:
+
+            with self._lock:
+                self._statistics["revalidations"] += 1
+
+            # If the document is unchanged, the cached graph is kept, or the
+            # stored document is parsed
+
+            if entry is not None:
+
+                graph = entry["graph"]
+
+            else:
+
+                graph = parse_graph(uri, return_format, document["content"])
+
+        else:
+
+            document = new_document
+
+            graph = parse_graph(uri, return_format, document["content"])
+
+            if persistent and (document["etag"] is not None or document["last_modified"] is not None):
+                backend.set("dereferenced_documents", key, document)
+
+        if document is not None:
+            validators = {"etag": document["etag"], "last_modified": document["last_modified"]}
+
+        self._store(key, {"graph": graph, "validators": validators, "fetched": time.time()})
+
+        return graph
+
+    def _store(self, key, entry):
+        """Stores a graph and evicts the least recently used graphs, if the 
+        memory budget is exceeded. Graphs that exceed the budget on their own 
+        are not stored.
+        """
+
+        with self._lock:
+            previous = self._graphs.pop(key, None)
+
+        size = previous["size"] if previous is not None and previous["graph"] is entry["graph"] else estimate_graph_size(entry["graph"])
+
+        entry["size"] = size
+
+        with self._lock:
+
+            del self._in_flight[key]
+
+            if previous is not None:
+                self.resident_bytes -= previous["size"]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._graphs[key] = entry
+
+            self.resident_bytes += size
+
+            while self.max_bytes is not None and self.resident_bytes > self.max_bytes:
+
+                _, evicted = self._graphs.popitem(last=False)
+
+                self.resident_bytes -= evicted["size"]
+
+                self._statistics["evictions"] += 1
+
+    def cache_info(self):
+        """Returns the statistics of the graph cache. Revalidated graphs are 
+        counted as misses, see "revalidations".
+
+        Returns:
+            CacheInfo: The statistics.
+        """
+
+        with self._lock:
+
+            return CacheInfo(self._statistics["hits"], self._statistics["misses"], self.max_bytes, len(self._graphs), self._statistics["evictions"], self.resident_bytes)
+
+    @property
+    def revalidations(self):
+        """int: Number of revalidations answered with "304 Not Modified".
+        """
+
+        return self._statistics["revalidations"]
+
+    def cache_clear(self):
+        """Deletes all graphs (and the stored documents) and resets the 
+        statistics.
+        """
+
+        with self._lock:
+
+            self._graphs.clear()
+
+            self.resident_bytes = 0
+
+            self._statistics = {"hits": 0, "misses": 0, "evictions": 0, "revalidations": 0}
+
+        get_cache_backend().clear("dereferenced_documents")
+
+
+graph_cache = GraphCache()
+
+
+@cached("query_uri_logic", key=lambda arguments: (arguments["uri"], normalize_query(arguments["query_string"]), arguments["return_format"], arguments["typed_literals"]), ttl=lambda: graph_cache.ttl)
+def query_uri_logic(uri, query_string, return_format, caching=True, typed_literals=False):
     """Parsing & querying logic of the "query_uri" function. Detached from the 
-    main function for caching purposes.
+    main function for caching purposes. The results are cached as long as 
+    the documents in the graph_cache ("ttl"), so that outdated results are
+    queried again on the revalidated documents.
 
     Args:
         uri (str): Dereferencable URI.
@@ -29,23 +361,25 @@ def query_uri_logic(uri, query_string, return_format):
             sources (if the default "application/rdf+xml" is not supported). 
             For supported formats see: 
             https://rdflib.readthedocs.io/en/stable/plugin_parsers.html. 
+        caching (bool, optional): If True, the parsed document is taken from 
+            (or stored in) the graph_cache. Defaults to True.
+        typed_literals (bool, optional): If True, literals are converted 
+            according to their datatypes, see LocalEndpoint. Defaults to 
+            False.
 
     Returns:
         pd.DataFrame : Result of the SPARQL query issued against the URI.
     """
 
-    graph = Graph()
-    graph.parse(urllib.parse.quote(uri, safe=":/"), format=return_format)
-    query_result = graph.query(query_string)
-
-    serializer = CSVResultSerializer(query_result)
-    io_module = io.BytesIO()
-    serializer.serialize(io_module)
+    if caching:
+        graph = graph_cache.get_graph(uri, return_format)
+    else:
+        graph = parse_graph(uri, return_format)
 
-    return pd.read_csv(io.StringIO(io_module.getvalue().decode("utf-8")))
+    return query_graph(graph, query_string, typed_literals)
 
 
-def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbose = True, caching=True):
+def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbose = True, caching=True, typed_literals=False):
     """Function that allows to query a given dereferencable URI with a given 
     SPARQL query, without the need for an SPARQL endpoint.
 
@@ -60,8 +394,12 @@ def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbos
             Defaults to {"wikidata.org": "n3"}.
         verbose (bool, optional): Turn on/off warnings for likely malformed     
             URIs. Defaults to True.
-        caching (bool, optional): Turn result caching on or off. Defaults to 
-            True.
+        caching (bool, optional): Turn result caching on or off. URIs that
+            could not be dereferenced are recorded in the negative cache and 
+            skipped until the entry expires. Defaults to True.
+        typed_literals (bool, optional): If True, literals are converted 
+            according to their datatypes, see LocalEndpoint. Defaults to 
+            False.
 
     Returns:
         pd.DataFrame : Result of the SPARQL query issued against the URI. If 
@@ -74,6 +412,21 @@ def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbos
     
     else:
 
+        # If the URI failed recently, it isn't dereferenced again until the
+        # entry of the negative cache expires
+
+        if caching:
+
+            failure = negative_cache.check("uri", uri)
+
+            if failure is not None:
+
+                # the warning of the original failure is repeated
+
+                if verbose:
+                    warnings.warn(failure["message"])
+                return pd.DataFrame()
+
         try:
     
             return_format = "application/rdf+xml"
@@ -88,13 +441,25 @@ def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbos
                     pass
 
             if caching:
-                result = query_uri_logic(uri, query_string, return_format)
+                result = query_uri_logic(uri, query_string, return_format, typed_literals=typed_literals)
             else:
-                result = query_uri_logic.__wrapped__(uri, query_string, return_format)
+                result = query_uri_logic.__wrapped__(uri, query_string, return_format, caching=False, typed_literals=typed_literals)
 
             return result
 
-        except urllib.error.URLError:
+        except urllib.error.URLError as exception:
+
+            if caching:
+                negative_cache.record("uri", uri, url_error_category(exception), uri + " is not a valid URI.")
+
+            if verbose:
+                warnings.warn(uri + " is not a valid URI.")
+            return pd.DataFrame()
+
+        except requests.exceptions.RequestException as exception:
+
+            if caching:
+                negative_cache.record("uri", uri, request_error_category(exception), uri + " is not a valid URI.")
 
             if verbose:
                 warnings.warn(uri + " is not a valid URI.")
@@ -102,18 +467,27 @@ def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbos
 
         except FileNotFoundError:
 
+            if caching:
+                negative_cache.record("uri", uri, "not_found", uri + " might not be a valid URI.")
+
             if verbose:
                 warnings.warn(uri + " might not be a valid URI.")
             return pd.DataFrame()
 
         except xml.sax.SAXParseException:
 
+            if caching:
+                negative_cache.record("uri", uri, "unparsable", uri + " might not be dereferencable.")
+
             if verbose:
                 warnings.warn(uri + " might not be dereferencable.")
             return pd.DataFrame()
 
         except TypeError:
 
+            if caching:
+                negative_cache.record("uri", uri, "unparsable", uri + " might not be dereferencable.")
+
             if verbose:
                 warnings.warn(uri + " might not be dereferencable.")
             return pd.DataFrame()
@@ -125,7 +499,52 @@ def query_uri(uri, query_string, return_formats = {"wikidata.org": "n3"}, verbos
             return pd.DataFrame()
     
 
-def uri_querier(df, column, query, regex_filter = None, return_formats = {"wikidata.org": "n3"}, verbose = True, caching = True, prefix_lookup=False, progress= True):
+def request_error_category(exception):
+    """Determines the failure category of a failed request for the negative 
+    cache, see url_error_category.
+
+    Args:
+        exception (requests.exceptions.RequestException): The raised 
+            exception.
+
+    Returns:
+        str: "not_found", "http_error", "timeout" or "unreachable".
+    """
+
+    if isinstance(exception, requests.exceptions.HTTPError):
+
+        return "not_found" if exception.response is not None and exception.response.status_code in (404, 410) else "http_error"
+
+    if isinstance(exception, requests.exceptions.Timeout):
+
+        return "timeout"
+
+    return "unreachable"
+
+
+def url_error_category(exception):
+    """Determines the failure category of an URLError for the negative cache.
+
+    Args:
+        exception (urllib.error.URLError): The raised exception.
+
+    Returns:
+        str: "not_found" for HTTP status 404 and 410, "http_error" for other
+        HTTP errors, "timeout" for timeouts and "unreachable" otherwise.
+    """
+
+    if isinstance(exception, urllib.error.HTTPError):
+
+        return "not_found" if exception.code in (404, 410) else "http_error"
+
+    if isinstance(exception.reason, socket.timeout):
+
+        return "timeout"
+
+    return "unreachable"
+
+
+def uri_querier(df, column, query, regex_filter = None, return_formats = {"wikidata.org": "n3"}, verbose = True, caching = True, prefix_lookup=False, progress= True, max_workers=1, per_host_limit=2, time_budget=None, typed_literals=False):
     """Wrapper function for the query_uri function. Queries each URI in a specified column of a DataFrame with a user-provided query and returns the results as one joint DataFrame.
 
     Args:
@@ -159,19 +578,24 @@ def uri_querier(df, column, query, regex_filter = None, return_formats = {"wikid
         progress (bool, optional): If True, progress bars will be shown to 
             inform the user about the progress made by the process. Defaults to 
             True.
+        max_workers (int, optional): Number of URIs that are dereferenced 
+            concurrently. Defaults to 1.
+        per_host_limit (int, optional): Maximal number of concurrent requests 
+            to the same host, to not overload the servers of a data source. 
+            Defaults to 2.
+        time_budget (float, optional): Overall time (in seconds) for 
+            dereferencing the URIs. URIs that have not been started when it is
+            exhausted are skipped (with a warning) and yield no results. If 
+            None, there is no limit. Defaults to None.
+        typed_literals (bool, optional): If True, literals are converted 
+            according to their datatypes, see LocalEndpoint. Defaults to 
+            False.
             
     Returns:
         pd.DataFrame: Joint DataFrame that contains the query-results of all 
-        URIs.
+        URIs, in the order of the URIs.
     """
 
-    results = []
-
-    if progress:
-        iterator = tqdm(df[column], leave=False, desc="URI")
-    else:
-        iterator = df[column]
-
     if prefix_lookup:
         
         if prefix_lookup == True:
@@ -195,29 +619,60 @@ def uri_querier(df, column, query, regex_filter = None, return_formats = {"wikid
         query = "".join(["PREFIX " + str(x) + ": <" + namespace_prefixes[x]
             + "> " for x in query_prefixes if x in namespace_prefixes.keys()]) + query
 
-    for uri in iterator:
+    uris = df[column].tolist()
+
+    # every host gets its own limit of concurrent requests
+
+    host_limits = {host: threading.BoundedSemaphore(per_host_limit) for host in {urllib.parse.urlparse(uri).netloc for uri in uris if isinstance(uri, str)}}
+
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+    def dereference(uri):
+
+        if pd.isna(uri) or (regex_filter != None and re.search(regex_filter, uri) == None):
+
+            return pd.DataFrame()
 
-        if pd.isna(uri):
+        with host_limits[urllib.parse.urlparse(uri).netloc]:
 
-            results.append(pd.DataFrame())
+            # If the time budget is exhausted, the URI is skipped (None)
 
-        elif regex_filter == None:
+            if deadline is not None and time.monotonic() > deadline:
+
+                return None
 
             specific_query = query.replace("**URI**",uri)
-            result = query_uri(uri, specific_query, return_formats, caching=caching)
-            results.append(result)
 
+            return query_uri(uri, specific_query, return_formats, caching=caching, typed_literals=typed_literals)
+
+    if max_workers > 1:
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            futures = [executor.submit(dereference, uri) for uri in uris]
+
+            if progress:
+                for _ in tqdm(as_completed(futures), total=len(futures), leave=False, desc="URI"):
+                    pass
+
+            results = [future.result() for future in futures]
+
+    else:
+
+        if progress:
+            iterator = tqdm(uris, leave=False, desc="URI")
         else:
+            iterator = uris
 
-            if re.search(regex_filter, uri) == None:
+        results = [dereference(uri) for uri in iterator]
 
-                results.append(pd.DataFrame())
+    skipped = sum(result is None for result in results)
 
-            else:
+    if skipped:
+
+        warnings.warn(str(skipped) + " URIs were not dereferenced, since the time budget of " + str(time_budget) + " seconds was exhausted.")
 
-                specific_query = query.replace("**URI**",uri)
-                result = query_uri(uri, specific_query, return_formats, caching=caching)
-                results.append(result)
+        results = [pd.DataFrame() if result is None else result for result in results]
 
     result_df = pd.concat(results, ignore_index=True) 
     
@@ -3,7 +3,7 @@ import numpy as np
 from tqdm.auto import tqdm
 from kgextension.utilities_helper import is_valid_url, url_exists
 from kgextension.endpoints import DBpedia
-from kgextension.sparql_helper import endpoint_wrapper
+from kgextension.sparql_helper import endpoint_wrapper_bundled, BatchLoader
 from kgextension.uri_helper import uri_querier
 
 
@@ -85,7 +85,7 @@ def link_validator(df, columns, purge=True, custom_name_postfix=None, fill_with=
     return df
 
 
-def check_uri_redirects(df, column, replace=True, custom_name_postfix=None, redirection_property="http://dbpedia.org/ontology/wikiPageRedirects", endpoint=DBpedia, regex_filter="dbpedia", bundled_mode=True, uri_data_model=False, progress=True, caching=True):
+def check_uri_redirects(df, column, replace=True, custom_name_postfix=None, redirection_property="http://dbpedia.org/ontology/wikiPageRedirects", endpoint=DBpedia, regex_filter="dbpedia", bundled_mode=True, uri_data_model=False, progress=True, caching=True, max_workers=4, time_budget=None):
     """Takes a column of URIs from a DataFrame and checks for each if it has a 
     redirection set by the endpoint. If this is the case, the URI it redirects 
     to is either added in a new column or replaces the original URI.
@@ -117,6 +117,12 @@ def check_uri_redirects(df, column, replace=True, custom_name_postfix=None, redi
             "uri_data_model" = True). Defaults to True.
         caching (bool, optional): Turn result-caching for queries issued during 
             the execution on or off. Defaults to True.
+        max_workers (int, optional): Number of URIs that are dereferenced
+            concurrently (if "uri_data_model" = True). Defaults to 4.
+        time_budget (float, optional): Overall time (in seconds) for
+            dereferencing the URIs (if "uri_data_model" = True); URIs that
+            have not been started when it is exhausted are skipped with a
+            warning. If None, there is no limit. Defaults to None.
 
     Raises:
         ValueError: Raised if 'custom_name_postfix' is set to "" instead of 
@@ -134,11 +140,9 @@ def check_uri_redirects(df, column, replace=True, custom_name_postfix=None, redi
 
     if bundled_mode and not uri_data_model:
 
-        values = " ( <"+df[column].str.cat(sep="> ) ( <")+"> ) "
+        query = "SELECT DISTINCT ?value ?redirect WHERE {VALUES (?value) {**VALUES**} ?value <"+redirection_property+"> ?redirect . }"
 
-        query = "SELECT DISTINCT ?value ?redirect WHERE {VALUES (?value) {" +values+"} ?value <"+redirection_property+"> ?redirect . }"
-
-        result_df = endpoint_wrapper(query, endpoint, caching=caching).drop_duplicates().reset_index(drop=True)
+        result_df = endpoint_wrapper_bundled(df[column], query, endpoint, caching=caching).drop_duplicates().reset_index(drop=True)
 
     else:   
         
@@ -148,22 +152,20 @@ def check_uri_redirects(df, column, replace=True, custom_name_postfix=None, redi
             
             query = "SELECT DISTINCT ?value ?redirect WHERE {VALUES (?value) {(<**URI**>)} ?value <"+redirection_property+"> ?redirect . }"
 
-            result_df = uri_querier(df, column, query, regex_filter=regex_filter, progress=progress, caching=caching)
+            result_df = uri_querier(df, column, query, regex_filter=regex_filter, progress=progress, caching=caching, max_workers=max_workers, time_budget=time_budget)
             
         else:
 
-            for uri in df[column].iteritems():
-
-                if pd.notna(uri[1]):
+            # The single-URI lookups are sent in small batches, which bind 
+            # the URIs with a (SPARQL 1.0) filter instead of VALUES
 
-                    query = "SELECT DISTINCT ?value ?redirect WHERE {?value <"+redirection_property+"> ?redirect . FILTER (?value = <"+uri[1]+">) }"
+            query = "SELECT DISTINCT ?value ?redirect WHERE {?value <"+redirection_property+"> ?redirect . FILTER **FILTER** }"
 
-                    result = endpoint_wrapper(query, endpoint, caching=caching)
+            with BatchLoader(query, endpoint, caching=caching, progress=progress) as loader:
 
-                    result_df = result_df.append(result)
+                results = loader.load_many(df[column].dropna().unique())
 
-                else:
-                    pass
+            result_df = pd.concat([result_df] + results)
 
         result_df = result_df.rename({"callret-0": "value"}, axis="columns").drop_duplicates().reset_index(drop=True)
 
@@ -2,7 +2,8 @@ import requests
 import validators
 import warnings
 import pandas as pd
-from functools import lru_cache
+from kgextension.cache_backend_helper import cached, negative_cache
+from kgextension.http_helper import shared_session
 
 
 def is_valid_url(url):
@@ -21,7 +22,7 @@ def is_valid_url(url):
     else:
         return False
 
-@lru_cache(maxsize=None)
+@cached("url_exists")
 def url_exists(url):
     """Checks if a URL is resolvable / existing.
 
@@ -34,14 +35,23 @@ def url_exists(url):
     
     if not pd.isnull(url):
         if is_valid_url(url):
+            # If the URL failed recently, it isn't requested again until the
+            # entry of the negative cache expires
+            if negative_cache.check("url", url) is not None:
+                return False
             try:
-                with requests.get(url, stream=True) as response:
+                with shared_session.get(url, stream=True) as response:
                     try:
                         response.raise_for_status()
                         return True
                     except requests.exceptions.HTTPError:
+                        # server errors are likely temporary, so the result
+                        # is only kept in the negative cache
+                        if response.status_code >= 500:
+                            negative_cache.record("url", url, "http_error", "HTTP status " + str(response.status_code))
                         return False
-            except requests.exceptions.ConnectionError:
+            except requests.exceptions.ConnectionError as exception:
+                negative_cache.record("url", url, "timeout" if isinstance(exception, requests.exceptions.Timeout) else "unreachable", exception)
                 return False
         else:
             warnings.warn("Warning: The url "+url +
@@ -42,7 +42,6 @@ setup(
         "fuzzywuzzy",
         "strsimpy",
         "rdflib",
-        "deckar01-ratelimit",
         "SPARQLWrapper",
         "validators",
         ],
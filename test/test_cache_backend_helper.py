@@ -0,0 +1,385 @@
+from kgextension.cache_backend_helper import normalize_query, estimate_size, cached, EntityResultCache, NegativeCache, MemoryCacheBackend, SQLiteCacheBackend, get_cache_backend, set_cache_backend
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+import time
+import pandas as pd
+import pytest
+
+
+class TestNormalizeQuery:
+
+    def test1_whitespace(self):
+
+        query = "SELECT ?s\n  WHERE {\t?s ?p ?o }  "
+
+        assert normalize_query(query) == "SELECT ?s WHERE { ?s ?p ?o }"
+
+    def test2_literals_unchanged(self):
+
+        query = "SELECT ?s WHERE { ?s ?p \"a  b\" . ?s ?q 'c \\'  d' }"
+
+        assert normalize_query(query) == query
+
+
+class TestBackends:
+
+    def test1_memory_ttl(self):
+
+        backend = MemoryCacheBackend()
+
+        backend.set("f", ("a",), 1)
+        backend.set("f", ("b",), 2, ttl=0.05)
+
+        assert backend.get("f", ("a",)) == (True, 1)
+        assert backend.get("f", ("b",)) == (True, 2)
+        assert backend.info("f")["currsize"] == 2
+
+        time.sleep(0.1)
+
+        assert backend.get("f", ("b",)) == (False, None)
+        assert backend.get("g", ("a",)) == (False, None)
+
+    def test2_memory_eviction(self):
+
+        df = pd.DataFrame({"value": ["http://example.org/" + str(i) for i in range(100)]})
+
+        size = estimate_size(df)
+
+        backend = MemoryCacheBackend(max_bytes=int(2.5 * size))
+
+        backend.set("f", ("a",), df)
+        backend.set("f", ("b",), df)
+
+        # "a" is used more recently than "b", so "b" is evicted
+
+        backend.get("f", ("a",))
+        backend.set("f", ("c",), df)
+
+        assert backend.get("f", ("b",)) == (False, None)
+        assert backend.get("f", ("a",))[0]
+        assert backend.get("f", ("c",))[0]
+
+        info = backend.info("f")
+
+        assert (info["currsize"], info["evictions"], info["resident_bytes"]) == (2, 1, 2 * size)
+
+        # values larger than the budget are not cached
+
+        backend.set("f", ("d",), pd.concat([df] * 3))
+
+        assert backend.get("f", ("d",)) == (False, None)
+
+    def test3_memory_protection(self):
+
+        df = pd.DataFrame({"value": ["http://a", "http://b"]})
+
+        backend = MemoryCacheBackend()
+
+        backend.set("f", ("a",), df)
+
+        df.loc[0, "value"] = "changed"
+
+        _, cached_df = backend.get("f", ("a",))
+
+        cached_df.loc[1, "value"] = "changed"
+
+        assert backend.get("f", ("a",))[1]["value"].tolist() == ["http://a", "http://b"]
+
+    def test4_sqlite_persistence(self, tmp_path):
+
+        file_path = str(tmp_path / "cache.db")
+
+        df = pd.DataFrame({"value": ["http://a", "http://b"], "type": ["x", "y"]})
+
+        SQLiteCacheBackend(file_path).set("f", ("query", "endpoint"), df)
+
+        # a new backend (e.g. in a later session) finds the entry
+
+        found, value = SQLiteCacheBackend(file_path).get("f", ("query", "endpoint"))
+
+        assert found
+        pd.testing.assert_frame_equal(value, df)
+
+    def test5_sqlite_ttl_clear(self, tmp_path):
+
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), ttl=0.05)
+
+        backend.set("f", ("a",), 1)
+        backend.set("g", ("a",), 2, ttl=60)
+
+        time.sleep(0.1)
+
+        assert backend.get("f", ("a",)) == (False, None)
+        assert backend.get("g", ("a",)) == (True, 2)
+
+        backend.clear("g")
+
+        assert backend.info("g")["currsize"] == 0
+
+
+@cached("test_shared_function")
+def shared_function(x, log_path):
+
+    with open(log_path, "a") as file:
+        file.write(str(x) + "\n")
+
+    time.sleep(0.5)
+
+    return x * 2
+
+
+def call_shared_function(arguments):
+
+    return shared_function(*arguments)
+
+
+class TestSharedSQLiteBackend:
+
+    def test1_single_flight(self, tmp_path):
+
+        previous_backend = get_cache_backend()
+
+        set_cache_backend(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+
+        log_path = str(tmp_path / "calls.log")
+
+        # the forked workers inherit the backend and open their own connection
+
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            results = pool.map(call_shared_function, [(1, log_path)] * 4 + [(2, log_path)] * 4)
+
+        set_cache_backend(previous_backend)
+
+        assert results == [2] * 4 + [4] * 4
+
+        with open(log_path) as file:
+            assert sorted(file.read().split()) == ["1", "2"]
+
+    def test2_pickle(self, tmp_path):
+
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+        backend.set("test", ("a",), 1)
+
+        assert pickle.loads(pickle.dumps(backend)).get("test", ("a",)) == (True, 1)
+
+
+class TestCachedDecorator:
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def backend(self, request, tmp_path):
+
+        previous_backend = get_cache_backend()
+
+        if request.param == "memory":
+            set_cache_backend(MemoryCacheBackend())
+        else:
+            set_cache_backend(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+
+        yield get_cache_backend()
+
+        set_cache_backend(previous_backend)
+
+    def test1_info_clear(self, backend):
+
+        calls = []
+
+        @cached("test_function", key=lambda arguments: (normalize_query(arguments["query"]), arguments["n"]))
+        def test_function(query, n=1):
+
+            calls.append(query)
+
+            return query * n
+
+        assert test_function("SELECT  ?s") == "SELECT  ?s"
+        assert test_function("SELECT ?s", n=1) == "SELECT  ?s"
+        assert test_function("SELECT ?s", 2) == "SELECT ?sSELECT ?s"
+        assert test_function.__wrapped__("SELECT ?s") == "SELECT ?s"
+
+        assert len(calls) == 3
+
+        info = test_function.cache_info()
+
+        assert (info.hits, info.misses, info.currsize, info.evictions) == (1, 2, 2, 0)
+
+        assert info.resident_bytes > 0
+
+        test_function.cache_clear()
+
+        assert test_function.cache_info().currsize == 0
+
+    def test2_coalescing(self, backend):
+
+        calls = []
+
+        @cached("test_coalesced_function")
+        def test_function(x):
+
+            calls.append(x)
+
+            time.sleep(0.3)
+
+            if x < 0:
+                raise ValueError("negative")
+
+            return [x]
+
+        with ThreadPoolExecutor(8) as executor:
+
+            results = list(executor.map(test_function, [1] * 4 + [2] * 4))
+
+            failures = [executor.submit(test_function, -1) for _ in range(3)]
+
+        assert results == [[1]] * 4 + [[2]] * 4
+
+        # the waiting callers get copies of the result
+
+        assert results[0] is not results[1]
+
+        # exceptions are passed to the waiting callers, too
+
+        assert all(isinstance(failure.exception(), ValueError) for failure in failures)
+
+        assert sorted(calls) == [-1, 1, 2]
+
+        assert test_function.cache_info().hits == 8
+
+
+class TestEntityResultCache:
+
+    def test1_get_set_many(self):
+
+        previous_backend = get_cache_backend()
+        set_cache_backend(MemoryCacheBackend())
+
+        cache = EntityResultCache("test_entities")
+
+        key = ("http://example.org/sparql", "SELECT ?value ?type WHERE {VALUES (?value) {**VALUES**} ?value a ?type}")
+
+        result = pd.DataFrame({
+            "value": ["http://a", "http://a", "http://b"],
+            "type": ["x", "y", "z"]})
+
+        cache.set_many(key, ["http://a", "http://b", "http://c"], result)
+
+        results, missing_uris = cache.get_many(key, ["http://b", "http://c", "http://d"])
+
+        info = cache.cache_info()
+
+        set_cache_backend(previous_backend)
+
+        assert missing_uris == ["http://d"]
+
+        assert results[0]["type"].tolist() == ["z"]
+
+        # URIs without results are cached as empty results
+
+        assert results[1].empty
+
+        assert (info.hits, info.misses, info.currsize) == (2, 1, 3)
+
+    def test2_no_value_column(self):
+
+        previous_backend = get_cache_backend()
+        set_cache_backend(MemoryCacheBackend())
+
+        cache = EntityResultCache("test_entities")
+
+        key = ("http://example.org/sparql", "SELECT ?uri ?type WHERE {VALUES (?uri) {**VALUES**} ?uri a ?type}")
+
+        # rows that can't be assigned to the URIs are not cached as empty
+
+        cache.set_many(key, ["http://a"], pd.DataFrame({"uri": ["http://a"], "type": ["x"]}))
+
+        results, missing_uris = cache.get_many(key, ["http://a"])
+
+        set_cache_backend(previous_backend)
+
+        assert results == []
+
+        assert missing_uris == ["http://a"]
+
+
+class TestNegativeCache:
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def backend(self, request, tmp_path):
+
+        previous_backend = get_cache_backend()
+
+        if request.param == "memory":
+            set_cache_backend(MemoryCacheBackend())
+        else:
+            set_cache_backend(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+
+        yield get_cache_backend()
+
+        set_cache_backend(previous_backend)
+
+    def test1_record_check_blacklist(self, backend):
+
+        cache = NegativeCache("test_negative", ttl=60)
+
+        cache.record("uri", "http://dead.example.org", "unreachable", "Connection refused")
+        cache.record("url", "http://slow.example.org", "timeout")
+
+        assert cache.check("uri", "http://dead.example.org")["category"] == "unreachable"
+
+        assert cache.check("uri", "http://slow.example.org") is None
+
+        blacklist = cache.blacklist("uri")
+
+        assert blacklist["identifier"].tolist() == ["http://dead.example.org"]
+
+        assert blacklist["message"].tolist() == ["Connection refused"]
+
+        assert len(cache.blacklist()) == 2
+
+        info = cache.cache_info()
+
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 2)
+
+        cache.cache_clear()
+
+        assert cache.blacklist().empty
+
+    def test2_ttl(self, backend):
+
+        cache = NegativeCache("test_negative", ttl=0.1)
+
+        cache.record("uri", "http://dead.example.org", "unreachable")
+
+        time.sleep(0.2)
+
+        assert cache.check("uri", "http://dead.example.org") is None
+
+        assert cache.blacklist().empty
+
+    def test3_failures_not_cached(self, backend):
+
+        cache = NegativeCache("test_negative", ttl=60)
+
+        calls = []
+
+        @cached("test_negative_function")
+        def test_function(url):
+
+            calls.append(url)
+
+            # only the failed lookup is recorded in the negative cache
+
+            if url == "http://dead.example.org":
+
+                cache.record("url", url, "unreachable")
+
+                return False
+
+            return True
+
+        for _ in range(2):
+
+            test_function("http://dead.example.org")
+            test_function("http://example.org")
+
+        assert calls == ["http://dead.example.org", "http://example.org", "http://dead.example.org"]
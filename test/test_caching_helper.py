@@ -1,7 +1,10 @@
 import pandas as pd
 import numpy as np
 import pytest
-from kgextension.caching_helper import freeze_unhashable, unfreeze_unhashable
+import pickle
+from kgextension.caching_helper import freeze_unhashable, unfreeze_unhashable, FrozenArgument, export_cache, import_cache, merge_cache_snapshots, read_cache_snapshot, cache_coverage
+from kgextension.cache_backend_helper import MemoryCacheBackend, SQLiteCacheBackend, get_cache_backend, set_cache_backend
+from functools import lru_cache
 
 class TestFreezeUnfreezeUnhashable:
 
@@ -229,3 +232,153 @@ class TestFreezeUnfreezeUnhashable:
         assert dict_unfrozen == []
 
 
+
+
+class TestFrozenArgument:
+
+    def test1_content_equality(self):
+
+        s1 = pd.Series(["http://a", "http://b", np.nan], name="uri")
+        s2 = pd.Series(["http://a", "http://b", np.nan], name="uri")
+        s3 = pd.Series(["http://a", "http://c", np.nan], name="uri")
+
+        assert FrozenArgument(s1) == FrozenArgument(s2)
+        assert hash(FrozenArgument(s1)) == hash(FrozenArgument(s2))
+        assert FrozenArgument(s1) != FrozenArgument(s3)
+        assert FrozenArgument(s1) != FrozenArgument(s1.rename("other"))
+        assert FrozenArgument({"a": 1}) == FrozenArgument({"a": 1})
+        assert FrozenArgument({"a": 1}) != FrozenArgument({"a": 2})
+
+    def test2_cached_function(self):
+
+        calls = []
+
+        @freeze_unhashable(freeze_by="argument", freeze_argument="the_arg")
+        @lru_cache(maxsize=None)
+        def test_fun(the_arg=None):
+
+            the_arg = unfreeze_unhashable(the_arg, frozen_type="series")
+
+            calls.append(the_arg)
+
+            return the_arg.sum()
+
+        df = pd.DataFrame({"a": range(1000)})
+
+        assert test_fun(the_arg=df["a"]) == 499500
+        assert test_fun(the_arg=df["a"].copy()) == 499500
+
+        assert len(calls) == 1
+
+        assert test_fun.__wrapped__.cache_info().hits == 1
+
+
+    def test3_compact_persistent_key(self, tmp_path):
+
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+        frozen = FrozenArgument(pd.Series(range(100000)))
+
+        key = ("test_function", frozen)
+
+        backend.set("test", key, 1)
+
+        raw_key = backend._connection.execute("SELECT raw_key FROM entries").fetchone()[0]
+
+        # only the digest of the Series is stored, not its values
+
+        assert len(raw_key) < 200
+
+        assert pickle.loads(raw_key) == key
+
+        assert backend.get("test", key) == (True, 1)
+
+
+class TestCacheSnapshots:
+
+    @pytest.fixture
+    def backend(self):
+
+        previous_backend = get_cache_backend()
+
+        set_cache_backend(MemoryCacheBackend())
+
+        yield get_cache_backend()
+
+        set_cache_backend(previous_backend)
+
+    def test1_export_import(self, backend, tmp_path):
+
+        query = "SELECT ?value ?type WHERE {VALUES (?value) {(<http://a>)} ?value a ?type}"
+
+        backend.set("endpoint_wrapper_logic", (query, "http://example.org/sparql"), pd.DataFrame({"type": ["x"]}))
+        backend.set("url_exists", (("url", "http://b"),), True)
+        backend.set("query_uri_logic", ("http://c", query), pd.DataFrame(), ttl=-1)
+
+        # expired entries are not exported
+
+        assert export_cache(str(tmp_path / "snapshot.kgc")) == 2
+
+        set_cache_backend(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+
+        assert import_cache(str(tmp_path / "snapshot.kgc")) == 2
+
+        found, value = get_cache_backend().get("endpoint_wrapper_logic", (query, "http://example.org/sparql"))
+
+        assert found
+
+        assert value["type"].tolist() == ["x"]
+
+        assert get_cache_backend().get("url_exists", (("url", "http://b"),)) == (True, True)
+
+        # the entries of the SQLite backend can be exported again
+
+        assert export_cache(str(tmp_path / "snapshot2.kgc"), namespaces=["url_exists"]) == 1
+
+    def test2_merge_overwrite(self, backend, tmp_path):
+
+        backend.set("url_exists", ("http://a",), True)
+
+        export_cache(str(tmp_path / "first.kgc"))
+
+        backend.set("url_exists", ("http://a",), False)
+        backend.set("url_exists", ("http://b",), True)
+
+        export_cache(str(tmp_path / "second.kgc"))
+
+        assert merge_cache_snapshots([str(tmp_path / "first.kgc"), str(tmp_path / "second.kgc")], str(tmp_path / "merged.kgc")) == 2
+
+        snapshot = read_cache_snapshot(str(tmp_path / "merged.kgc"))
+
+        assert snapshot["format_version"] == 1
+
+        backend.clear()
+
+        backend.set("url_exists", ("http://a",), True)
+
+        # existing entries are kept, unless overwrite is set
+
+        assert import_cache(str(tmp_path / "merged.kgc")) == 1
+
+        assert backend.get("url_exists", ("http://a",)) == (True, True)
+
+        assert import_cache(str(tmp_path / "merged.kgc"), overwrite=True) == 2
+
+        assert backend.get("url_exists", ("http://a",)) == (True, False)
+
+    def test3_coverage(self, backend):
+
+        backend.set("endpoint_wrapper_bundled", ("http://example.org/sparql", "SELECT ?value WHERE {VALUES (?value) {**VALUES**}}", None, "http://a"), pd.DataFrame())
+        backend.set("endpoint_wrapper_logic", ("SELECT ?type WHERE {VALUES (?value) {(<http://a>) (<http://b>)} ?value a ?type}", "http://example.org/sparql"), pd.DataFrame())
+
+        df = pd.DataFrame({"uri": ["http://a", "http://b", "http://c", "http://c", np.nan]})
+
+        report = cache_coverage(df, ["uri"])
+
+        assert report.loc["endpoint_wrapper_bundled", "covered"] == 1
+
+        assert report.loc["endpoint_wrapper_logic", "covered"] == 2
+
+        assert report.loc["any", "uris"] == 3
+
+        assert report.loc["any", "coverage"] == pytest.approx(2 / 3)
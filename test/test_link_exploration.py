@@ -1,6 +1,7 @@
 import pandas as pd
 import pytest
 from kgextension.link_exploration import link_explorer
+import kgextension.link_exploration as link_exploration
 
 class TestLinkExplorer:
 
@@ -59,4 +60,18 @@ class TestLinkExplorer:
 
         result = link_explorer(df_input, "uri", links_to_follow=["funkioniert:nicht"])
 
-        pd.testing.assert_frame_equal(result, expected_result, check_like = True)
\ No newline at end of file
+        pd.testing.assert_frame_equal(result, expected_result, check_like = True)
+    def test8_concurrency_passed_on(self, monkeypatch):
+        df_input = pd.read_csv("test/data/link_exploration/link_exploration_test_input.csv")
+
+        calls = []
+
+        def uri_querier(df, column, query, **kwargs):
+            calls.append(kwargs)
+            return pd.DataFrame()
+
+        monkeypatch.setattr(link_exploration, "uri_querier", uri_querier)
+
+        link_explorer(df_input, "uri", max_workers=8, time_budget=30)
+
+        assert [(call["max_workers"], call["time_budget"]) for call in calls] == [(8, 30)]
@@ -0,0 +1,118 @@
+from kgextension.ntriples_helper import iterate_triples, load_file, guess_file_format
+from kgextension.sparql_helper import LocalEndpoint
+from rdflib import Graph
+from rdflib.compare import isomorphic
+import bz2
+import gzip
+import pytest
+import pandas as pd
+
+
+@pytest.fixture(scope="module")
+def graph():
+
+    graph = Graph()
+
+    graph.parse("test/data/sparql_helper/sparqlplayground.ttl", format="turtle")
+
+    return graph
+
+
+@pytest.fixture(scope="module")
+def ntriples(graph, tmp_path_factory):
+
+    data = graph.serialize(format="nt", encoding="utf-8")
+
+    # blank nodes that are used in several lines, which may be parsed in
+    # different chunks
+
+    data += b"_:b1 <http://example.org/p> _:b2 .\n_:b2 <http://example.org/p> \"x\\ny\"@en .\n\n# comment\n_:b1 <http://example.org/q> _:b2 ."
+
+    directory = tmp_path_factory.mktemp("ntriples")
+
+    (directory / "dump.nt").write_bytes(data)
+
+    with gzip.open(str(directory / "dump.nt.gz"), "wb") as file:
+        file.write(data)
+
+    with bz2.open(str(directory / "dump.nt.bz2"), "wb") as file:
+        file.write(data)
+
+    return directory
+
+
+def sorted_frame(df):
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+class TestIterateTriples:
+
+    @pytest.mark.parametrize("file_name", ["dump.nt", "dump.nt.gz", "dump.nt.bz2"])
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test1_same_graph(self, ntriples, file_name, processes):
+
+        expected = Graph()
+
+        expected.parse(str(ntriples / "dump.nt"), format="nt")
+
+        result = Graph()
+
+        for triple in iterate_triples(str(ntriples / file_name), "nt", processes, chunk_size=1000):
+            result.add(triple)
+
+        assert len(result) == len(expected)
+
+        assert isomorphic(result, expected)
+
+    def test2_nquads(self, tmp_path):
+
+        file_path = tmp_path / "dump.nq"
+
+        file_path.write_text("<http://example.org/a> <http://example.org/p> _:b1 <http://example.org/g> .\n_:b1 <http://example.org/p> \"x\" .\n")
+
+        triples = list(iterate_triples(str(file_path), "nquads", chunk_size=10))
+
+        assert len(triples) == 2
+
+        assert triples[0][2] == triples[1][0]
+
+    def test3_formats(self, tmp_path):
+
+        assert guess_file_format("dump.nt.bz2") == "nt"
+        assert guess_file_format("dump.nq.gz") == "nquads"
+        assert guess_file_format("dump.ttl") == "turtle"
+
+        with pytest.raises(ValueError):
+            next(iterate_triples("test/data/sparql_helper/sparqlplayground.ttl", "turtle"))
+
+        # other formats are parsed by rdflib, also if they are compressed
+
+        with open("test/data/sparql_helper/sparqlplayground.ttl", "rb") as file, gzip.open(str(tmp_path / "dump.ttl.gz"), "wb") as compressed_file:
+            compressed_file.write(file.read())
+
+        graph = Graph()
+
+        load_file(graph, str(tmp_path / "dump.ttl.gz"))
+
+        assert len(graph) > 0
+
+
+class TestLocalEndpointNTriples:
+
+    @pytest.mark.parametrize("engine", [None, "sqlite", "table"])
+    def test1_same_results(self, ntriples, tmp_path, engine):
+
+        query = "SELECT ?s ?p ?o WHERE {?s ?p ?o FILTER(isIRI(?s))}"
+
+        expected = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl")
+        expected.initialize()
+
+        store_path = None if engine is None else str(tmp_path / "store")
+
+        endpoint = LocalEndpoint(str(ntriples / "dump.nt.gz"), store_path=store_path, engine=engine or "sqlite", processes=2)
+        endpoint.initialize()
+
+        pd.testing.assert_frame_equal(sorted_frame(endpoint.query(query)), sorted_frame(expected.query(query)))
+
+        endpoint.close()
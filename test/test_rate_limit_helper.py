@@ -0,0 +1,96 @@
+from kgextension.rate_limit_helper import TokenBucket, RateLimiter
+import time
+import pytest
+
+
+class TestTokenBucket:
+
+    def test1_burst_then_wait(self):
+
+        bucket = TokenBucket(rate=20, capacity=5)
+
+        started = time.monotonic()
+
+        for _ in range(5):
+            bucket.acquire()
+
+        assert time.monotonic() - started < 0.05
+
+        # the bucket is empty, the next tokens are added at 20 per second
+
+        bucket.acquire(2)
+
+        assert time.monotonic() - started >= 0.09
+
+    def test2_charge_debt(self):
+
+        bucket = TokenBucket(rate=10, capacity=1)
+
+        bucket.charge(3)
+
+        started = time.monotonic()
+
+        bucket.acquire(0)
+
+        assert time.monotonic() - started >= 0.15
+
+    def test3_shared_file(self, tmp_path):
+
+        file_path = str(tmp_path / "rate_limits.json")
+
+        bucket1 = TokenBucket(rate=10, capacity=2, name="endpoint", persistence_file_path=file_path)
+        bucket2 = TokenBucket(rate=10, capacity=2, name="endpoint", persistence_file_path=file_path)
+
+        started = time.monotonic()
+
+        bucket1.acquire()
+        bucket2.acquire()
+
+        # both buckets draw from the same state
+
+        bucket2.acquire()
+
+        assert time.monotonic() - started >= 0.08
+
+
+class TestRateLimiter:
+
+    def test1_processing_time(self):
+
+        limiter = RateLimiter(requests_per_min=100000, processing_time_per_min=60)
+
+        # 1 second of processing time is allowed per second, with a burst of 60
+
+        with limiter.limit():
+            time.sleep(0.15)
+
+        started = time.monotonic()
+
+        with limiter.limit():
+            pass
+
+        assert time.monotonic() - started < 0.05
+
+        limiter.processing_time_bucket.charge(60)
+
+        started = time.monotonic()
+
+        with limiter.limit():
+            pass
+
+        assert time.monotonic() - started >= 0.1
+
+    def test2_acquire_measure(self):
+
+        limiter = RateLimiter(requests_per_min=60, processing_time_per_min=60)
+
+        # "acquire" takes the request token, "measure" charges the latency
+
+        limiter.acquire()
+
+        with limiter.measure():
+            time.sleep(0.05)
+
+        assert limiter.request_bucket._tokens < 60
+
+        assert limiter.processing_time_bucket._tokens <= 60 - 0.05
@@ -0,0 +1,75 @@
+from kgextension.retry_helper import RetryPolicy, parse_retry_after
+import email.utils
+import time
+import pytest
+import requests
+
+
+def http_error(status_code, headers=None):
+
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+
+    return requests.exceptions.HTTPError(response=response)
+
+
+class TestParseRetryAfter:
+
+    def test1_seconds(self):
+
+        assert parse_retry_after("120") == 120
+
+    def test2_http_date(self):
+
+        value = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+        assert 25 < parse_retry_after(value) <= 30
+
+    def test3_invalid(self):
+
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryPolicy:
+
+    def test1_retryable(self):
+
+        policy = RetryPolicy()
+
+        assert policy.is_retryable(requests.exceptions.Timeout())
+        assert policy.is_retryable(requests.exceptions.ConnectionError())
+        assert policy.is_retryable(http_error(503))
+        assert not policy.is_retryable(http_error(400))
+        assert not policy.is_retryable(RuntimeError())
+
+    def test2_exponential_backoff(self):
+
+        policy = RetryPolicy(backoff_factor=2, max_backoff=10)
+
+        for attempt, bound in [(0, 2), (1, 4), (2, 8), (5, 10)]:
+
+            delays = [policy.backoff(attempt) for _ in range(50)]
+
+            assert all(0 <= delay <= bound for delay in delays)
+
+    def test3_retry_after(self):
+
+        policy = RetryPolicy(max_backoff=1)
+
+        assert policy.backoff(0, http_error(429, {"Retry-After": "42"})) == 42
+        assert policy.backoff(0, http_error(503, {"Retry-After": "7"})) == 7
+        assert policy.backoff(0, http_error(500, {"Retry-After": "42"})) <= 1
+
+    def test4_error_budget(self):
+
+        policy = RetryPolicy(error_budget=3, error_budget_period=60)
+
+        assert [policy.record_error() for _ in range(4)] == [True, True, True, False]
+
+    def test5_no_error_budget(self):
+
+        policy = RetryPolicy()
+
+        assert all(policy.record_error() for _ in range(100))
@@ -1,11 +1,14 @@
 from kgextension import __agent__
 from SPARQLWrapper import __version__
-from kgextension.sparql_helper import regex_string_generator, RemoteEndpoint, LocalEndpoint, endpoint_wrapper
+from kgextension.sparql_helper import regex_string_generator, RemoteEndpoint, LocalEndpoint, endpoint_wrapper, endpoint_wrapper_bundled, paginated_query, BatchLoader
+from kgextension.cache_backend_helper import MemoryCacheBackend, get_cache_backend, set_cache_backend
 from kgextension.endpoints import DBpedia, WikiData, EUOpenData
+from kgextension.retry_helper import RetriesExhaustedError, RetryPolicy, SPARQLQueryError
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import re
+import threading
 import pytest
 import pandas as pd
-import io
-import sys
 import pyparsing
 import xml
 
@@ -127,6 +130,111 @@ class TestRemoteEndpointQuerying:
 
 
 
+class TestRemoteEndpointErrors:
+
+    def test1_truncated_xml_stream(self):
+
+        document = b'<?xml version="1.0"?><sparql xmlns="http://www.w3.org/2005/sparql-results#"><head><variable name="value"/></head><results><result><binding name="value"><uri>http://example.org/a</uri>'
+
+        requests_made = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+
+                requests_made.append(self.path)
+
+                self.rfile.read(int(self.headers["Content-Length"]))
+
+                # the announced body is longer than the one that is sent
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/sparql-results+xml")
+                self.send_header("Content-Length", "5000")
+                self.end_headers()
+                self.wfile.write(document)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+
+            endpoint = RemoteEndpoint("http://127.0.0.1:" + str(server.server_port) + "/sparql", retry_policy=RetryPolicy(retries=2, backoff_factor=0))
+
+            with pytest.raises(RetriesExhaustedError):
+                endpoint.query("SELECT ?value WHERE {?value ?p ?o}")
+
+            assert len(requests_made) == 3
+
+        finally:
+
+            server.shutdown()
+            server.server_close()
+
+
+class TestRemoteEndpointLimits:
+
+    def test1_rate_limit_before_concurrency_slot(self):
+
+        document = b'<?xml version="1.0"?><sparql xmlns="http://www.w3.org/2005/sparql-results#"><head><variable name="value"/></head><results><result><binding name="value"><uri>http://example.org/a</uri></binding></result></results></sparql>'
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+
+                self.rfile.read(int(self.headers["Content-Length"]))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/sparql-results+xml")
+                self.send_header("Content-Length", str(len(document)))
+                self.end_headers()
+                self.wfile.write(document)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+
+            endpoint = RemoteEndpoint("http://127.0.0.1:" + str(server.server_port) + "/sparql", max_concurrency=1)
+
+            # while a query waits for the rate limiter, the slot is free
+
+            slot_free = []
+
+            def acquire():
+
+                if endpoint._concurrency_limit.acquire(blocking=False):
+
+                    endpoint._concurrency_limit.release()
+
+                    slot_free.append(True)
+
+                else:
+
+                    slot_free.append(False)
+
+            endpoint.rate_limiter.acquire = acquire
+
+            result = endpoint.query("SELECT ?value WHERE {?value ?p ?o}")
+
+            assert result["value"].tolist() == ["http://example.org/a"]
+
+            assert slot_free == [True]
+
+        finally:
+
+            server.shutdown()
+            server.server_close()
+
+
 class TestLocalEndpointQuerying:
 
     def test1_nobleprize_nt(self):
@@ -380,11 +488,8 @@ class TestEndpointWrapper:
         dbpedia = RemoteEndpoint("http://dbpedia.org/sparql/", timeout=1, retries=0)
         query = "SELECT ?label ?uri WHERE { ?uri rdfs:label ?label . filter (str(?label) =\"test\")}"
         
-        capturedOutput = io.StringIO()
-        sys.stdout = capturedOutput
-        endpoint_wrapper(query, dbpedia, caching=False)
-
-        assert capturedOutput.getvalue() == 'timed out\n'
+        with pytest.raises(RetriesExhaustedError):
+            endpoint_wrapper(query, dbpedia, caching=False)
 
     def test3_retries(self):
 
@@ -470,4 +575,213 @@ class TestEndpointWrapper:
 
         pd.testing.assert_frame_equal(result, expected_result, check_like = True)
 
- 
\ No newline at end of file
+ 
+
+
+class CappedEndpoint(RemoteEndpoint):
+    """Returns at most 3 of 10 results per query, like an endpoint with a 
+    result cap below the page size.
+    """
+
+    def __init__(self):
+
+        super().__init__("http://example.org/sparql", max_concurrency=2)
+
+        self.query = self._capped_query
+
+        self.offsets = []
+
+    def _capped_query(self, query, request_return_format=None, verbose=False, return_XML=False):
+
+        limit, offset = map(int, re.search("LIMIT ([0-9]+) OFFSET ([0-9]+)", query).groups())
+
+        self.offsets.append(offset)
+
+        return pd.DataFrame({"n": list(range(10))[offset:offset + min(limit, 3)]})
+
+
+class TestPaginatedQuery:
+
+    def test1_capped_pages(self):
+
+        with pytest.warns(UserWarning):
+            result = paginated_query("SELECT ?n WHERE {?s ?p ?n} ", CappedEndpoint(), 5, 0, 0, None, False)
+
+        assert result["n"].tolist() == list(range(10))
+
+    def test2_max_results(self):
+
+        result = paginated_query("SELECT ?n WHERE {?s ?p ?n} ", CappedEndpoint(), 2, 1, 6, None, False)
+
+        assert result["n"].tolist() == [1, 2, 3, 4, 5]
+
+    def test3_single_probe_after_last_page(self):
+
+        endpoint = CappedEndpoint()
+
+        result = paginated_query("SELECT ?n WHERE {?s ?p ?n} ", endpoint, 3, 0, 0, None, False)
+
+        assert result["n"].tolist() == list(range(10))
+
+        # the short page at offset 9 is followed by a single (empty) page
+
+        assert sorted(endpoint.offsets) == [0, 3, 6, 9, 10]
+
+
+class CallretEndpoint(LocalEndpoint):
+    """Answers every query with a row for each URI of the filter, bound to 
+    "callret-0" like Virtuoso does.
+    """
+
+    def __init__(self):
+
+        super().__init__("callret.ttl")
+
+        self.queries = []
+
+    def query(self, query):
+
+        self.queries.append(query)
+
+        uris = re.findall("<([^>]*)>", query)
+
+        return pd.DataFrame({"callret-0": uris, "type": ["http://example.org/Type"] * len(uris)})
+
+
+class TestEndpointWrapperBundled:
+
+    def test1_callret_cached_per_uri(self):
+
+        previous_backend = get_cache_backend()
+        set_cache_backend(MemoryCacheBackend())
+
+        try:
+
+            endpoint = CallretEndpoint()
+
+            query = "SELECT ?value ?type WHERE {?value a ?type FILTER **FILTER** }"
+
+            uris = ["http://example.org/a", "http://example.org/b"]
+
+            # the second lookup is answered from the per-URI cache
+
+            first_result = endpoint_wrapper_bundled(uris, query, endpoint)
+            second_result = endpoint_wrapper_bundled(uris, query, endpoint)
+
+        finally:
+
+            set_cache_backend(previous_backend)
+
+        assert len(endpoint.queries) == 1
+
+        assert first_result["value"].tolist() == uris
+
+        pd.testing.assert_frame_equal(second_result, first_result)
+
+    def test2_rejected_chunk_not_split(self):
+
+        requests_made = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+
+                requests_made.append(self.rfile.read(int(self.headers["Content-Length"])))
+
+                self.send_response(400)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+
+            endpoint = RemoteEndpoint("http://127.0.0.1:" + str(server.server_port) + "/sparql", retry_policy=RetryPolicy(retries=2, backoff_factor=0))
+
+            uris = ["http://example.org/" + str(i) for i in range(8)]
+
+            # a malformed query is raised at once instead of being split
+
+            with pytest.raises(SPARQLQueryError):
+                endpoint_wrapper_bundled(uris, "SELECT ?value WHERE {VALUES (?value) {**VALUES**} ?value ?p ?o", endpoint, caching=False)
+
+            assert len(requests_made) == 1
+
+        finally:
+
+            server.shutdown()
+            server.server_close()
+
+
+class TestBatchLoader:
+
+    def test1_demultiplexing(self):
+
+        SparqlPlayground = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", "ttl")
+
+        SparqlPlayground.initialize()
+
+        query = "SELECT ?value ?type WHERE {?value rdf:type ?type FILTER **FILTER** }"
+
+        uris = ["http://example.org/tuto/resource#" + name for name in ["Eve", "Alice", "John", "Eve"]]
+
+        with BatchLoader(query, SparqlPlayground, batch_size=2, caching=False) as loader:
+
+            future = loader.load("http://example.org/tuto/resource#William")
+
+            results = loader.load_many(uris)
+
+        # URIs without rows get an empty DataFrame
+
+        assert [len(result) for result in results] == [1, 0, 1, 1]
+
+        assert results[2]["value"].tolist() == [uris[2]]
+
+        assert results[0]["type"].tolist() == ["http://dbpedia.org/ontology/Person"]
+
+        assert future.result()["value"].tolist() == ["http://example.org/tuto/resource#William"]
+
+    def test2_callret_repeated_lookups(self):
+
+        previous_backend = get_cache_backend()
+        set_cache_backend(MemoryCacheBackend())
+
+        try:
+
+            endpoint = CallretEndpoint()
+
+            query = "SELECT ?value ?type WHERE {?value a ?type FILTER **FILTER** }"
+
+            results = []
+
+            for _ in range(2):
+
+                with BatchLoader(query, endpoint) as loader:
+                    results.append(loader.load("http://example.org/a").result())
+
+        finally:
+
+            set_cache_backend(previous_backend)
+
+        assert [result["value"].tolist() for result in results] == [["http://example.org/a"]] * 2
+
+    def test3_progress(self):
+
+        SparqlPlayground = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", "ttl")
+
+        SparqlPlayground.initialize()
+
+        query = "SELECT ?value ?type WHERE {?value rdf:type ?type FILTER **FILTER** }"
+
+        uris = ["http://example.org/tuto/resource#" + name for name in ["Eve", "Alice", "John"]]
+
+        with BatchLoader(query, SparqlPlayground, batch_size=2, caching=False, progress=True) as loader:
+
+            loader.load_many(uris)
+
+        assert (loader._progress_bar.n, loader._progress_bar.total) == (3, 3)
@@ -0,0 +1,214 @@
+from kgextension.sparql_helper_helper import get_initial_query_limit, get_initial_query_offset, iterate_xml_results, xml_results_to_frame, json_results_to_frame, tsv_results_to_frame, values_clause, values_chunks, filter_clause, terms_to_frame
+import kgextension.sparql_helper_helper as sparql_helper_helper
+import csv
+import io
+import pandas as pd
+import numpy as np
+from rdflib import BNode, Literal, URIRef
+
+
+class TestInitialQueryLimitOffset:
+
+    def test1_limit_offset(self):
+
+        query = "SELECT ?s WHERE {?s ?p ?o} LIMIT 10 OFFSET 20"
+
+        assert get_initial_query_limit(query) == 10
+        assert get_initial_query_offset(query) == 20
+
+    def test2_no_limit_offset(self):
+
+        query = "SELECT ?s WHERE {?s ?p ?o}"
+
+        assert get_initial_query_limit(query) == 0
+        assert get_initial_query_offset(query) == 0
+
+
+class TestXmlResults:
+
+    def test1_iterate_results(self):
+
+        with open("test/data/sparql_helper_helper/results.xml", "rb") as file:
+            results = list(iterate_xml_results(file))
+
+        expected_results = [
+            [("value", "http://dbpedia.org/resource/Mannheim"), ("label", "Mannheim")],
+            [("value", "http://dbpedia.org/resource/Heidelberg")],
+            [("label", "Bayern")]]
+
+        assert results == expected_results
+
+    def test2_results_to_frame(self):
+
+        with open("test/data/sparql_helper_helper/results.xml", "rb") as file:
+            result = xml_results_to_frame(file.read())
+
+        expected_result_df = pd.DataFrame({
+            "value": ["http://dbpedia.org/resource/Mannheim", "http://dbpedia.org/resource/Heidelberg", np.nan],
+            "label": ["Mannheim", np.nan, "Bayern"]})
+
+        pd.testing.assert_frame_equal(result, expected_result_df)
+
+    def test3_empty_results(self):
+
+        xml = b'<?xml version="1.0"?><sparql xmlns="http://www.w3.org/2005/sparql-results#"><head><variable name="value"/></head><results></results></sparql>'
+
+        result = xml_results_to_frame(xml)
+
+        assert result.empty
+
+    def test4_results_released(self, monkeypatch):
+
+        iterparse = sparql_helper_helper.ElementTree.iterparse
+
+        parsed_elements = []
+
+        def recording_iterparse(source, events):
+
+            for event, element in iterparse(source, events):
+
+                parsed_elements.append(element)
+
+                yield event, element
+
+        monkeypatch.setattr(sparql_helper_helper.ElementTree, "iterparse", recording_iterparse)
+
+        with open("test/data/sparql_helper_helper/results.xml", "rb") as file:
+            results = list(iterate_xml_results(file))
+
+        assert len(results) == 3
+
+        # the finished results are no longer attached to <results>
+
+        results_element = [element for element in parsed_elements if element.tag.endswith("}results")][0]
+
+        assert len(results_element) == 0
+
+
+class TestJsonResults:
+
+    def test1_results_to_frame(self):
+
+        results = {
+            "head": {"vars": ["value", "label"]},
+            "results": {"bindings": [
+                {"value": {"type": "uri", "value": "http://dbpedia.org/resource/Mannheim"}, "label": {"type": "literal", "xml:lang": "en", "value": "Mannheim"}},
+                {"value": {"type": "uri", "value": "http://dbpedia.org/resource/Heidelberg"}}]}}
+
+        result = json_results_to_frame(results)
+
+        expected_result_df = pd.DataFrame({
+            "value": ["http://dbpedia.org/resource/Mannheim", "http://dbpedia.org/resource/Heidelberg"],
+            "label": ["Mannheim", np.nan]})
+
+        pd.testing.assert_frame_equal(result, expected_result_df)
+
+    def test2_empty_results(self):
+
+        results = {"head": {"vars": ["value"]}, "results": {"bindings": []}}
+
+        assert json_results_to_frame(results).empty
+
+
+class TestTsvResults:
+
+    def test1_results_to_frame(self):
+
+        with open("test/data/sparql_helper_helper/results.tsv", "rb") as file:
+            result = tsv_results_to_frame(file.read())
+
+        expected_result_df = pd.DataFrame({
+            "value": ["http://dbpedia.org/resource/Mannheim", "http://dbpedia.org/resource/Heidelberg", np.nan],
+            "label": ["Mannheim", np.nan, "Say \"hi\"\tthere"],
+            "count": ["309119", "159914", np.nan]})
+
+        pd.testing.assert_frame_equal(result, expected_result_df)
+
+    def test2_empty_results(self):
+
+        assert tsv_results_to_frame(b"?value\t?label\n").empty
+
+
+class TestValuesChunks:
+
+    def test1_values_clause(self):
+
+        assert values_clause(["http://a", "http://b"]) == " ( <http://a> ) ( <http://b> ) "
+
+    def test2_chunk_by_entities(self):
+
+        uris = ["http://example.org/" + str(i) for i in range(5)]
+
+        chunks = values_chunks(uris, 2, 0)
+
+        assert chunks == [uris[0:2], uris[2:4], uris[4:5]]
+
+    def test3_chunk_by_bytes(self):
+
+        uris = ["http://a", "http://b", "http://c", "http://" + "x" * 100]
+
+        # each of the short URIs takes up 16 bytes in the VALUES body
+
+        chunks = values_chunks(uris, 0, 40)
+
+        assert chunks == [uris[0:2], uris[2:3], uris[3:4]]
+
+        assert len(values_clause(uris[0:2]).encode("utf-8")) <= 40
+
+    def test4_no_limits(self):
+
+        uris = ["http://example.org/" + str(i) for i in range(5)]
+
+        assert values_chunks(uris, 0, 0) == [uris]
+        assert values_chunks([], 2, 100) == []
+
+    def test5_filter_clause(self):
+
+        assert filter_clause(["http://a", "http://b"]) == "(?value = <http://a> || ?value = <http://b>)"
+
+        assert filter_clause(["http://a"], "?s") == "(?s = <http://a>)"
+
+
+class TestTermsToFrame:
+
+    def test1_matches_read_csv(self):
+
+        columns = [
+            ["1", "-2", "+3"],
+            ["1", "NA", "3"],
+            ["1.5", "1e5", "-.5"],
+            ["true", "FALSE", "True"],
+            ["true", "", "false"],
+            ["1", "true", "x"],
+            [" 1", "2", "inf"],
+            ["", "nan", "NULL"],
+            ["12345678901234567890", "1.2345678901234567", "1e400"]]
+
+        variables = ["v" + str(i) for i in range(len(columns))]
+
+        rows = [tuple(Literal(column[i]) if column[i] else None for column in columns) for i in range(3)]
+
+        rows.append(tuple([URIRef("http://example.org/a")] * len(columns)))
+
+        for selected_rows in [rows[:3], rows]:
+
+            # the SPARQL CSV serialization of the rows
+
+            stream = io.StringIO()
+
+            writer = csv.writer(stream)
+
+            writer.writerow(variables)
+            writer.writerows([["" if term is None else str(term) for term in row] for row in selected_rows])
+
+            stream.seek(0)
+
+            pd.testing.assert_frame_equal(terms_to_frame(variables, selected_rows), pd.read_csv(stream))
+
+    def test2_blank_nodes_empty(self):
+
+        result = terms_to_frame(["s"], [(BNode("b1"),)])
+
+        assert result["s"].tolist() == ["_:b1"]
+
+        pd.testing.assert_frame_equal(terms_to_frame(["s", "o"], []), pd.read_csv(io.StringIO("s,o\n")))
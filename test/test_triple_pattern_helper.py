@@ -0,0 +1,118 @@
+from kgextension.triple_pattern_helper import parse_pattern_query, execute_pattern_query, query_graph
+from kgextension.sparql_helper_helper import values_clause, filter_clause
+from rdflib import Graph
+import io
+import pytest
+import pandas as pd
+
+
+@pytest.fixture(scope="module")
+def graph():
+
+    graph = Graph()
+
+    graph.parse("test/data/sparql_helper/sparqlplayground.ttl", format="turtle")
+
+    return graph
+
+
+def sparql_engine_result(graph, query):
+
+    results = graph.query(query)
+
+    return pd.read_csv(io.StringIO(results.serialize(format="csv").decode("utf-8")))
+
+
+def sorted_frame(df):
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+class TestPatternQueries:
+
+    @pytest.mark.parametrize("query", [
+        "SELECT ?value ?p ?v WHERE {VALUES (?value) {**VALUES**} ?value ?p ?v FILTER(isLITERAL(?v))}",
+        "SELECT DISTINCT ?value ?p ?v WHERE {?value ?p ?v . FILTER (**FILTER** && (isLITERAL(?v)))} ",
+        "PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> SELECT DISTINCT ?value ?types WHERE {VALUES (?value) {**VALUES**} ?value rdf:type ?types . }",
+        "SELECT DISTINCT ?value ?p ?s WHERE {VALUES (?value) {**VALUES**} ?s ?p ?value }",
+        "SELECT ?value ?p ?o ?type WHERE {VALUES (?value) {**VALUES**} ?value ?p ?o. ?o rdf:type ?type. }",
+        "SELECT ?value ?object WHERE {VALUES (?value) {**VALUES**} ?value (<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>) ?object. }",
+        "SELECT ?s ?o WHERE { ?s a ?o FILTER(isIRI(?o) || isBLANK(?s)) }"])
+    def test1_same_results(self, graph, query):
+
+        uris = list(dict.fromkeys(str(subject) for subject in graph.subjects()))[:10] + ["http://example.org/missing"]
+
+        query = query.replace("**VALUES**", values_clause(uris)).replace("**FILTER**", filter_clause(uris))
+
+        parsed_query = parse_pattern_query(query, graph.namespaces())
+
+        assert parsed_query is not None
+
+        result = query_graph(graph, query)
+
+        expected = sparql_engine_result(graph, query)
+
+        assert len(result) > 0
+
+        pd.testing.assert_frame_equal(sorted_frame(result), sorted_frame(expected))
+
+    @pytest.mark.parametrize("query", [
+        "SELECT * WHERE {?s ?p ?o}",
+        "SELECT ?s WHERE {?s ?p \"x\"}",
+        "SELECT ?s WHERE {?s ?p ?o} LIMIT 5",
+        "SELECT ?s WHERE {?s ?p ?o FILTER(regex(str(?p), \"name\"))}",
+        "SELECT ?s ?t WHERE {VALUES (?s) {(<http://example.org/tuto/resource#SnuffMonkey>)} OPTIONAL {?s a ?t}}",
+        "SELECT ?s WHERE {?s unknown:p ?o}"])
+    def test2_fallback(self, graph, query):
+
+        assert parse_pattern_query(query, graph.namespaces()) is None
+
+        if "unknown:" not in query:
+            pd.testing.assert_frame_equal(query_graph(graph, query), sparql_engine_result(graph, query))
+
+    def test3_repeated_variable(self, graph):
+
+        query = "SELECT ?s ?p WHERE {?s ?p ?s}"
+
+        variables, rows = execute_pattern_query(graph, parse_pattern_query(query))
+
+        assert variables == ["s", "p"]
+
+        assert all(graph.triples((s, p, s)) for s, p in rows)
+
+        assert len(rows) == len(graph.query(query))
+
+    def test4_typed_literals(self):
+
+        graph = Graph()
+
+        graph.parse(data="""
+            @prefix ex: <http://example.org/> .
+            @prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+            ex:a ex:count "01"^^xsd:integer ; ex:code "01" ; ex:flag true ; ex:born "2000-01-02"^^xsd:date .
+            ex:b ex:count 2 ; ex:code "x" ; ex:flag false .
+            """, format="turtle")
+
+        query = "SELECT ?s ?count ?code ?flag ?born WHERE {?s <http://example.org/count> ?count . ?s <http://example.org/code> ?code . ?s <http://example.org/flag> ?flag OPTIONAL {?s <http://example.org/born> ?born}} ORDER BY ?s"
+
+        result = query_graph(graph, query, typed_literals=True)
+
+        assert result["count"].tolist() == [1, 2]
+        assert result["count"].dtype == "int64"
+        assert result["code"].tolist() == ["01", "x"]
+        assert result["flag"].dtype == "bool"
+        assert result["born"][0] == pd.Timestamp("2000-01-02")
+        assert pd.isna(result["born"][1])
+
+        # without the conversion, the types are inferred from the texts
+
+        result = query_graph(graph, query)
+
+        assert result["code"].tolist() == ["01", "x"]
+
+        assert result["born"].tolist()[0] == "2000-01-02"
+
+    def test5_no_select_query(self, graph):
+
+        with pytest.raises(ValueError):
+            query_graph(graph, "ASK {?s ?p ?o}")
@@ -0,0 +1,156 @@
+from kgextension.triple_store_helper import SQLiteTripleStore, term_key, key_term
+from kgextension.sparql_helper import LocalEndpoint
+from rdflib import Graph, Literal, URIRef, BNode
+from rdflib.namespace import XSD
+import os
+import pytest
+import pandas as pd
+
+
+class TestSQLiteTripleStore:
+
+    def test1_terms(self):
+
+        terms = [URIRef("http://example.org/a"), BNode("b1"), Literal("x"), Literal("x", lang="en"), Literal("1", datatype=XSD.integer)]
+
+        assert [key_term(*term_key(term)) for term in terms] == terms
+
+        assert len(set(term_key(term) for term in terms)) == len(terms)
+
+    def test2_add_remove_persist(self, tmp_path):
+
+        path = str(tmp_path / "store.db")
+
+        a, b, p = URIRef("http://example.org/a"), URIRef("http://example.org/b"), URIRef("http://example.org/p")
+
+        graph = Graph(store=SQLiteTripleStore(path))
+
+        graph.add((a, p, b))
+        graph.add((a, p, Literal("1", datatype=XSD.integer)))
+        graph.add((b, p, Literal("x", lang="en")))
+        graph.add((a, p, b))
+
+        assert len(graph) == 3
+
+        assert set(graph.objects(a, p)) == {b, Literal("1", datatype=XSD.integer)}
+
+        assert set(graph.subjects(p, b)) == {a}
+
+        assert list(graph.triples((URIRef("http://example.org/missing"), None, None))) == []
+
+        graph.remove((a, None, b))
+
+        graph.bind("ex", "http://example.org/")
+
+        graph.close()
+
+        # the triples and namespaces are still there after reopening
+
+        graph = Graph(store=SQLiteTripleStore(path))
+
+        assert len(graph) == 2
+
+        assert set(graph.objects(None, p)) == {Literal("1", datatype=XSD.integer), Literal("x", lang="en")}
+
+        assert graph.store.namespace("ex") == URIRef("http://example.org/")
+
+        graph.close()
+
+
+class TestLocalEndpointStore:
+
+    def test1_same_results(self, tmp_path):
+
+        file_path = "test/data/sparql_helper/sparqlplayground.ttl"
+
+        memory_endpoint = LocalEndpoint(file_path)
+        memory_endpoint.initialize()
+
+        store_endpoint = LocalEndpoint(file_path, store_path=str(tmp_path / "store.db"))
+        store_endpoint.initialize()
+
+        for query in ["SELECT ?s ?p ?o WHERE {?s ?p ?o}", "SELECT ?name WHERE {?x a ?t . ?x ?p ?name FILTER(regex(str(?p), \"name\"))}"]:
+
+            expected = memory_endpoint.query(query)
+            result = store_endpoint.query(query)
+
+            pd.testing.assert_frame_equal(result.sort_values(list(result.columns)).reset_index(drop=True), expected.sort_values(list(expected.columns)).reset_index(drop=True))
+
+        store_endpoint.close()
+
+    def test2_reopen_append(self, tmp_path, monkeypatch):
+
+        store_path = str(tmp_path / "store.db")
+
+        extra_path = tmp_path / "extra.ttl"
+
+        extra_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n")
+
+        endpoint = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", store_path=store_path)
+        endpoint.initialize()
+
+        triples = len(endpoint.endpoint)
+
+        endpoint.append(str(extra_path))
+
+        assert len(endpoint.endpoint) == triples + 1
+
+        cache_key = endpoint.cache_key
+
+        endpoint.close()
+
+        # the files are not parsed again by later initializations
+
+        def parse(*args, **kwargs):
+            raise AssertionError("The file was parsed again.")
+
+        monkeypatch.setattr(Graph, "parse", parse)
+
+        endpoint = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", store_path=store_path)
+        endpoint.initialize()
+        endpoint.append(str(extra_path))
+
+        assert len(endpoint.endpoint) == triples + 1
+
+        assert endpoint.cache_key == cache_key
+
+        assert endpoint.query("SELECT ?s WHERE {?s <http://example.org/p> ?o}")["s"].tolist() == ["http://example.org/a"]
+
+        endpoint.close()
+
+    def test3_append_uninitialized(self):
+
+        with pytest.raises(RuntimeError):
+            LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl").append("test/data/sparql_helper/sparqlplayground.ttl")
+
+    def test4_modified_file(self, tmp_path):
+
+        store_path = str(tmp_path / "store.db")
+
+        file_path = tmp_path / "data.ttl"
+        extra_path = tmp_path / "extra.ttl"
+
+        file_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n<http://example.org/b> <http://example.org/p> \"2\" .\n")
+        extra_path.write_text("<http://example.org/c> <http://example.org/p> \"3\" .\n")
+
+        endpoint = LocalEndpoint(str(file_path), store_path=store_path)
+        endpoint.initialize()
+        endpoint.append(str(extra_path))
+        endpoint.close()
+
+        # a triple is removed from the file, which is loaded again
+
+        file_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n")
+
+        os.utime(str(file_path), (os.path.getmtime(str(file_path)) + 10,) * 2)
+
+        endpoint = LocalEndpoint(str(file_path), store_path=store_path)
+        endpoint.initialize()
+
+        result = endpoint.query("SELECT ?s WHERE {?s <http://example.org/p> ?o}")
+
+        assert sorted(result["s"].tolist()) == ["http://example.org/a", "http://example.org/c"]
+
+        assert endpoint.appended == [(str(extra_path), os.path.getmtime(str(extra_path)))]
+
+        endpoint.close()
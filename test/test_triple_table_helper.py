@@ -0,0 +1,176 @@
+from kgextension.triple_table_helper import build_triple_table, read_table_meta, encode_term, decode_term, TripleTable, TripleTableStore
+from kgextension.triple_pattern_helper import query_graph
+from kgextension.sparql_helper_helper import values_clause, filter_clause
+from kgextension.sparql_helper import LocalEndpoint
+from rdflib import Graph, Literal, URIRef, BNode
+from rdflib.namespace import XSD
+import os
+import pytest
+import pandas as pd
+
+
+@pytest.fixture(scope="module")
+def graph():
+
+    graph = Graph()
+
+    graph.parse("test/data/sparql_helper/sparqlplayground.ttl", format="turtle")
+
+    return graph
+
+
+@pytest.fixture(scope="module")
+def table_graph(graph, tmp_path_factory):
+
+    directory = str(tmp_path_factory.mktemp("table"))
+
+    build_triple_table(directory, graph, graph.namespaces())
+
+    return Graph(store=TripleTableStore(directory))
+
+
+def sorted_frame(df):
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+class TestTripleTable:
+
+    def test1_terms(self, tmp_path):
+
+        terms = [URIRef("http://example.org/a"), BNode("b1"), Literal("x\x00y"), Literal("x", lang="en"), Literal("1", datatype=XSD.integer)]
+
+        assert [decode_term(encode_term(term)) for term in terms] == terms
+
+        build_triple_table(str(tmp_path), [(terms[0], terms[0], term) for term in terms])
+
+        table = TripleTable(str(tmp_path))
+
+        assert table.triple_count == len(terms)
+
+        assert [table.term(table.term_id(term)) for term in terms] == terms
+
+        assert table.term_id(URIRef("http://example.org/missing")) is None
+
+    def test2_empty_table(self, tmp_path):
+
+        build_triple_table(str(tmp_path), [])
+
+        graph = Graph(store=TripleTableStore(str(tmp_path)))
+
+        assert len(graph) == 0
+
+        assert query_graph(graph, "SELECT ?s ?o WHERE {?s a ?o}").empty
+
+    def test3_triples(self, graph, table_graph):
+
+        assert len(table_graph) == len(graph)
+
+        assert set(table_graph) == set(graph)
+
+        subject = next(graph.subjects())
+
+        assert set(table_graph.predicate_objects(subject)) == set(graph.predicate_objects(subject))
+
+        assert table_graph.store.namespace("rdf") == URIRef("http://www.w3.org/1999/02/22-rdf-syntax-ns#")
+
+        with pytest.raises(TypeError):
+            table_graph.add((subject, subject, subject))
+
+    @pytest.mark.parametrize("query", [
+        "SELECT ?value ?p ?v WHERE {VALUES (?value) {**VALUES**} ?value ?p ?v FILTER(isLITERAL(?v))}",
+        "SELECT DISTINCT ?value ?p ?v WHERE {?value ?p ?v . FILTER (**FILTER** && (isLITERAL(?v)))} ",
+        "SELECT DISTINCT ?value ?p ?s WHERE {VALUES (?value) {**VALUES**} ?s ?p ?value }",
+        "SELECT ?value ?p ?o ?type WHERE {VALUES (?value) {**VALUES**} ?value ?p ?o. ?o rdf:type ?type. }",
+        "SELECT ?s ?o WHERE { ?s a ?o FILTER(isIRI(?o) || isBLANK(?s)) }",
+        "SELECT ?s ?p WHERE {?s ?p ?s}",
+        "SELECT ?name WHERE {?x a ?t . ?x ?p ?name FILTER(regex(str(?p), \"name\"))}"])
+    def test4_same_results(self, graph, table_graph, query):
+
+        uris = list(dict.fromkeys(str(subject) for subject in graph.subjects()))[:10] + ["http://example.org/missing"]
+
+        query = query.replace("**VALUES**", values_clause(uris)).replace("**FILTER**", filter_clause(uris))
+
+        pd.testing.assert_frame_equal(sorted_frame(query_graph(table_graph, query)), sorted_frame(query_graph(graph, query)))
+
+
+class TestLocalEndpointTable:
+
+    def test1_reopen_append(self, tmp_path, monkeypatch):
+
+        store_path = str(tmp_path / "table")
+
+        extra_path = tmp_path / "extra.ttl"
+
+        extra_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n")
+
+        endpoint = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", store_path=store_path, engine="table")
+        endpoint.initialize()
+
+        triples = len(endpoint.endpoint)
+
+        endpoint.append(str(extra_path))
+
+        assert len(endpoint.endpoint) == triples + 1
+
+        assert len(read_table_meta(store_path)["sources"]) == 2
+
+        cache_key = endpoint.cache_key
+
+        endpoint.close()
+
+        # the files are not parsed again by later initializations
+
+        def parse(*args, **kwargs):
+            raise AssertionError("The file was parsed again.")
+
+        monkeypatch.setattr(Graph, "parse", parse)
+
+        endpoint = LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", store_path=store_path, engine="table")
+        endpoint.initialize()
+        endpoint.append(str(extra_path))
+
+        assert len(endpoint.endpoint) == triples + 1
+
+        assert endpoint.cache_key == cache_key
+
+        assert endpoint.query("SELECT ?s WHERE {?s <http://example.org/p> ?o}")["s"].tolist() == ["http://example.org/a"]
+
+        endpoint.close()
+
+    def test2_unknown_engine(self):
+
+        with pytest.raises(ValueError):
+            LocalEndpoint("test/data/sparql_helper/sparqlplayground.ttl", store_path="store", engine="unknown")
+
+    def test3_modified_file(self, tmp_path):
+
+        store_path = str(tmp_path / "table")
+
+        file_path = tmp_path / "data.ttl"
+        extra_path = tmp_path / "extra.ttl"
+
+        file_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n<http://example.org/b> <http://example.org/p> \"2\" .\n")
+        extra_path.write_text("<http://example.org/c> <http://example.org/p> \"3\" .\n")
+
+        endpoint = LocalEndpoint(str(file_path), store_path=store_path, engine="table")
+        endpoint.initialize()
+        endpoint.append(str(extra_path))
+        endpoint.close()
+
+        # a triple is removed from the file, which is loaded again
+
+        file_path.write_text("<http://example.org/a> <http://example.org/p> \"1\" .\n")
+
+        os.utime(str(file_path), (os.path.getmtime(str(file_path)) + 10,) * 2)
+
+        endpoint = LocalEndpoint(str(file_path), store_path=store_path, engine="table")
+        endpoint.initialize()
+
+        result = endpoint.query("SELECT ?s WHERE {?s <http://example.org/p> ?o}")
+
+        assert sorted(result["s"].tolist()) == ["http://example.org/a", "http://example.org/c"]
+
+        assert endpoint.appended == [(str(extra_path), os.path.getmtime(str(extra_path)))]
+
+        endpoint.close()
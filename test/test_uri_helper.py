@@ -1,7 +1,12 @@
-from kgextension.uri_helper import query_uri, uri_querier
+from kgextension.uri_helper import query_uri, uri_querier, query_uri_logic, GraphCache
+from kgextension.cache_backend_helper import MemoryCacheBackend, get_cache_backend, set_cache_backend
+import kgextension.uri_helper as uri_helper
 import pytest
 import pandas as pd
 import numpy as np
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 class TestQueryUri:
 
@@ -223,3 +228,194 @@ class TestUriQuerier:
 
         pd.testing.assert_frame_equal(result, expected_result_df, check_like=True)
 
+    def test5_concurrent_time_budget(self):
+
+        uri = "file://" + os.path.abspath("test/data/sparql_helper/sparqlplayground.ttl")
+
+        input = pd.DataFrame({"uris": [uri, np.nan, uri + "?copy"]})
+
+        query = "SELECT ?person WHERE {?person a <http://dbpedia.org/ontology/Person>} ORDER BY ?person"
+
+        expected_result_df = uri_querier(input, "uris", query, return_formats={"file:": "turtle"}, caching=False, progress=False)
+
+        # the results are collected in the order of the URIs
+
+        result = uri_querier(input, "uris", query, return_formats={"file:": "turtle"}, caching=False, progress=False, max_workers=4, per_host_limit=1)
+
+        pd.testing.assert_frame_equal(result, expected_result_df)
+
+        with pytest.warns(UserWarning) as record:
+            result = uri_querier(input, "uris", query, return_formats={"file:": "turtle"}, caching=False, progress=False, max_workers=4, time_budget=0)
+
+        assert record[0].message.args[0] == "2 URIs were not dereferenced, since the time budget of 0 seconds was exhausted."
+
+        assert result.empty
+
+
+class TestGraphCache:
+
+    def test1_reuse_eviction(self, tmp_path):
+
+        uri = "file://" + os.path.abspath("test/data/sparql_helper/sparqlplayground.ttl")
+
+        copy_path = tmp_path / "copy.ttl"
+
+        copy_path.write_bytes(open("test/data/sparql_helper/sparqlplayground.ttl", "rb").read())
+
+        cache = GraphCache()
+
+        graph = cache.get_graph(uri, "turtle")
+
+        # the second query against the URI runs on the same graph
+
+        assert cache.get_graph(uri, "turtle") is graph
+
+        info = cache.cache_info()
+
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+        assert info.resident_bytes > 0
+
+        cache.max_bytes = info.resident_bytes
+
+        cache.get_graph("file://" + str(copy_path), "turtle")
+
+        info = cache.cache_info()
+
+        assert (info.currsize, info.evictions) == (1, 1)
+
+        cache.cache_clear()
+
+        assert cache.cache_info().currsize == 0
+
+    def test2_query_uri_logic(self):
+
+        uri = "file://" + os.path.abspath("test/data/sparql_helper/sparqlplayground.ttl")
+
+        query = "SELECT ?person WHERE {?person a <http://dbpedia.org/ontology/Person>} ORDER BY ?person"
+
+        result = query_uri_logic.__wrapped__(uri, query, "turtle", caching=False)
+
+        pd.testing.assert_frame_equal(query_uri_logic.__wrapped__(uri, query, "turtle"), result)
+
+    def test3_revalidation(self):
+
+        document = open("test/data/sparql_helper/sparqlplayground.ttl", "rb").read()
+
+        requests_made = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+
+                requests_made.append(self.headers.get("If-None-Match"))
+
+                if self.headers.get("If-None-Match") == '"v1"':
+
+                    self.send_response(304)
+                    self.end_headers()
+
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/turtle")
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(document)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        uri = "http://127.0.0.1:" + str(server.server_port) + "/playground.ttl"
+
+        try:
+
+            # with a TTL of 0, every lookup revalidates the document
+
+            cache = GraphCache(ttl=0)
+
+            graph = cache.get_graph(uri, "turtle")
+
+            assert len(graph) > 0
+
+            assert cache.get_graph(uri, "turtle") is graph
+
+            assert requests_made == [None, '"v1"']
+
+            assert cache.revalidations == 1
+
+        finally:
+
+            server.shutdown()
+            server.server_close()
+
+    def test4_query_results_revalidation(self):
+
+        document = open("test/data/sparql_helper/sparqlplayground.ttl", "rb").read()
+
+        responses = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+
+                if self.headers.get("If-None-Match") == '"v1"':
+
+                    responses.append(304)
+
+                    self.send_response(304)
+                    self.end_headers()
+
+                    return
+
+                responses.append(200)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/turtle")
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(document)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        uri = "http://127.0.0.1:" + str(server.server_port) + "/playground.ttl"
+
+        query = "SELECT ?s ?o WHERE {?s a ?o}"
+
+        previous_backend = get_cache_backend()
+        previous_ttl = uri_helper.graph_cache.ttl
+
+        set_cache_backend(MemoryCacheBackend())
+
+        uri_helper.graph_cache.cache_clear()
+        uri_helper.graph_cache.ttl = 0
+
+        try:
+
+            # the cached result expires with the document, which is 
+            # revalidated by the second query
+
+            result = query_uri_logic(uri, query, "turtle")
+
+            pd.testing.assert_frame_equal(query_uri_logic(uri, query, "turtle"), result)
+
+            assert responses == [200, 304]
+
+        finally:
+
+            uri_helper.graph_cache.ttl = previous_ttl
+            uri_helper.graph_cache.cache_clear()
+
+            set_cache_backend(previous_backend)
+
+            server.shutdown()
+            server.server_close()